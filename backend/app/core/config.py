@@ -44,6 +44,40 @@ class Settings(BaseSettings):
     # media settings
     MEDIA_ROOT: str = "media"
     RECIPE_IMAGES_DIR: str = "recipes"
+
+    # recommendation queue settings
+    RECOMMENDATION_QUEUE_LOW_WATER: int = 5       # refill when fewer pending rows are left
+    RECOMMENDATION_QUEUE_REFILL_SIZE: int = 20    # rows generated per refill
+    EXCLUSION_CACHE_USERS: int = 10000            # users whose exclusion bitmap stays in memory
+    INTERACTION_BATCH_MAX: int = 200              # items accepted by /recommendations/interactions/batch
+    COLLECTION_SEARCH_CACHE_USERS: int = 1000     # users whose likes/saves search index stays in memory
+    SEARCH_CACHE_SIZE: int = 2000                 # cached recipe/ingredient search results
+    SEARCH_CACHE_TTL_SECONDS: int = 300
+
+    # cached GET responses for hot read endpoints (TTLs are set per route)
+    RESPONSE_CACHE_BACKEND: str = "memory"        # memory, memcached or none
+    RESPONSE_CACHE_SIZE: int = 5000               # entries kept by the in-process backend
+    RESPONSE_CACHE_SERVER: str = "127.0.0.1:11211"
+
+    # authenticated users kept in memory so a request does not reload its own user row
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    # bcrypt runs on its own executor so login bursts cannot take every request thread
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64           # queued + running hashes before 503
+
+    # write-behind interaction recording (off: every swipe commits on the request thread)
+    INTERACTION_WRITE_BEHIND: bool = False
+    INTERACTION_BUFFER_SIZE: int = 10000          # queued interactions before submit applies backpressure
+    INTERACTION_FLUSH_INTERVAL_MS: int = 200      # max time an interaction waits in the buffer
+    INTERACTION_FLUSH_EVENTS: int = 500           # flush early once this many are waiting
+    INTERACTION_BUFFER_PUT_TIMEOUT_MS: int = 50   # wait this long on a full buffer, then write synchronously
+
+    # offline index files (built by the jobs in app.services)
+    INDEX_DIR: str = "indexes"
+    USER_LSH_INDEX_PATH: str = os.path.join(INDEX_DIR, "user_lsh.npz")
+    EMBEDDINGS_DIR: str = os.path.join(INDEX_DIR, "embeddings")
     
     class Config:
         case_sensitive = True
@@ -0,0 +1,34 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+ETAG_HEADER = "ETag"
+# clients may keep the body but must revalidate before every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*stamp: Any) -> str:
+    """Strong ETag from the version stamp of a resource (timestamps, counts, ids)."""
+    raw = "\x1f".join("" if part is None else str(part) for part in stamp)
+    return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """True when the request's If-None-Match already names `etag`."""
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={ETAG_HEADER: etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str):
+    response.headers[ETAG_HEADER] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
@@ -0,0 +1,112 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import DateTime, and_, func, or_
+
+# list endpoints keep returning plain JSON arrays (the mobile client expects
+# them); the cursor for the next page travels in this response header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque, URL-safe cursor for a keyset position."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int, types: Optional[Sequence[type]] = None) -> Optional[List[Any]]:
+    """Inverse of encode_cursor; raises ValueError for anything malformed.
+
+    `types` gives the expected type of each element (int also passes for
+    float), so a hand-made cursor cannot reach a comparison with a string.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    if types is not None:
+        for value, expected in zip(values, types):
+            allowed = (int, float) if expected is float else expected
+            if isinstance(value, bool) or not isinstance(value, allowed):
+                raise ValueError("Invalid cursor")
+    return values
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# nullable timestamp keys (saved_at, created_at) are ordered as this value,
+# so rows without one come last on a newest-first page instead of never
+KEY_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_json(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _from_json(column, value: Any) -> Any:
+    if isinstance(column.type, DateTime):
+        if value is None:
+            return KEY_EPOCH
+        if not isinstance(value, str):
+            raise ValueError("Invalid cursor")
+        return datetime.fromisoformat(value)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def _seek(keys, values, descending: bool):
+    # (a, b) < (x, y) spelt out, Oracle has no row-value comparison
+    clauses = []
+    for i, key in enumerate(keys):
+        step = key < values[i] if descending else key > values[i]
+        clauses.append(and_(*[keys[j] == values[j] for j in range(i)], step))
+    return or_(*clauses)
+
+
+def _sort_key(column):
+    if isinstance(column.type, DateTime):
+        return func.coalesce(column, KEY_EPOCH)
+    return column
+
+
+def keyset_page(
+    query, keys, cursor: Optional[str], limit: Optional[int], response: Response, descending: bool = True
+) -> List[Any]:
+    """One page of `query` ordered by `keys`, the last of which must be unique.
+
+    The key columns are appended to the select, so the query should return a
+    single entity; the cursor for the following page is set on `response`.
+    With neither a limit nor a cursor every row is returned, for clients
+    that predate paging.
+    """
+    keys = [_sort_key(key) for key in keys]
+    order = [key.desc() if descending else key.asc() for key in keys]
+    if limit is None and not cursor:
+        return [row[0] for row in query.add_columns(*keys).order_by(*order)]
+
+    try:
+        after = decode_cursor(cursor, len(keys))
+        if after is not None:
+            after = [_from_json(key, value) for key, value in zip(keys, after)]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if after is not None:
+        query = query.filter(_seek(keys, after, descending))
+    limit = max(1, min(DEFAULT_PAGE_SIZE if limit is None else limit, MAX_PAGE_SIZE))
+    rows = query.add_columns(*keys).order_by(*order).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([_to_json(v) for v in rows[-1][1:]])
+    return [row[0] for row in rows]
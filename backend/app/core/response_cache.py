@@ -0,0 +1,314 @@
+import hashlib
+import json
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from fastapi.security.utils import get_authorization_scheme_param
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.etag import ETAG_HEADER, etag_matches, not_modified
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.security import decode_access_token, principal_cache
+
+# response headers that are stored with a cached body
+CACHED_HEADERS = ("content-type", "cache-control", ETAG_HEADER.lower(), NEXT_CURSOR_HEADER.lower())
+CACHE_STATUS_HEADER = "X-Cache"
+# set by an endpoint through add_cache_tags(); never sent to the client
+CACHE_TAGS_HEADER = "X-Cache-Tags"
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry expiry. Tag versions are kept apart so they are never evicted."""
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self, keys: Sequence[str]) -> List[int]:
+        with self._lock:
+            return [self._versions.get(key, 0) for key in keys]
+
+    def bump(self, key: str):
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+class MemcachedBackend:
+    """Shared cache over the memcached text protocol (get/set/add/incr), one socket per backend.
+
+    Memory bounds and LRU eviction are the server's. Any network error is
+    logged and treated as a miss, so a cache outage only costs latency.
+    """
+
+    def __init__(self, server: str, timeout: float = 0.25):
+        host, _, port = server.rpartition(":")
+        self.address = (host or "127.0.0.1", int(port))
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._sock is None:
+            self._sock = socket.create_connection(self.address, timeout=self.timeout)
+            self._reader = self._sock.makefile("rb")
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def _call(self, command: bytes, read: Callable):
+        with self._lock:
+            try:
+                self._connect()
+                self._sock.sendall(command)
+                return read()
+            except (OSError, ValueError) as e:
+                print(f"Response cache server error: {e}")
+                self._close()
+                return None
+
+    def _line(self) -> bytes:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ValueError("connection closed")
+        return line[:-2]
+
+    def _read_values(self) -> Dict[str, bytes]:
+        values = {}
+        while True:
+            line = self._line()
+            if line == b"END":
+                return values
+            parts = line.split()
+            if len(parts) < 4 or parts[0] != b"VALUE":
+                raise ValueError(f"unexpected reply {line[:40]!r}")
+            data = self._reader.read(int(parts[3]) + 2)
+            values[parts[1].decode()] = data[:-2]
+
+    def _get_many(self, keys: Sequence[str]) -> Dict[str, bytes]:
+        return self._call(f"get {' '.join(keys)}\r\n".encode(), self._read_values) or {}
+
+    def _store(self, verb: str, key: str, value: bytes, ttl: int) -> bool:
+        command = f"{verb} {key} 0 {ttl} {len(value)}\r\n".encode() + value + b"\r\n"
+        return self._call(command, self._line) == b"STORED"
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._get_many([key]).get(key)
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self._store("set", key, value, ttl)
+
+    def versions(self, keys: Sequence[str]) -> List[int]:
+        found = self._get_many(keys)
+        versions = []
+        for key in keys:
+            if key not in found:
+                # an evicted (or never set) version must not fall back to a value
+                # older entries were written under, so start from the clock
+                self._store("add", key, str(time.time_ns()).encode(), 0)
+                found.update(self._get_many([key]))
+            try:
+                versions.append(int(found.get(key, b"0")))
+            except ValueError:
+                versions.append(0)
+        return versions
+
+    def bump(self, key: str):
+        reply = self._call(f"incr {key} 1\r\n".encode(), self._line)
+        if reply == b"NOT_FOUND":
+            self._store("add", key, str(time.time_ns()).encode(), 0)
+
+    def clear(self):
+        self._call(b"flush_all\r\n", self._line)
+
+
+class ResponseCache:
+    """Cached GET responses, invalidated by tag.
+
+    Every entry is stored under a key that includes the current version of
+    each of its tags (e.g. "recipe:42"); a write endpoint bumps the tag and
+    every cached variant of that resource (all users, all query strings)
+    stops being reachable at once, on any backend. Tags that are only known
+    once the endpoint has run (the users shown on a recipe page) are stored
+    with their versions inside the entry and compared on every hit.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return "tag:" + hashlib.sha1(tag.encode()).hexdigest()
+
+    def _entry_key(self, parts: Iterable[str], tags: Sequence[str]) -> str:
+        versions = self.backend.versions([self._tag_key(tag) for tag in tags]) if tags else []
+        raw = "\x1f".join(list(parts) + [str(v) for v in versions])
+        return "resp:" + hashlib.sha1(raw.encode()).hexdigest()
+
+    def lookup(self, parts: Iterable[str], tags: Sequence[str], fetch: bool = True) -> Tuple[str, Optional[Response]]:
+        """(entry key, cached response or None); with fetch=False only the key, counted as a miss."""
+        key = self._entry_key(parts, tags)
+        stored = self.backend.get(key) if fetch else None
+        entry = json.loads(stored) if stored is not None else None
+        if entry is not None and entry.get("tags"):
+            dynamic = sorted(entry["tags"])
+            if self.backend.versions([self._tag_key(tag) for tag in dynamic]) != [entry["tags"][t] for t in dynamic]:
+                entry = None
+        if entry is None:
+            self.misses += 1
+            return key, None
+        self.hits += 1
+        return key, Response(content=entry["body"].encode(), status_code=entry["status"], headers=entry["headers"])
+
+    def store(self, key: str, response: Response, ttl: int, dynamic_tags: Sequence[str] = ()):
+        headers = {name: value for name, value in response.headers.items() if name in CACHED_HEADERS}
+        entry = {"status": response.status_code, "headers": headers, "body": response.body.decode()}
+        if dynamic_tags:
+            dynamic = sorted(set(dynamic_tags))
+            entry["tags"] = dict(zip(dynamic, self.backend.versions([self._tag_key(tag) for tag in dynamic])))
+        self.backend.set(key, json.dumps(entry, separators=(",", ":")).encode(), ttl)
+
+    def invalidate(self, *tags: str):
+        if self.backend is None:
+            return
+        for tag in tags:
+            self.backend.bump(self._tag_key(tag))
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+def _make_backend():
+    if settings.RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryBackend(settings.RESPONSE_CACHE_SIZE)
+    if settings.RESPONSE_CACHE_BACKEND == "memcached":
+        return MemcachedBackend(settings.RESPONSE_CACHE_SERVER)
+    return None
+
+
+response_cache = ResponseCache(_make_backend())
+
+
+def cache_response(ttl: int, tags: Sequence[str] = (), vary_by_auth: bool = False):
+    """Mark a GET endpoint as cacheable; needs a router built with CachedRoute.
+
+    `tags` are formatted with the path parameters ("recipe:{recipe_id}").
+    With `vary_by_auth` each user gets their own entry, for responses that
+    depend on who is asking; the token is checked before every lookup.
+    """
+    def decorator(endpoint):
+        endpoint._cache_policy = (ttl, tuple(tags), vary_by_auth)
+        return endpoint
+    return decorator
+
+
+def add_cache_tags(response: Response, *tags: str):
+    """Tag the cached copy of this response with tags only the endpoint knows, e.g. "user:7"."""
+    existing = response.headers.get(CACHE_TAGS_HEADER)
+    response.headers[CACHE_TAGS_HEADER] = " ".join(([existing] if existing else []) + list(tags))
+
+
+def _pop_cache_tags(response: Response) -> List[str]:
+    tags = response.headers.get(CACHE_TAGS_HEADER)
+    if tags is None:
+        return []
+    del response.headers[CACHE_TAGS_HEADER]
+    return tags.split()
+
+
+class CachedRoute(APIRoute):
+    """APIRoute that serves endpoints marked with @cache_response from response_cache."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        policy = getattr(self.endpoint, "_cache_policy", None)
+        if policy is None:
+            return handler
+        ttl, tag_templates, vary_by_auth = policy
+
+        async def cached_handler(request: Request) -> Response:
+            if request.method != "GET" or response_cache.backend is None:
+                response = await handler(request)
+                _pop_cache_tags(response)
+                return response
+
+            tags = [tag.format(**request.path_params) for tag in tag_templates]
+            parts = [request.url.path, str(sorted(request.query_params.multi_items()))]
+            known = True
+            if vary_by_auth:
+                # an expired or forged token never reaches the cache; the
+                # endpoint's own dependency answers it
+                scheme, token = get_authorization_scheme_param(request.headers.get("authorization"))
+                user_id = decode_access_token(token) if scheme.lower() == "bearer" else None
+                if user_id is None:
+                    response = await handler(request)
+                    _pop_cache_tags(response)
+                    return response
+                parts.append(f"user:{user_id}")
+                # a user not seen within the principal cache TTL (or deleted
+                # since) goes through the endpoint, which loads them again
+                known = principal_cache.known(user_id)
+
+            key, cached = await run_in_threadpool(response_cache.lookup, parts, tags, known)
+            if cached is not None:
+                etag = cached.headers.get(ETAG_HEADER)
+                if etag_matches(request, etag):
+                    cached = not_modified(etag)
+                cached.headers[CACHE_STATUS_HEADER] = "HIT"
+                return cached
+
+            response = await handler(request)
+            dynamic_tags = _pop_cache_tags(response)
+            if response.status_code == 200 and hasattr(response, "body"):
+                await run_in_threadpool(response_cache.store, key, response, ttl, dynamic_tags)
+            response.headers[CACHE_STATUS_HEADER] = "MISS"
+            return response
+
+        return cached_handler
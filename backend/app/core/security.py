@@ -1,11 +1,16 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 
 from jose import jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from app.core.config import settings
 from app.models.user import User
@@ -20,6 +25,95 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+class PasswordHashPool:
+    """Small dedicated executor for bcrypt, apart from the shared request threadpool.
+
+    bcrypt releases the GIL, so a few threads hash in parallel; everything
+    else waits in the executor queue. Once `max_pending` calls are queued or
+    running, new ones are refused with 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0        # queued + running
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.peak_pending = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    def _call(self, fn, args):
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def _done(self, _future):
+        # also runs for calls cancelled while still queued (client went away)
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many sign-in requests, try again shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+            executor = self._get_executor()
+        try:
+            future = executor.submit(self._call, fn, args)
+        except RuntimeError:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self.pending - self.running,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "peak_pending": self.peak_pending,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordHashPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_pool.run(get_password_hash, password)
+
 def create_access_token(
     subject: Any, expires_delta: Optional[timedelta] = None
 ) -> str:
@@ -44,29 +138,110 @@ def create_refresh_token(subject: Any, expires_delta: Optional[timedelta] = None
     to_encode = {"exp": expire, "sub": str(subject)}
     return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM)
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
+class PrincipalCache:
+    """Recently authenticated users' column values, bounded and short lived.
+
+    Only plain values are kept (never an ORM instance, which belongs to one
+    session); each request gets its own User rebuilt from them and attached
+    to its session without a query. The password hash is left out and is
+    loaded on first access by the few endpoints that need it.
+    """
+
+    EXCLUDED = ("password_hash",)
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: int) -> Optional[User]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                return None
+            self._entries.move_to_end(user_id)
+            values = entry[1]
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def known(self, user_id: int) -> bool:
+        """Whether the user was loaded within the TTL and not invalidated since."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def put(self, user: User):
+        values: Dict[str, Any] = {
+            column.key: getattr(user, column.key)
+            for column in User.__table__.columns if column.key not in self.EXCLUDED
+        }
+        with self._lock:
+            self._entries[user.user_id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user.user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+def decode_access_token(token: str) -> Optional[int]:
+    """User id of a valid, unexpired token; None for anything else."""
     try:
         payload = jwt.decode(
             token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except jwt.JWTError:
-        raise credentials_exception
-    
+        user_id = payload.get("sub")
+        return int(user_id) if user_id is not None else None
+    except (jwt.JWTError, TypeError, ValueError):
+        return None
+
+def get_token_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """User id from the access token alone; the user may no longer exist."""
+    user_id = decode_access_token(token)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
+
+def _load_user(db: Session, user_id: int) -> User:
     user = db.query(User).filter(User.user_id == user_id).first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="User not found"
         )
-    return user
\ No newline at end of file
+    principal_cache.put(user)
+    return user
+
+def get_current_user_id(
+    db: Session = Depends(get_db), user_id: int = Depends(get_token_user_id)
+) -> int:
+    """Id of an existing user, for endpoints that never need the User row.
+
+    A user seen within the principal cache TTL is trusted without a query;
+    deleting a user invalidates their entry.
+    """
+    if not principal_cache.known(user_id):
+        _load_user(db, user_id)
+    return user_id
+
+def get_current_user(
+    db: Session = Depends(get_db), user_id: int = Depends(get_token_user_id)
+) -> User:
+    user = principal_cache.get(db, user_id)
+    if user is not None:
+        return user
+    return _load_user(db, user_id)
@@ -1,13 +1,16 @@
 from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
 
 from app.models.user import User, follows
 from app.models.recipe import Recipe
 from app.models.save import Save
 from app.models.favorite import Favorite
+from app.models.recipe_stats import RecipeStats
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, verify_password, verify_password_async, principal_cache
+from app.core.response_cache import response_cache
 
 def get_user(db: Session, user_id: int) -> Optional[User]:
     return db.query(User).filter(User.user_id == user_id).first()
@@ -21,11 +24,12 @@ def get_user_by_username(db: Session, username: str) -> Optional[User]:
 def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
     return db.query(User).offset(skip).limit(limit).all()
 
-def create_user(db: Session, user_in: UserCreate) -> User:
+def create_user(db: Session, user_in: UserCreate, password_hash: Optional[str] = None) -> User:
+    # async callers hash on the password pool first and pass the result in
     db_user = User(
         username=user_in.username,
         email=user_in.email,
-        password_hash=get_password_hash(user_in.password)
+        password_hash=password_hash or get_password_hash(user_in.password)
     )
     db.add(db_user)
     db.commit()
@@ -48,6 +52,9 @@ def update_user(db: Session, db_user: User, user_in: UserUpdate) -> User:
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    principal_cache.invalidate(db_user.user_id)
+    # cached pages that show the username or profile image
+    response_cache.invalidate(f"user:{db_user.user_id}")
     return db_user
 
 def delete_user(db: Session, user_id: int) -> bool:
@@ -56,18 +63,45 @@ def delete_user(db: Session, user_id: int) -> bool:
         return False
     db.delete(user)
     db.commit()
+    principal_cache.invalidate(user_id)
+    response_cache.invalidate(f"user:{user_id}")
     return True
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+def _find_login_user(db: Session, username: str) -> Optional[User]:
     user = get_user_by_username(db, username)
     print("username, user", username, user)
-    if not user:
-        return None
-    if not verify_password(password, user.password_hash):
+    return user
+
+def _accept_login(user: User, password_ok: bool) -> Optional[User]:
+    if not password_ok:
         print("Invalid password")
         return None
     return user
 
+def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+    user = _find_login_user(db, username)
+    if not user:
+        return None
+    return _accept_login(user, verify_password(password, user.password_hash))
+
+async def authenticate_user_async(db: Session, username: str, password: str) -> Optional[User]:
+    """authenticate_user for async endpoints: the lookup on the request threadpool, bcrypt on the password pool.
+
+    The session is closed before the hash is checked, so no pooled
+    connection is held while waiting on the pool; the user comes back
+    detached with its columns loaded.
+    """
+    def lookup():
+        try:
+            return _find_login_user(db, username)
+        finally:
+            db.close()
+
+    user = await run_in_threadpool(lookup)
+    if not user:
+        return None
+    return _accept_login(user, await verify_password_async(password, user.password_hash))
+
 def follow_user(db: Session, follower_id: int, following_id: int) -> bool:
     if follower_id == following_id:
         return False
@@ -131,4 +165,33 @@ def get_follow_stats(db: Session, user_id: int) -> Dict[str, int]:
         "following_count": following_count,
         "save_count": save_count,
         "like_count": like_count,
-    }
\ No newline at end of file
+    }
+
+def get_profile_stamp(db: Session, user_id: int) -> Dict[str, Any]:
+    """Follow stats plus a version stamp of the user's posts, in one query.
+
+    Same keys as get_follow_stats, so a profile read that checks its ETag
+    does not count everything twice.
+    """
+    own_recipes = Recipe.user_id == user_id
+    row = db.query(
+        db.query(func.count(follows.c.follower_id)).filter(follows.c.following_id == user_id).scalar_subquery(),
+        db.query(func.count(follows.c.following_id)).filter(follows.c.follower_id == user_id).scalar_subquery(),
+        db.query(func.count(Save.recipe_id)).filter(Save.user_id == user_id).scalar_subquery(),
+        db.query(func.count(Favorite.recipe_id)).filter(Favorite.user_id == user_id).scalar_subquery(),
+        db.query(func.count(Recipe.recipe_id)).filter(own_recipes).scalar_subquery(),
+        db.query(func.max(Recipe.updated_at)).filter(own_recipes).scalar_subquery(),
+        db.query(func.max(RecipeStats.updated_at)).join(
+            Recipe, Recipe.recipe_id == RecipeStats.recipe_id
+        ).filter(own_recipes).scalar_subquery(),
+    ).one()
+
+    return {
+        "followers_count": row[0] or 0,
+        "following_count": row[1] or 0,
+        "save_count": row[2] or 0,
+        "like_count": row[3] or 0,
+        "posts_count": row[4] or 0,
+        "posts_updated_at": row[5],
+        "posts_stats_updated_at": row[6],
+    }
@@ -7,13 +7,20 @@
 #     return {"message": "Hello World"}
 
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from app.core.config import settings
-from app.core.security import get_current_user
+from app.core.security import get_current_user, password_pool
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.etag import ETAG_HEADER
 from app.routers import auth, users, recipes, collections, recommendations
+from app.services.recommendation_service import refill_worker, interaction_buffer
+from app.services.indexes import warm_indexes
+from app.services.search_cache import search_cache
+from app.core.response_cache import response_cache, CACHE_STATUS_HEADER
 # Import all models to ensure proper initialization
 import app.models
 # , recipes, ingredients, categories, reviews, favorites
@@ -22,10 +29,24 @@ import app.models
 os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
 os.makedirs(os.path.join(settings.MEDIA_ROOT, settings.RECIPE_IMAGES_DIR), exist_ok=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_indexes()
+    # background worker that keeps each user's recommendation queue above the low-water mark
+    refill_worker.start()
+    if settings.INTERACTION_WRITE_BEHIND:
+        interaction_buffer.start()
+    yield
+    # flush queued interactions before the process exits
+    interaction_buffer.stop()
+    refill_worker.stop()
+    password_pool.shutdown()
+
 app = FastAPI(
     title="Recipe Social API",
     description="API for a social recipe sharing application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -35,8 +56,8 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_origins=[str(origin) for origin in settings.BACKEND_CORS_ORIGINS],
         allow_credentials=True,
         allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-        allow_headers=["Content-Type", "Authorization", "Accept"],
-        expose_headers=["Content-Type"],
+        allow_headers=["Content-Type", "Authorization", "Accept", "If-None-Match"],
+        expose_headers=["Content-Type", ETAG_HEADER, NEXT_CURSOR_HEADER, CACHE_STATUS_HEADER],
         max_age=600,  # Cache preflight requests for 10 minutes
     )
 
@@ -63,4 +84,9 @@ def read_root():
 
 @app.get("/api/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "search_cache": search_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "password_pool": password_pool.stats(),
+    }
\ No newline at end of file
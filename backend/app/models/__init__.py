@@ -10,6 +10,7 @@ from app.models.dislike import Dislike
 from app.models.user_similarity import UserSimilarity
 from app.models.recommendation import RecipeRecommendation
 from app.models.seen_recipe import SeenRecipe
+from app.models.recipe_stats import RecipeStats
 
 # This ensures all models are imported when the app starts
-__all__ = ["User", "Recipe", "Category", "Ingredient", "RecipeIngredient", "Favorite", "Review", "Save", "Dislike", "UserSimilarity", "RecipeRecommendation", "SeenRecipe"] 
\ No newline at end of file
+__all__ = ["User", "Recipe", "Category", "Ingredient", "RecipeIngredient", "Favorite", "Review", "Save", "Dislike", "UserSimilarity", "RecipeRecommendation", "SeenRecipe", "RecipeStats"] 
\ No newline at end of file
@@ -28,4 +28,5 @@ class Recipe(Base):
     reviews = relationship("Review", back_populates="recipe")
     dislikes = relationship("Dislike", back_populates="recipe")
     recommendations = relationship("RecipeRecommendation", back_populates="recipe")
-    seen_by = relationship("SeenRecipe", back_populates="recipe")
\ No newline at end of file
+    seen_by = relationship("SeenRecipe", back_populates="recipe")
+    stats = relationship("RecipeStats", back_populates="recipe", uselist=False)
\ No newline at end of file
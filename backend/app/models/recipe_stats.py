@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class RecipeStats(Base):
+    __tablename__ = "recipe_stats"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.recipe_id"), primary_key=True)
+    rating_sum = Column(Float, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    average_rating = Column(Float, nullable=True)  # NULL until the first review
+    favorite_count = Column(Integer, nullable=False, default=0)
+    save_count = Column(Integer, nullable=False, default=0)
+    dislike_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
+    
+    # Relationships
+    recipe = relationship("Recipe", back_populates="stats")
@@ -4,11 +4,12 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.core.database import get_db
-from app.core.security import create_access_token, create_refresh_token
+from app.core.security import create_access_token, create_refresh_token, get_password_hash_async
 from app.core.config import settings
-from app.crud.user import authenticate_user, create_user
+from app.crud.user import authenticate_user_async, create_user
 from app.schemas.user import User, UserCreate
 from app.schemas.token import Token
 from fastapi.responses import JSONResponse
@@ -20,13 +21,14 @@ from fastapi import Body
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
-def login_access_token(
+async def login_access_token(
     db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = authenticate_user(db, username=form_data.username, password=form_data.password)
+    # async so the bcrypt check waits on the password pool, not on a request thread
+    user = await authenticate_user_async(db, username=form_data.username, password=form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -65,7 +67,7 @@ def login_access_token(
     return response
 
 @router.post("/register", response_model=dict)
-def register_user(
+async def register_user(
     *,
     db: Session = Depends(get_db),
     user_in: UserCreate,
@@ -77,21 +79,24 @@ def register_user(
 
     print(user_in)
     
-    user = get_user_by_email(db, email=user_in.email)
+    user = await run_in_threadpool(get_user_by_email, db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="A user with this email already exists",
         )
     
-    user = get_user_by_username(db, username=user_in.username)
+    user = await run_in_threadpool(get_user_by_username, db, username=user_in.username)
     if user:
         raise HTTPException(
             status_code=400,
             detail="A user with this username already exists",
         )
     
-    user = create_user(db, user_in)
+    # give the connection back while bcrypt runs; create_user checks one out again
+    await run_in_threadpool(db.close)
+    password_hash = await get_password_hash_async(user_in.password)
+    user = await run_in_threadpool(create_user, db, user_in, password_hash)
 
     # only return the user id
     return {"user_id": user.user_id}
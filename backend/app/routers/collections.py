@@ -1,55 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models.recipe import Recipe
 from app.models.favorite import Favorite
 from app.models.save import Save
+from app.models.recipe_stats import RecipeStats
 from app.schemas.recipe import RecipeBase, RecipeDetail, RecipeInDBBase, SimpleRecipe, RecipeSmallCard
 from app.schemas.ingredient import IngredientInRecipe
 from app.schemas.category import CategoryInDBBase
 from app.schemas.review import ReviewInDBBase
 from app.schemas.user import UserInDBBase
 from app.core.security import get_current_user 
+from app.core.pagination import keyset_page
+from app.core.etag import make_etag, etag_matches, not_modified, set_etag
 from datetime import datetime, timezone
 from app.models.user import User
 from app.models.category import Category, recipe_categories
 from app.models.ingredient import RecipeIngredient, Ingredient
 from app.models.review import Review
+from app.services.recipe_stats import apply_recipe_stats, load_rating_aggregates
+from app.services.collection_search import collection_search, LIKES, SAVES
 from sqlalchemy import func, text, or_
 import random
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
-@router.get("/likes", response_model=List[RecipeSmallCard])
-def get_liked_recipes(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # get all recipes that the user has liked, sorted from latest to earliest
-    liked_recipes = db.query(Recipe).join(Favorite).filter(Favorite.user_id == user.user_id).order_by(Favorite.saved_at.desc()).all()
-
-    for recipe in liked_recipes:
-        total_ratings = len(recipe.reviews)
-        average_rating = sum(review.rating for review in recipe.reviews) / len(recipe.reviews) if recipe.reviews else None
-        recipe.average_rating = average_rating
-        recipe.total_ratings = total_ratings
+def _collection_etag(db: Session, model, user: User, request: Request) -> str:
+    # changes whenever an item is added or removed, or a card's recipe or rating changes
+    stamp = db.query(
+        func.count(model.recipe_id),
+        func.max(model.saved_at),
+        func.sum(model.recipe_id),
+        func.max(Recipe.updated_at),
+        func.max(RecipeStats.updated_at),
+    ).join(Recipe, Recipe.recipe_id == model.recipe_id).outerjoin(
+        RecipeStats, RecipeStats.recipe_id == model.recipe_id
+    ).filter(model.user_id == user.user_id).one()
+    return make_etag(model.__tablename__, user.user_id, request.url.query, *stamp)
 
-    return liked_recipes
+@router.get("/likes", response_model=List[RecipeSmallCard])
+def get_liked_recipes(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    etag = _collection_etag(db, Favorite, user, request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    # recipes the user has liked, latest first; one page at a time when a limit or cursor is given
+    query = db.query(Recipe).join(Favorite).filter(Favorite.user_id == user.user_id)
+    liked_recipes = keyset_page(query, [Favorite.saved_at, Favorite.recipe_id], cursor, limit, response)
+
+    return apply_recipe_stats(db, liked_recipes)
 
 def get_user_saved_recipes(user: User, db: Session, limit: int = None):
     query = db.query(Recipe).join(Save).filter(Save.user_id == user.user_id).order_by(Save.saved_at.desc())
     saved_recipes = query.limit(limit).all() if limit else query.all()
 
-    for recipe in saved_recipes:
-        total_ratings = len(recipe.reviews)
-        average_rating = sum(review.rating for review in recipe.reviews) / total_ratings if total_ratings > 0 else None
-        recipe.average_rating = average_rating
-        recipe.total_ratings = total_ratings
-
-    return saved_recipes
+    return apply_recipe_stats(db, saved_recipes)
 
 @router.get("/saves", response_model=List[RecipeSmallCard])
-def get_saved_recipes(limit: int = None, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # get all recipes that the user has saved, sorted from latest to earliest
-    return get_user_saved_recipes(user, db, limit=limit)
+def get_saved_recipes(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    etag = _collection_etag(db, Save, user, request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    # recipes the user has saved, latest first; one page at a time when a limit or cursor is given
+    query = db.query(Recipe).join(Save).filter(Save.user_id == user.user_id)
+    saved_recipes = keyset_page(query, [Save.saved_at, Save.recipe_id], cursor, limit, response)
+
+    return apply_recipe_stats(db, saved_recipes)
 
 @router.get("/recent", response_model=List[RecipeSmallCard])
 def get_recent_recipes(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -57,81 +91,25 @@ def get_recent_recipes(user: User = Depends(get_current_user), db: Session = Dep
     result = get_user_saved_recipes(user, db, limit=20)
     return result
 
-def helper_search_liked_recipes(query: str, limit: int, user: User, db: Session):
+def _search_collections(query: str, limit: int, user: User, db: Session, kinds):
     clean_q = query.strip().lower()
     if not clean_q:
         raise HTTPException(400, detail="Query must not be empty")
 
-    # Oracle doesn't have ILIKE, so we force both sides to lower-case
-    results = (
-        db.query(Recipe)
-        .join(Favorite)
-        .filter(Favorite.user_id == user.user_id)
-        .filter(
-            or_(
-                func.lower(Recipe.title).like(f"%{clean_q}%"),
-            )
-        )
-        .order_by(Recipe.title)   # any ordering you like
-        .limit(limit)
-        .all()
-    )
-
-    if len(results) < 10:
-        more_results = (
-            db.query(Recipe)
-            .join(Favorite)
-            .filter(Favorite.user_id == user.user_id)
-            .filter(
-                or_(
-                    func.lower(Recipe.description).like(f"%{clean_q}%"),
-                )
-            )
-            .order_by(Recipe.title)   # any ordering you like
-            .limit(limit - len(results))
-            .all()
-        )
-        results.extend(more_results)
-
-    return results
+    # one in-memory index over the user's likes and saves, built on first search
+    results = collection_search.search(db, user.user_id, clean_q, limit, kinds)
+    ratings = load_rating_aggregates(db, [r["recipe_id"] for r in results])
+    cards = []
+    for result in results:
+        average_rating, total_ratings = ratings.get(result["recipe_id"], (None, 0))
+        cards.append({**result, "average_rating": average_rating, "total_ratings": total_ratings})
+    return cards
 
-def helper_search_saved_recipes(query: str, limit: int, user: User, db: Session):
-    clean_q = query.strip().lower()
-    if not clean_q:
-        raise HTTPException(400, detail="Query must not be empty")
+def helper_search_liked_recipes(query: str, limit: int, user: User, db: Session):
+    return _search_collections(query, limit, user, db, (LIKES,))
 
-    # Oracle doesn't have ILIKE, so we force both sides to lower-case
-    results = (
-        db.query(Recipe)
-        .join(Save)
-        .filter(Save.user_id == user.user_id)
-        .filter(
-            or_(
-                func.lower(Recipe.title).like(f"%{clean_q}%"),
-            )
-        )
-        .order_by(Recipe.title)   # any ordering you like
-        .limit(limit)
-        .all()
-    )
-
-    if len(results) < 10:
-        more_results = (
-            db.query(Recipe)
-            .join(Save)
-            .filter(Save.user_id == user.user_id)
-            .filter(
-                or_(
-                    func.lower(Recipe.description).like(f"%{clean_q}%"),
-                )
-            )
-            .order_by(Recipe.title)   # any ordering you like
-            .limit(limit - len(results))
-            .all()
-        )
-        results.extend(more_results)
-
-    return results
+def helper_search_saved_recipes(query: str, limit: int, user: User, db: Session):
+    return _search_collections(query, limit, user, db, (SAVES,))
 
 
 @router.get("/search/likes", response_model=List[RecipeSmallCard])
@@ -144,10 +122,5 @@ def search_saved_recipes(query: str, limit: int = 8, user: User = Depends(get_cu
 
 @router.get("/search", response_model=List[RecipeSmallCard])
 def search_recipes(query: str, limit: int = 8, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    clean_q = query.strip().lower()
-    if not clean_q:
-        raise HTTPException(400, detail="Query must not be empty")
-    
-    results = search_liked_recipes(query, limit // 2, user, db)
-    results.extend(search_saved_recipes(query, limit // 2, user, db))
-    return results
+    # likes and saves ranked together, a recipe in both collections appears once
+    return _search_collections(query, limit, user, db, (LIKES, SAVES))
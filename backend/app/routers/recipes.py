@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, Request, Response
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models.recipe import Recipe
@@ -7,21 +7,42 @@ from app.schemas.ingredient import IngredientInRecipe, IngredientInDBBase
 from app.schemas.category import CategoryInDBBase
 from app.schemas.review import ReviewInDBBase, ReviewBase
 from app.schemas.user import UserInDBBase
-from app.core.security import get_current_user 
+from app.core.security import get_current_user, get_current_user_id
 from datetime import datetime, timezone
 from app.models.user import User
 from app.models.category import Category, recipe_categories
 from app.models.ingredient import RecipeIngredient, Ingredient
 from app.models.review import Review
 from app.models.save import Save
-from sqlalchemy import func, text, or_, not_
+from app.models.favorite import Favorite
+from app.models.recipe_stats import RecipeStats
+from sqlalchemy import func, text, or_, not_, exists, case
+from sqlalchemy.orm import joinedload, selectinload
 import random
-from typing import List
+from typing import List, Optional
 from app.core.aws import generate_presigned_url  
+from app.core.etag import make_etag, etag_matches, not_modified, set_etag
+from app.core.response_cache import CachedRoute, add_cache_tags, cache_response, response_cache
+from app.core.pagination import NEXT_CURSOR_HEADER, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor, keyset_page
+from app.services.item_cooccurrence import cooccurrence_index
+from app.services.recommendation_service import exclusion_store
+from app.services.recipe_sampler import recipe_sampler, FEATURED_POOL
+from app.services.popularity import leaderboards, event_time, BOARDS, TRENDING_BOARD
+from app.services.recipe_stats import apply_recipe_stats, bump_recipe_stats, load_rating_aggregates
+from app.services.search_index import recipe_search_index, normalize_title, tokenize
+from app.services.search_cache import search_cache, RECIPE_SEARCH, INGREDIENT_SEARCH
+from app.services.fuzzy_title_index import fuzzy_title_index
+from app.services.ingredient_autocomplete import ingredient_autocomplete
+from app.services.pantry_index import pantry_index
+from app.services.category_index import category_index
+from app.services.collection_search import collection_search
 import os 
 from fastapi import File, Query
 
-router = APIRouter()
+router = APIRouter(route_class=CachedRoute)
+
+MAX_SEARCH_LIMIT = 50
+FUZZY_MIN_QUERY_LENGTH = 4
 
 @router.get("/", response_model=List[GroceryRecipe])
 def get_recipes(recipe_ids: List[str] = Query(None), db: Session = Depends(get_db)):
@@ -74,6 +95,7 @@ def create_recipe(recipe: RecipeBase, user: User = Depends(get_current_user), db
         db.commit()
 
     # Insert recipe_ingredients
+    used_ingredients = []
     if hasattr(recipe, "ingredients") and recipe.ingredients:
         for ingredient_data in recipe.ingredients:
             ingredient = db.query(Ingredient).filter(Ingredient.name == ingredient_data['name']).first()
@@ -83,6 +105,7 @@ def create_recipe(recipe: RecipeBase, user: User = Depends(get_current_user), db
                 )
                 db.add(ingredient)
                 db.flush()
+            used_ingredients.append(ingredient)
 
             recipe_ingredient = RecipeIngredient(
                 recipe_id=new_recipe.recipe_id,
@@ -93,6 +116,32 @@ def create_recipe(recipe: RecipeBase, user: User = Depends(get_current_user), db
 
         db.commit()
 
+    recipe_sampler.add_recipe(new_recipe.recipe_id, recipe.category_ids)
+    category_index.add_recipe(new_recipe, recipe.category_ids)
+    fuzzy_title_index.add(new_recipe.recipe_id, new_recipe.title, new_recipe.image_url)
+    recipe_search_index.add_recipe(
+        new_recipe.recipe_id,
+        new_recipe.title,
+        new_recipe.description,
+        new_recipe.image_url,
+        [ingredient_data['name'] for ingredient_data in recipe.ingredients or []]
+    )
+    # new ingredients become searchable and every used one moves up the autocomplete ranking
+    for ingredient in used_ingredients:
+        ingredient_autocomplete.record_usage(ingredient.ingredient_id, ingredient.name)
+    pantry_index.add_recipe(new_recipe.recipe_id, [ingredient.ingredient_id for ingredient in used_ingredients])
+
+    # drop cached searches this recipe could now appear in
+    new_tokens = set(tokenize(" ".join(
+        [new_recipe.title, new_recipe.description or ""] + [i.name for i in used_ingredients]
+    )))
+    search_cache.invalidate(
+        RECIPE_SEARCH,
+        lambda q: any(t.startswith(token) for token in tokenize(q) for t in new_tokens)
+    )
+    ingredient_names = [" ".join(i.name.lower().split()) for i in used_ingredients]
+    search_cache.invalidate(INGREDIENT_SEARCH, lambda q: any(q in name for name in ingredient_names))
+    response_cache.invalidate(f"posts:{user.user_id}")
 
     return new_recipe
 
@@ -104,6 +153,11 @@ def get_presigned_url():
 @router.get("/featured", response_model=SimpleRecipe)
 def get_featured_recipes(db: Session = Depends(get_db)):
     # get one featured recipe that has average rating over 4.5
+    sampled = recipe_sampler.sample(FEATURED_POOL, 1)
+    if sampled:
+        return db.query(Recipe).filter(Recipe.recipe_id == sampled[0]).first()
+
+    # sampler not loaded yet, fall back to the database
     subquery = (
         db.query(Recipe.recipe_id)
         .join(Review)
@@ -118,35 +172,213 @@ def get_featured_recipes(db: Session = Depends(get_db)):
 
     return featured_recipe
 
-@router.get("/category/{category}", response_model=List[RecipeSmallCard])
-def get_recipes_by_category(category: str, db: Session = Depends(get_db)):
-    # find the category id first, case insensitive
-    category = db.query(Category).filter(func.lower(Category.name) == category.strip().lower()).first()
-
-    # find recipes that has the category id in its recipe.category
-    recipes = db.query(Recipe).join(Recipe.categories).filter(Category.category_id == category.category_id).all()
-
-    # ramdomly pick 10 results
-    recipes = random.sample(recipes, 10)
-
-    for recipe in recipes:
-        total_ratings = len(recipe.reviews)
-        average_rating = sum(review.rating for review in recipe.reviews) / len(recipe.reviews) if recipe.reviews else None
-        recipe.average_rating = average_rating
-        recipe.total_ratings = total_ratings
+@router.get("/popular", response_model=List[RecipeSmallCard])
+def get_popular_recipes(board: str = TRENDING_BOARD, limit: int = 10, db: Session = Depends(get_db)):
+    # boards: all_time (favorites), trending (decayed favorites + saves), top_rated
+    if board not in BOARDS:
+        raise HTTPException(status_code=400, detail=f"Unknown board, expected one of {', '.join(BOARDS)}")
+
+    ranked = [recipe_id for recipe_id, _ in leaderboards.top(board, min(limit, 50))]
+    order = {recipe_id: i for i, recipe_id in enumerate(ranked)}
+    recipes = db.query(Recipe).filter(Recipe.recipe_id.in_(ranked)).all() if ranked else []
+    recipes.sort(key=lambda r: order[r.recipe_id])
+
+    return apply_recipe_stats(db, recipes)
+
+@router.get("/pantry", response_model=List[RecipeSmallCard])
+def get_pantry_recipes(
+    response: Response,
+    ingredient_ids: List[int] = Query(None),
+    ingredients: List[str] = Query(None),
+    max_missing: Optional[int] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    # without max_missing: recipes that use every given ingredient (simplest first)
+    # with max_missing: recipes the pantry nearly covers, fewest missing ingredients first
+    pantry = set(ingredient_ids or [])
+    names = {name.strip().lower() for name in ingredients or [] if name.strip()}
+    if names:
+        found = db.query(func.lower(Ingredient.name), Ingredient.ingredient_id).filter(
+            func.lower(Ingredient.name).in_(names)
+        ).all()
+        # a typo would otherwise quietly shrink the pantry
+        unknown = names - {name for name, _ in found}
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown ingredients: {', '.join(sorted(unknown))}")
+        pantry.update(ingredient_id for _, ingredient_id in found)
+    if not pantry:
+        raise HTTPException(status_code=400, detail="Give at least one ingredient")
+    if max_missing is not None and max_missing < 0:
+        raise HTTPException(status_code=400, detail="max_missing must not be negative")
+
+    if not len(pantry_index):
+        # index not loaded yet: count matched and total ingredients per candidate recipe in the database
+        matched = func.count(func.distinct(case(
+            (RecipeIngredient.ingredient_id.in_(pantry), RecipeIngredient.ingredient_id)
+        )))
+        candidates = db.query(RecipeIngredient.recipe_id).filter(RecipeIngredient.ingredient_id.in_(pantry))
+        rows = db.query(
+            RecipeIngredient.recipe_id, matched, func.count(func.distinct(RecipeIngredient.ingredient_id))
+        ).filter(RecipeIngredient.recipe_id.in_(candidates)).group_by(RecipeIngredient.recipe_id).all()
+        if max_missing is None:
+            ranked = [(recipe_id, [size, recipe_id]) for recipe_id, hits, size in rows if hits == len(pantry)]
+        else:
+            ranked = [
+                (recipe_id, [size - hits, -hits, recipe_id])
+                for recipe_id, hits, size in rows if size - hits <= max_missing
+            ]
+        ranked.sort(key=lambda item: item[1])
+    elif max_missing is None:
+        ranked = [(recipe_id, [size, recipe_id]) for recipe_id, size in pantry_index.containing_all(pantry)]
+    else:
+        ranked = [
+            (recipe_id, [missing, -matched, recipe_id])
+            for recipe_id, matched, missing in pantry_index.by_coverage(pantry, max_missing)
+        ]
+
+    try:
+        after = decode_cursor(cursor, 2 if max_missing is None else 3, (int, int, int))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if after is not None:
+        ranked = [item for item in ranked if item[1] > after]
+
+    limit = min(limit, MAX_SEARCH_LIMIT)
+    page = ranked[:limit]
+    if len(ranked) > limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1][1])
+
+    order = {recipe_id: i for i, (recipe_id, _) in enumerate(page)}
+    recipes = db.query(Recipe).filter(Recipe.recipe_id.in_(list(order))).all() if order else []
+    recipes.sort(key=lambda r: order[r.recipe_id])
+    return apply_recipe_stats(db, recipes)
+
+def _find_category_id(category: str, db: Session) -> int:
+    # case insensitive; categories added since startup are looked up once and remembered
+    category_id = category_index.category_id(category)
+    if category_id is None:
+        found = db.query(Category).filter(func.lower(Category.name) == category.strip().lower()).first()
+        if found is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+        category_id = found.category_id
+        category_index.add_category(category_id, found.name)
+    return category_id
+
+def _with_ratings(cards, db: Session):
+    ratings = load_rating_aggregates(db, [card["recipe_id"] for card in cards])
+    results = []
+    for card in cards:
+        average_rating, total_ratings = ratings.get(card["recipe_id"], (None, 0))
+        results.append({**card, "average_rating": average_rating, "total_ratings": total_ratings})
+    return results
 
-    return recipes
+@router.get("/category/{category}", response_model=List[RecipeSmallCard])
+def get_recipes_by_category(category: str, limit: int = 10, db: Session = Depends(get_db)):
+    category_id = _find_category_id(category, db)
+    limit = min(limit, MAX_SEARCH_LIMIT)
+
+    # random picks from the in-memory category index
+    if len(category_index):
+        return _with_ratings(category_index.sample(category_id, limit), db)
+
+    # index not loaded yet: sample ids in the database, load only the picks
+    recipe_ids = [
+        r for (r,) in db.query(recipe_categories.c.recipe_id).filter(recipe_categories.c.category_id == category_id)
+    ]
+    picks = random.sample(recipe_ids, min(limit, len(recipe_ids)))
+    recipes = db.query(Recipe).filter(Recipe.recipe_id.in_(picks)).all() if picks else []
+    return apply_recipe_stats(db, recipes)
+
+@router.get("/category/{category}/all", response_model=List[RecipeSmallCard])
+def browse_category(
+    category: str,
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    # every recipe in the category, newest first, one page at a time
+    category_id = _find_category_id(category, db)
+    if not len(category_index):
+        query = db.query(Recipe).join(
+            recipe_categories, recipe_categories.c.recipe_id == Recipe.recipe_id
+        ).filter(recipe_categories.c.category_id == category_id)
+        recipes = keyset_page(query, [Recipe.recipe_id], cursor, limit, response)
+        return apply_recipe_stats(db, recipes)
+
+    try:
+        after = decode_cursor(cursor, 1, (int,))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    cards, more = category_index.page(category_id, limit, before=after[0] if after else None)
+    if more:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([cards[-1]["recipe_id"]])
+    return _with_ratings(cards, db)
 
 @router.get("/details/{recipe_id}", response_model=RecipeDetail)
-def get_recipe_details(recipe_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    recipe = db.query(Recipe).filter(Recipe.recipe_id == recipe_id).first()
+@cache_response(ttl=300, tags=("recipe:{recipe_id}",), vary_by_auth=True)
+def get_recipe_details(
+    recipe_id: int,
+    request: Request,
+    response: Response,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # version stamp first: a repeat view is answered with 304 before the
+    # recipe, its reviews and ingredients are loaded
+    stamp = (
+        db.query(
+            Recipe.updated_at,
+            RecipeStats.updated_at,
+            db.query(func.count(Review.review_id)).filter(Review.recipe_id == recipe_id).scalar_subquery(),
+            db.query(func.max(Review.created_at)).filter(Review.recipe_id == recipe_id).scalar_subquery(),
+            # Oracle has no boolean select items, so EXISTS goes through CASE
+            case((exists().where(Save.user_id == user.user_id, Save.recipe_id == recipe_id), 1), else_=0),
+        )
+        .outerjoin(RecipeStats, RecipeStats.recipe_id == Recipe.recipe_id)
+        .filter(Recipe.recipe_id == recipe_id)
+        .first()
+    )
+    if stamp is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    etag = make_etag(recipe_id, user.user_id, *stamp)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    # load everything the page needs up front: one query per relationship
+    # instead of one per review / ingredient
+    recipe = (
+        db.query(Recipe)
+        .options(
+            joinedload(Recipe.user),
+            joinedload(Recipe.stats),
+            selectinload(Recipe.ingredients).joinedload(RecipeIngredient.ingredient),
+            selectinload(Recipe.categories),
+            selectinload(Recipe.reviews),
+        )
+        .filter(Recipe.recipe_id == recipe_id)
+        .first()
+    )
 
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
-    review_count = len(recipe.reviews)
-    favorite_count = len(recipe.favorites)
-    average_rating = sum(review.rating for review in recipe.reviews) / review_count if review_count > 0 else None
+    # counts come from recipe_stats; a recipe without a stats row yet falls
+    # back to the reviews already loaded and one COUNT of favorites
+    if recipe.stats is not None:
+        review_count = recipe.stats.review_count
+        average_rating = recipe.stats.average_rating
+        favorite_count = recipe.stats.favorite_count
+    else:
+        review_count = len(recipe.reviews)
+        average_rating = sum(review.rating for review in recipe.reviews) / review_count if review_count > 0 else None
+        favorite_count = db.query(func.count(Favorite.user_id)).filter(Favorite.recipe_id == recipe_id).scalar()
+
+    is_saved = bool(stamp[4])
 
     recipe_details = RecipeDetail(
         recipe_id=recipe.recipe_id,
@@ -169,27 +401,72 @@ def get_recipe_details(recipe_id: int, user: User = Depends(get_current_user), d
         average_rating=average_rating,
         reviews_count=review_count,
         favorites_count=favorite_count,
-        is_saved=False
+        is_saved=is_saved
     )
 
-    # Just add the username to each review after validation
+    # Just add the username to each review after validation, all authors in one query
+    author_ids = {review.user_id for review in recipe_details.reviews}
+    usernames = dict(
+        db.query(User.user_id, User.username).filter(User.user_id.in_(author_ids)).all()
+    ) if author_ids else {}
     for review in recipe_details.reviews:
-        user = db.query(User).filter(User.user_id == review.user_id).first()
-        review.user_name = user.username if user else "Unknown"
-
-    for save in user.saves:
-        if save.recipe_id == recipe_id:
-            recipe_details.is_saved = True
-            break
+        review.user_name = usernames.get(review.user_id, "Unknown")
 
+    # the author's and reviewers' names and images are part of the cached page
+    add_cache_tags(response, *sorted({f"user:{user_id}" for user_id in author_ids | {recipe.user_id}}))
     return recipe_details
 
 @router.get("/search", response_model=List[SimpleRecipe])
-def search_recipes(query: str, db: Session = Depends(get_db)):
+def search_recipes(
+    query: str,
+    response: Response,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     clean_q = query.strip().lower()
     if not clean_q:
         raise HTTPException(400, detail="Query must not be empty")
 
+    # served from the in-memory index: BM25 over title, description and ingredients
+    if len(recipe_search_index):
+        try:
+            after = decode_cursor(cursor, 2, (float, int))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        limit = min(limit, MAX_SEARCH_LIMIT)
+
+        cached = search_cache.get(RECIPE_SEARCH, clean_q, limit, cursor)
+        if cached is not None:
+            results, next_cursor = cached
+            if next_cursor:
+                response.headers[NEXT_CURSOR_HEADER] = next_cursor
+            return results
+
+        hits, next_after = recipe_search_index.search(
+            clean_q, limit=limit, after=tuple(after) if after else None
+        )
+        results = [recipe_search_index.payload(recipe_id) for recipe_id, _ in hits]
+        next_cursor = encode_cursor(list(next_after)) if next_after is not None else None
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        elif len(results) < limit and len(clean_q) >= FUZZY_MIN_QUERY_LENGTH:
+            # last page came up short (often a typo): top up with trigram matches
+            # that the exact/prefix search did not already return
+            matched = {recipe_id for recipe_id, _ in recipe_search_index.rank(clean_q)}
+            titles = {normalize_title(r["title"]) for r in results}
+            for payload, _ in fuzzy_title_index.search(clean_q, limit, exclude=matched):
+                if len(results) >= limit:
+                    break
+                if normalize_title(payload["title"]) not in titles:
+                    results.append(payload)
+        search_cache.put(RECIPE_SEARCH, clean_q, (limit, cursor), (results, next_cursor))
+        return results
+
+    # index not loaded yet, fall back to LIKE scans (single page, no cursor)
+    return _search_recipes_in_db(clean_q, db)
+
+def _search_recipes_in_db(clean_q: str, db: Session):
     # make sure that all the recipes are unique
     limit = 5
     seen = set()
@@ -239,33 +516,45 @@ def search_recipes(query: str, db: Session = Depends(get_db)):
     return results
 
 @router.patch("/save/{recipe_id}")
-def save_recipe(recipe_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def save_recipe(recipe_id: int, user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db)):
     recipe = db.query(Recipe).filter(Recipe.recipe_id == recipe_id).first()
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
     save = Save(
-        user_id=user.user_id,
+        user_id=user_id,
         recipe_id=recipe_id,
         saved_at=datetime.now(timezone.utc),
     )
     db.add(save)
+    bump_recipe_stats(db, recipe_id, saves=1)
     db.commit()
+    cooccurrence_index.add(user_id, recipe_id, "save")
+    exclusion_store.add(user_id, recipe_id)
+    leaderboards.record_save(recipe_id)
+    collection_search.add(db, user_id, recipe_id, "save")
+    response_cache.invalidate(f"recipe:{recipe_id}")
 
     return {"message": "Recipe saved"}
 
 @router.patch("/unsave/{recipe_id}")
-def unsave_recipe(recipe_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def unsave_recipe(recipe_id: int, user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db)):
     recipe = db.query(Recipe).filter(Recipe.recipe_id == recipe_id).first()
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
-    save = db.query(Save).filter(Save.user_id == user.user_id, Save.recipe_id == recipe_id).first()
+    save = db.query(Save).filter(Save.user_id == user_id, Save.recipe_id == recipe_id).first()
     if not save:
         raise HTTPException(status_code=404, detail="Save not found")
     
+    saved_at = event_time(save.saved_at)
     db.delete(save)
+    bump_recipe_stats(db, recipe_id, saves=-1)
     db.commit()
+    cooccurrence_index.remove(user_id, recipe_id, "save")
+    leaderboards.record_unsave(recipe_id, saved_at)
+    collection_search.remove(user_id, recipe_id, "save")
+    response_cache.invalidate(f"recipe:{recipe_id}")
     return {"message": "Recipe unsaved"}
 
 
@@ -274,7 +563,14 @@ def search_ingredients(query: str, limit: int = 8, db: Session = Depends(get_db)
     clean_q = query.strip().lower()
     if not clean_q:
         raise HTTPException(400, detail="Query must not be empty")
-    
+
+    # prefix trie ranked by how many recipes use each ingredient
+    if len(ingredient_autocomplete):
+        results = search_cache.get(INGREDIENT_SEARCH, clean_q, limit)
+        if results is None:
+            results = ingredient_autocomplete.search(clean_q, limit)
+            search_cache.put(INGREDIENT_SEARCH, clean_q, (limit,), results)
+        return results
 
     results = (
         db.query(Ingredient)
@@ -306,8 +602,13 @@ def create_review(recipe_id: int, review: ReviewBase, user: User = Depends(get_c
         created_at=datetime.now(timezone.utc),
     )
     db.add(new_review)
+    bump_recipe_stats(db, recipe_id, rating=review.rating, reviews=1)
     db.commit()
     db.refresh(new_review)
+    recipe_sampler.add_rating(recipe_id, review.rating)
+    leaderboards.record_review(recipe_id, review.rating)
+    # the owner's post list shows the recipe's rating too
+    response_cache.invalidate(f"recipe:{recipe_id}", f"posts:{recipe.user_id}")
 
     new_review.user_name = user.username
 
@@ -3,16 +3,25 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_current_user_id
 from app.models.user import User
 from app.models.recipe import Recipe
 from app.schemas.recipe import RecipeSmallCard
-from app.schemas.recommendation import InteractionCreate, RecommendationResponse
+from app.schemas.recommendation import (
+    InteractionCreate,
+    InteractionBatchCreate,
+    InteractionBatchResponse,
+    InteractionResult,
+    RecommendationResponse
+)
+from app.core.config import settings
 from app.services.recommendation_service import (
     calculate_user_similarity,
     generate_recommendations,
     get_next_recommendations,
-    record_interaction
+    record_interactions,
+    submit_interaction,
+    refill_worker
 )
 
 router = APIRouter()
@@ -33,29 +42,11 @@ def get_recommendations(
         print(f"Error in recommendation endpoint: {e}")
         return []
 
-# @router.get("/", response_model=List[RecipeSmallCard])
-# def get_recommendations(
-#     limit: int = 5,
-#     user: User = Depends(get_current_user), 
-#     db: Session = Depends(get_db)
-# ):
-#     """Get personalized recipe recommendations for the user to swipe on."""
-#     recipes = get_next_recommendations(db, user.user_id, limit)
-#     print(f"got these recipes in GET_RECOMMENDATIONS via get_next route:\n {len(recipes)}")
-    
-#     if not recipes:
-#         # Generate recommendations if none exist
-#         generate_recommendations(db, user.user_id)
-#         recipes = get_next_recommendations(db, user.user_id, limit)
-#     print(f"got these recipes in GET_RECOMMENDATIONS via gen_recs + get_next route:\n {len(recipes)}")
-    
-#     return recipes
-
 @router.post("/interactions")
 def create_interaction(
     interaction: InteractionCreate,
     background_tasks: BackgroundTasks,
-    user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """Record a user's interaction with a recipe (like, save, dislike)."""
@@ -63,18 +54,72 @@ def create_interaction(
         raise HTTPException(status_code=400, detail="Invalid interaction type")
     
     # Check if recipe exists
-    recipe = db.query(Recipe).filter(Recipe.recipe_id == interaction.recipe_id).first()
+    recipe = db.query(Recipe.recipe_id).filter(Recipe.recipe_id == interaction.recipe_id).first()
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
-    # Record the interaction
-    record_interaction(db, user.user_id, interaction.recipe_id, interaction.interaction_type)
+    # Record the interaction (queued for the background flusher in write-behind mode)
+    submit_interaction(db, user_id, interaction.recipe_id, interaction.interaction_type)
     
     # Schedule similarity recalculation in the background
     # background_tasks.add_task(calculate_user_similarity, db, user.user_id)
     
     return {"status": "success"}
 
+@router.post("/interactions/batch", response_model=InteractionBatchResponse)
+def create_interactions_batch(
+    batch: InteractionBatchCreate,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """Record a whole swipe session in one request and one transaction."""
+    if len(batch.interactions) > settings.INTERACTION_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.INTERACTION_BATCH_MAX} interactions per batch"
+        )
+
+    # validate every recipe id with a single query
+    recipe_ids = {i.recipe_id for i in batch.interactions}
+    existing_ids = {
+        r.recipe_id for r in db.query(Recipe.recipe_id).filter(Recipe.recipe_id.in_(recipe_ids))
+    } if recipe_ids else set()
+
+    results = []
+    to_record = []
+    seen = set()
+    for interaction in batch.interactions:
+        key = (interaction.recipe_id, interaction.interaction_type)
+        if interaction.interaction_type not in ['like', 'save', 'dislike']:
+            status = "invalid_type"
+        elif interaction.recipe_id not in existing_ids:
+            status = "recipe_not_found"
+        elif key in seen:
+            status = "duplicate"
+        else:
+            status = "recorded"
+            seen.add(key)
+            to_record.append(key)
+        results.append(InteractionResult(
+            recipe_id=interaction.recipe_id,
+            interaction_type=interaction.interaction_type,
+            status=status
+        ))
+
+    try:
+        failed = set(record_interactions(db, user_id, to_record))
+    except Exception as e:
+        db.rollback()
+        print(f"Error recording interaction batch: {e}")
+        raise HTTPException(status_code=500, detail="Could not record interactions")
+
+    # pairs the database rejected are reported per item; the rest are committed
+    for result in results:
+        if result.status == "recorded" and (result.recipe_id, result.interaction_type) in failed:
+            result.status = "failed"
+
+    return InteractionBatchResponse(recorded=len(to_record) - len(failed), results=results)
+
 @router.post("/refresh")
 def refresh_recommendations(
     background_tasks: BackgroundTasks,
@@ -82,82 +127,6 @@ def refresh_recommendations(
     db: Session = Depends(get_db)
 ):
     """Force refresh recommendations for the user."""
-    print("IN REFRESH: ADDED GENERATE_RECOMMENDATIONS TO BACKGROUND TASKS")
-    background_tasks.add_task(generate_recommendations, db, user.user_id)
+    # the refill worker opens its own session, the request session is closed by then
+    refill_worker.schedule(user.user_id)
     return {"status": "Refreshing recommendations"}
-
-
-
-
-
-
-# from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-# from sqlalchemy.orm import Session
-# from typing import List
-
-# from app.core.database import get_db
-# from app.core.security import get_current_user
-# from app.models.user import User
-# from app.models.recipe import Recipe
-# from app.schemas.recipe import RecipeSmallCard
-# from app.schemas.recommendation import InteractionCreate, RecommendationResponse
-# from app.models.dislike import Dislike
-# from app.models.recommendation import RecipeRecommendation
-# from app.services.recommendation_service import (
-#     calculate_user_similarity,
-#     generate_recommendations,
-#     get_next_recommendations,
-#     record_interaction
-# )
-
-# router = APIRouter()
-
-# @router.get("/", response_model=List[RecipeSmallCard])
-# def get_recommendations(
-#     limit: int = 5,
-#     user: User = Depends(get_current_user), 
-#     db: Session = Depends(get_db)
-# ):
-#     """Get personalized recipe recommendations for the user to swipe on."""
-#     recipes = get_next_recommendations(db, user.user_id, limit)
-    
-#     if not recipes:
-#         # Generate recommendations if none exist
-#         generate_recommendations(db, user.user_id)
-#         recipes = get_next_recommendations(db, user.user_id, limit)
-    
-#     return recipes
-
-# @router.post("/interactions")
-# def create_interaction(
-#     interaction: InteractionCreate,
-#     background_tasks: BackgroundTasks,
-#     user: User = Depends(get_current_user),
-#     db: Session = Depends(get_db)
-# ):
-#     """Record a user's interaction with a recipe (like, save, dislike)."""
-#     if interaction.interaction_type not in ['like', 'save', 'dislike']:
-#         raise HTTPException(status_code=400, detail="Invalid interaction type")
-    
-#     # Check if recipe exists
-#     recipe = db.query(Recipe).filter(Recipe.recipe_id == interaction.recipe_id).first()
-#     if not recipe:
-#         raise HTTPException(status_code=404, detail="Recipe not found")
-    
-#     # Record the interaction
-#     record_interaction(db, user.user_id, interaction.recipe_id, interaction.interaction_type)
-    
-#     # Schedule similarity recalculation in the background
-#     background_tasks.add_task(calculate_user_similarity, db, user.user_id)
-    
-#     return {"status": "success"}
-
-# @router.post("/refresh")
-# def refresh_recommendations(
-#     background_tasks: BackgroundTasks,
-#     user: User = Depends(get_current_user),
-#     db: Session = Depends(get_db)
-# ):
-#     """Force refresh recommendations for the user."""
-#     background_tasks.add_task(generate_recommendations, db, user.user_id)
-#     return {"status": "Refreshing recommendations"}
@@ -1,38 +1,59 @@
-from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from typing import List, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, UploadFile, File
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.security import get_current_user, principal_cache
+from app.core.etag import make_etag, etag_matches, not_modified, set_etag
+from app.core.response_cache import CachedRoute, cache_response, response_cache
+from app.core.pagination import MAX_PAGE_SIZE, keyset_page
 from app.models.user import User, follows
 from app.models.recipe import Recipe as RecipeModel
 from app.schemas.user import User as UserSchema, UserCreate, UserUpdate, UserWithFollow
 from app.schemas.recipe import Recipe, RecipeSmallCard
-from app.crud.user import get_user, get_users, create_user, update_user, delete_user, follow_user, unfollow_user, get_follow_stats
+from app.crud.user import get_user, get_users, create_user, update_user, delete_user, follow_user, unfollow_user, get_profile_stamp
 from app.core.aws import generate_presigned_url_profile 
+from app.services.recipe_stats import apply_recipe_stats
 from app.schemas.user import ProfileImageUpdate  
 
 # from app.crud.recipe import get_recipes
 
-router = APIRouter()
+router = APIRouter(route_class=CachedRoute)
 
 @router.get("/", response_model=List[UserSchema])
 def read_users(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    limit: int = MAX_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True, description="Use cursor instead"),
     db: Session = Depends(get_db)
 ):
-    """Get all users with pagination"""
-    users = get_users(db, skip=skip, limit=limit)
+    """Get all users with cursor pagination"""
+    if skip and not cursor:
+        # OFFSET paging for older clients
+        return get_users(db, skip=skip, limit=min(limit, MAX_PAGE_SIZE))
+    users = keyset_page(db.query(User), [User.user_id], cursor, limit, response, descending=False)
     return users
 
+FOLLOW_STATS = ("followers_count", "following_count", "save_count", "like_count")
+POSTS_STAMP = ("posts_count", "posts_updated_at", "posts_stats_updated_at")
+
 @router.get("/me", response_model=UserWithFollow)
 def read_user_me(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get current user"""
-    stats = get_follow_stats(db, current_user.user_id)
+    stats = get_profile_stamp(db, current_user.user_id)
+    etag = make_etag(
+        current_user.user_id, current_user.username, current_user.email, current_user.profile_image,
+        *(stats[key] for key in FOLLOW_STATS)
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
         
     # create a dictionary with user attributes and stats
     user_dict = {
@@ -61,12 +82,7 @@ def helper_get_user_posts(limit: int, db: Session, user_id: int):
     else:
         posts = db.query(RecipeModel).filter(RecipeModel.user_id == user_id).order_by(RecipeModel.created_at.desc()).limit(limit).all()
 
-    for post in posts:
-        total_ratings = len(post.reviews)
-        average_rating = sum(review.rating for review in post.reviews) / len(post.reviews) if post.reviews else None
-        post.average_rating = average_rating
-        post.total_ratings = total_ratings
-    return posts
+    return apply_recipe_stats(db, posts)
 
 @router.get("/generate-presigned-url-profile")
 def get_presigned_url_profile():
@@ -83,32 +99,54 @@ def update_profile_image(
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
+    principal_cache.invalidate(current_user.user_id)
+    response_cache.invalidate(f"user:{current_user.user_id}")
     return current_user
 
 @router.get("/posts/{user_id}", response_model=List[RecipeSmallCard])
+@cache_response(ttl=120, tags=("posts:{user_id}", "user:{user_id}"))
 def read_user_posts(
     user_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get user posts"""
-    posts = helper_get_user_posts(0, db, user_id)
-    return posts
+    """Get user posts, newest first"""
+    query = db.query(RecipeModel).filter(RecipeModel.user_id == user_id)
+    posts = keyset_page(query, [RecipeModel.created_at, RecipeModel.recipe_id], cursor, limit, response)
+    return apply_recipe_stats(db, posts)
 
 @router.get("/{user_id}", response_model=UserWithFollow)
-def read_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def read_user(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     """Get a user by ID"""
     user = get_user(db, user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
         
-    stats = get_follow_stats(db, user_id)
-
-    posts = helper_get_user_posts(10, db, user_id)
+    stats = get_profile_stamp(db, user_id)
 
     if (current_user.user_id != user_id):
         is_following = db.query(follows).filter(follows.c.follower_id == current_user.user_id, follows.c.following_id == user_id).first() is not None
     else:
         is_following = None
+
+    # answer repeat views before the posts are loaded and serialised
+    etag = make_etag(
+        user.user_id, user.username, user.email, user.profile_image, current_user.user_id, is_following,
+        *(stats[key] for key in FOLLOW_STATS + POSTS_STAMP)
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    posts = helper_get_user_posts(10, db, user_id)
     
     user_dict = {
         "user_id": user.user_id,
@@ -202,31 +240,37 @@ def unfollow_user_endpoint(
 @router.get("/followers/{user_id}", response_model=List[UserSchema])
 def read_user_followers(
     user_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get all users who follow the specified user"""
-    # Query all users who follow this user (users where this user is being followed)
-    followers = db.query(User).join(
+    """Get the users who follow the specified user"""
+    # Query users who follow this user (users where this user is being followed)
+    query = db.query(User).join(
         follows, 
         follows.c.follower_id == User.user_id
     ).filter(
         follows.c.following_id == user_id
-    ).all()
+    )
     
-    return followers
+    return keyset_page(query, [User.user_id], cursor, limit, response, descending=False)
 
 @router.get("/following/{user_id}", response_model=List[UserSchema])
 def read_user_following(
     user_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get all users that the specified user follows"""
-    # Query all users that this user follows (users that are being followed by this user)
-    following = db.query(User).join(
+    """Get the users that the specified user follows"""
+    # Query users that this user follows (users that are being followed by this user)
+    query = db.query(User).join(
         follows, 
         follows.c.following_id == User.user_id
     ).filter(
         follows.c.follower_id == user_id
-    ).all()
+    )
     
-    return following
\ No newline at end of file
+    return keyset_page(query, [User.user_id], cursor, limit, response, descending=False)
\ No newline at end of file
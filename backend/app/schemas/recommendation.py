@@ -7,6 +7,18 @@ class InteractionCreate(BaseModel):
     recipe_id: int
     interaction_type: str  # 'like', 'save', 'dislike'
 
+class InteractionBatchCreate(BaseModel):
+    interactions: List[InteractionCreate]
+
+class InteractionResult(BaseModel):
+    recipe_id: int
+    interaction_type: str
+    status: str  # 'recorded', 'duplicate', 'invalid_type', 'recipe_not_found', 'failed'
+
+class InteractionBatchResponse(BaseModel):
+    recorded: int
+    results: List[InteractionResult]
+
 class RecommendationBase(BaseModel):
     recipe_id: int
     recommendation_score: float
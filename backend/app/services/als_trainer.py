@@ -0,0 +1,149 @@
+import os
+import shutil
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.core.config import settings
+from app.services.similarity_service import InteractionMatrix, load_interaction_matrix
+
+# file names inside a version directory, read back by app.services.embedding_store
+USER_FACTORS_FILE = "user_factors.npy"
+USER_IDS_FILE = "user_ids.npy"
+RECIPE_FACTORS_FILE = "recipe_factors.npy"
+RECIPE_IDS_FILE = "recipe_ids.npy"
+
+# settings.EMBEDDINGS_DIR/CURRENT names the version directory to serve
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 2
+
+
+def _solve(
+    fixed: np.ndarray,
+    confidence: sparse.csr_matrix,
+    preference: sparse.csr_matrix,
+    regularization: float,
+) -> np.ndarray:
+    """One ALS half-step: solve every row of the other side against `fixed`."""
+    n_rows, n_factors = confidence.shape[0], fixed.shape[1]
+    gram = fixed.T @ fixed
+    identity = regularization * np.eye(n_factors)
+    solved = np.zeros((n_rows, n_factors), dtype=np.float64)
+
+    for row in range(n_rows):
+        start, end = confidence.indptr[row], confidence.indptr[row + 1]
+        if start == end:
+            continue
+        cols = confidence.indices[start:end]
+        conf = confidence.data[start:end]
+        pref = preference.data[start:end]
+        factors = fixed[cols]
+
+        # Y^T C_u Y = Y^T Y + Y_u^T (C_u - I) Y_u, only observed entries differ from 1
+        a = gram + (factors.T * (conf - 1.0)) @ factors + identity
+        b = (factors.T * conf) @ pref
+        solved[row] = np.linalg.solve(a, b)
+
+    return solved
+
+
+def train_als(
+    interactions: InteractionMatrix,
+    factors: int = 32,
+    regularization: float = 0.1,
+    alpha: float = 20.0,
+    iterations: int = 10,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Implicit-feedback ALS (Hu, Koren & Volinsky) on the weighted interaction matrix.
+
+    Favorites and saves are positive preferences; dislikes are observed
+    zeros, so they still raise the confidence that the user does not want
+    the recipe. Returns (user_factors, recipe_factors) as float32 arrays.
+    """
+    matrix = interactions.matrix.tocsr()
+    n_users, n_recipes = matrix.shape
+
+    confidence = matrix.copy()
+    confidence.data = 1.0 + alpha * np.abs(confidence.data)
+    preference = matrix.copy()
+    preference.data = (preference.data > 0).astype(np.float64)
+
+    confidence_t = confidence.T.tocsr()
+    preference_t = preference.T.tocsr()
+
+    rng = np.random.default_rng(seed)
+    user_factors = rng.normal(scale=0.01, size=(n_users, factors))
+    recipe_factors = rng.normal(scale=0.01, size=(n_recipes, factors))
+
+    for iteration in range(iterations):
+        started = time.perf_counter()
+        user_factors = _solve(recipe_factors, confidence, preference, regularization)
+        recipe_factors = _solve(user_factors, confidence_t, preference_t, regularization)
+        print(f"ALS iteration {iteration + 1}/{iterations} took {time.perf_counter() - started:.2f}s")
+
+    return user_factors.astype(np.float32), recipe_factors.astype(np.float32)
+
+
+def current_embeddings_dir(directory: str) -> Optional[str]:
+    """The version directory CURRENT points at, or None before the first training run."""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(directory, version) if version else None
+
+
+def save_embeddings(
+    directory: str,
+    interactions: InteractionMatrix,
+    user_factors: np.ndarray,
+    recipe_factors: np.ndarray,
+) -> str:
+    """Write factors and their id arrays as .npy files the API can memory-map.
+
+    The four files go into a fresh version directory and CURRENT is switched
+    to it with one rename, so a loading worker sees either the old set or the
+    new one, never ids from one run with factors from another.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = f"v{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+    tmp_dir = os.path.join(directory, f".{version}.tmp")
+    os.makedirs(tmp_dir)
+    for name, array in (
+        (USER_IDS_FILE, interactions.user_ids.astype(np.int64)),
+        (RECIPE_IDS_FILE, interactions.recipe_ids.astype(np.int64)),
+        (USER_FACTORS_FILE, user_factors),
+        (RECIPE_FACTORS_FILE, recipe_factors),
+    ):
+        np.save(os.path.join(tmp_dir, name), np.ascontiguousarray(array))
+    os.rename(tmp_dir, os.path.join(directory, version))
+
+    pointer = os.path.join(directory, f".{CURRENT_FILE}.tmp")
+    with open(pointer, "w") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    # workers still mapping the previous version keep it until they reload
+    versions = sorted(name for name in os.listdir(directory) if name.startswith("v"))
+    for old in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+    return os.path.join(directory, version)
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        interactions = load_interaction_matrix(db)
+    finally:
+        db.close()
+
+    print(f"Training ALS on {interactions.shape[0]} users x {interactions.shape[1]} recipes")
+    user_factors, recipe_factors = train_als(interactions)
+    save_embeddings(settings.EMBEDDINGS_DIR, interactions, user_factors, recipe_factors)
+    print(f"Wrote embeddings to {settings.EMBEDDINGS_DIR}")
@@ -0,0 +1,117 @@
+import random
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.recipe import Recipe
+from app.models.category import Category, recipe_categories
+
+
+def _card(recipe_id, title, image_url, prep_time, cook_time, description) -> Dict:
+    return {
+        "recipe_id": recipe_id,
+        "title": title,
+        "image_url": image_url,
+        "prep_time": prep_time,
+        "cook_time": cook_time,
+        "description": description,
+    }
+
+
+class CategoryIndex:
+    """Recipe ids per category plus the card fields to render them.
+
+    Each category is a sorted int32 array of recipe ids, so a random pick is
+    O(k) and a "browse all" page is a bisect plus a slice, newest (highest
+    id) first. Ratings are not stored here; they change on every review and
+    are read from recipe_stats when a page is served.
+    """
+
+    def __init__(self):
+        self._category_ids: Dict[str, int] = {}   # lowercased name -> id
+        self._recipes: Dict[int, array] = defaultdict(lambda: array("i"))
+        self._cards: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def category_id(self, name: str) -> Optional[int]:
+        return self._category_ids.get(name.strip().lower())
+
+    def size(self, category_id: int) -> int:
+        ids = self._recipes.get(category_id)
+        return len(ids) if ids is not None else 0
+
+    def add_category(self, category_id: int, name: str):
+        with self._lock:
+            self._category_ids[name.strip().lower()] = category_id
+
+    def add_recipe(self, recipe, category_ids: Iterable[int]):
+        category_ids = set(category_ids or ())
+        if not category_ids:
+            return
+        card = _card(recipe.recipe_id, recipe.title, recipe.image_url,
+                     recipe.prep_time, recipe.cook_time, recipe.description)
+        with self._lock:
+            self._cards[recipe.recipe_id] = card
+            for category_id in category_ids:
+                ids = self._recipes[category_id]
+                i = bisect_left(ids, recipe.recipe_id)
+                if i == len(ids) or ids[i] != recipe.recipe_id:
+                    insort(ids, recipe.recipe_id)
+
+    def sample(self, category_id: int, k: int, rng: random.Random = random) -> List[Dict]:
+        """Up to k random cards from the category; fewer when it is smaller than k."""
+        with self._lock:
+            ids = self._recipes.get(category_id)
+            if not ids or k <= 0:
+                return []
+            picks = rng.sample(range(len(ids)), min(k, len(ids)))
+            return [self._cards[ids[i]] for i in picks]
+
+    def page(self, category_id: int, limit: int, before: Optional[int] = None) -> Tuple[List[Dict], bool]:
+        """Cards with recipe_id below `before`, newest first, and whether more follow."""
+        with self._lock:
+            ids = self._recipes.get(category_id)
+            if not ids or limit <= 0:
+                return [], False
+            end = bisect_left(ids, before) if before is not None else len(ids)
+            start = max(0, end - limit)
+            return [self._cards[ids[i]] for i in range(end - 1, start - 1, -1)], start > 0
+
+    def rebuild(self, category_rows, card_rows, membership_rows):
+        """Reload from (category_id, name), card and (recipe_id, category_id) rows."""
+        cards = {row[0]: _card(*row) for row in card_rows}
+        members: Dict[int, set] = defaultdict(set)
+        for recipe_id, category_id in membership_rows:
+            if recipe_id in cards:
+                members[category_id].add(recipe_id)
+
+        recipes: Dict[int, array] = defaultdict(lambda: array("i"))
+        for category_id, recipe_ids in members.items():
+            recipes[category_id] = array("i", sorted(recipe_ids))
+
+        with self._lock:
+            self._category_ids = {name.strip().lower(): category_id for category_id, name in category_rows}
+            self._recipes = recipes
+            self._cards = cards
+
+
+category_index = CategoryIndex()
+
+
+def rebuild_category_index(db: Session):
+    """Load categories, their recipe ids and the card fields of every categorised recipe."""
+    membership = db.query(recipe_categories.c.recipe_id, recipe_categories.c.category_id).all()
+    categorised = select(recipe_categories.c.recipe_id).distinct()
+    cards = db.query(
+        Recipe.recipe_id, Recipe.title, Recipe.image_url, Recipe.prep_time, Recipe.cook_time, Recipe.description
+    ).filter(Recipe.recipe_id.in_(categorised)).all()
+    category_index.rebuild(db.query(Category.category_id, Category.name).all(), cards, membership)
+    print(f"Category index loaded {len(category_index)} recipes")
@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.recipe import Recipe
+from app.models.favorite import Favorite
+from app.models.save import Save
+from app.services.search_index import SearchIndex
+
+LIKES = "like"
+SAVES = "save"
+COLLECTION_FIELD_WEIGHTS = {"title": 3.0, "description": 1.0}
+
+
+def _card(recipe) -> Dict:
+    return {
+        "recipe_id": recipe.recipe_id,
+        "title": recipe.title,
+        "image_url": recipe.image_url,
+        "prep_time": recipe.prep_time,
+        "cook_time": recipe.cook_time,
+        "description": recipe.description,
+    }
+
+
+class UserCollectionIndex:
+    """One user's liked and saved recipes in a single search index."""
+
+    def __init__(self):
+        self.index = SearchIndex(COLLECTION_FIELD_WEIGHTS)
+        self.members: Dict[str, Set[int]] = {LIKES: set(), SAVES: set()}
+
+    def add(self, recipe, kind: str):
+        if recipe.recipe_id not in self.index:
+            self.index.add(recipe.recipe_id, {"title": recipe.title, "description": recipe.description}, _card(recipe))
+        self.members[kind].add(recipe.recipe_id)
+
+    def remove(self, recipe_id: int, kind: str):
+        self.members[kind].discard(recipe_id)
+        if not any(recipe_id in ids for ids in self.members.values()):
+            self.index.remove(recipe_id)
+
+    def search(self, query: str, limit: int, kinds=(LIKES, SAVES)) -> List[Dict]:
+        wanted = set().union(*(self.members[k] for k in kinds))
+        hits = []
+        # a recipe that is both liked and saved is a single document, so no duplicates
+        for recipe_id, _ in self.index.rank(query):
+            if recipe_id in wanted:
+                hits.append(self.index.payload(recipe_id))
+                if len(hits) == limit:
+                    break
+        return hits
+
+
+class CollectionSearchCache:
+    """Per-user collection indexes, built on first search and kept in an LRU.
+
+    Likes, saves and unsaves update an index only while it is cached; an
+    evicted user is rebuilt from two queries on their next search.
+    """
+
+    def __init__(self, max_users: int = 1000):
+        self.max_users = max_users
+        self._indexes: "OrderedDict[int, UserCollectionIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def get(self, db: Session, user_id: int) -> UserCollectionIndex:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+
+        index = UserCollectionIndex()
+        for recipe in db.query(Recipe).join(Favorite).filter(Favorite.user_id == user_id):
+            index.add(recipe, LIKES)
+        for recipe in db.query(Recipe).join(Save).filter(Save.user_id == user_id):
+            index.add(recipe, SAVES)
+
+        with self._lock:
+            existing = self._indexes.get(user_id)
+            if existing is not None:
+                return existing
+            self._indexes[user_id] = index
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _cached(self, user_id: int) -> Optional[UserCollectionIndex]:
+        with self._lock:
+            return self._indexes.get(user_id)
+
+    def add(self, db: Session, user_id: int, recipe_id: int, kind: str):
+        """Record a like or save; only loads the recipe if the user's index is cached."""
+        if kind not in (LIKES, SAVES):
+            return
+        index = self._cached(user_id)
+        if index is None:
+            return
+        recipe = db.query(Recipe).filter(Recipe.recipe_id == recipe_id).first()
+        if recipe is not None:
+            with self._lock:
+                index.add(recipe, kind)
+
+    def remove(self, user_id: int, recipe_id: int, kind: str):
+        index = self._cached(user_id)
+        if index is not None:
+            with self._lock:
+                index.remove(recipe_id, kind)
+
+    def search(self, db: Session, user_id: int, query: str, limit: int, kinds=(LIKES, SAVES)) -> List[Dict]:
+        index = self.get(db, user_id)
+        with self._lock:
+            return index.search(query, limit, kinds)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(user_id, None)
+
+
+collection_search = CollectionSearchCache(max_users=settings.COLLECTION_SEARCH_CACHE_USERS)
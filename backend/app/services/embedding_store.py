@@ -0,0 +1,84 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.als_trainer import (
+    RECIPE_FACTORS_FILE,
+    RECIPE_IDS_FILE,
+    USER_FACTORS_FILE,
+    USER_IDS_FILE,
+    current_embeddings_dir,
+)
+
+
+class EmbeddingStore:
+    """Read-only ALS embeddings memory-mapped from one version of the trainer's .npy files.
+
+    The factor matrices are opened with mmap_mode="r", so every uvicorn
+    worker on the host shares the same page-cache pages instead of holding
+    its own copy. Only the id -> row dictionaries live in process memory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.user_factors = np.load(os.path.join(directory, USER_FACTORS_FILE), mmap_mode="r")
+        self.recipe_factors = np.load(os.path.join(directory, RECIPE_FACTORS_FILE), mmap_mode="r")
+        self.user_ids = np.load(os.path.join(directory, USER_IDS_FILE))
+        self.recipe_ids = np.load(os.path.join(directory, RECIPE_IDS_FILE))
+        self.user_index: Dict[int, int] = {int(u): i for i, u in enumerate(self.user_ids)}
+        self.recipe_index: Dict[int, int] = {int(r): i for i, r in enumerate(self.recipe_ids)}
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.user_index
+
+    def score(self, user_id: int, recipe_ids: Sequence[int]) -> Dict[int, float]:
+        """Dot-product scores for the given candidates; unknown ids are skipped."""
+        row = self.user_index.get(user_id)
+        if row is None:
+            return {}
+        known = [(r, self.recipe_index[r]) for r in recipe_ids if r in self.recipe_index]
+        if not known:
+            return {}
+        scores = self.recipe_factors[[i for _, i in known]] @ self.user_factors[row]
+        return {r: float(s) for (r, _), s in zip(known, scores)}
+
+    def top_recipes(self, user_id: int, count: int, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """Best-scoring recipes for the user: one matrix-vector product over all recipes."""
+        row = self.user_index.get(user_id)
+        if row is None or count <= 0:
+            return []
+        scores = np.asarray(self.recipe_factors @ self.user_factors[row], dtype=np.float32)
+
+        excluded = [self.recipe_index[r] for r in exclude if r in self.recipe_index]
+        if excluded:
+            scores[excluded] = -np.inf
+
+        count = min(count, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.recipe_ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+_store_lock = threading.Lock()
+_embedding_store: Optional[EmbeddingStore] = None
+
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    return _embedding_store
+
+
+def load_embedding_store(db: Session = None):
+    """Map the latest trained embeddings if the ALS job has written them."""
+    global _embedding_store
+    directory = current_embeddings_dir(settings.EMBEDDINGS_DIR)
+    if directory is None:
+        print(f"No ALS embeddings in {settings.EMBEDDINGS_DIR}, recommendations use the database procedures")
+        return
+    store = EmbeddingStore(directory)
+    with _store_lock:
+        _embedding_store = store
+    print(f"ALS embeddings mapped for {len(store.user_ids)} users and {len(store.recipe_ids)} recipes")
@@ -0,0 +1,167 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# roaring-style containers: ids are split into a 16-bit high key and a 16-bit
+# low value; sparse chunks are sorted uint16 arrays, dense ones an 8 KiB bitset
+ARRAY_CONTAINER_LIMIT = 4096
+BITSET_BYTES = 1 << 13
+
+
+class RecipeBitmap:
+    """Compact set of recipe ids with O(log n) or O(1) membership checks."""
+
+    __slots__ = ("_containers", "_size")
+
+    def __init__(self, values: Iterable[int] = ()):
+        self._containers: Dict[int, Union[array, bytearray]] = {}
+        self._size = 0
+        self.update(values)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, value: int) -> bool:
+        container = self._containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, bytearray):
+            return bool(container[low >> 3] & (1 << (low & 7)))
+        i = bisect_left(container, low)
+        return i < len(container) and container[i] == low
+
+    def __iter__(self) -> Iterator[int]:
+        for high in sorted(self._containers):
+            container = self._containers[high]
+            base = high << 16
+            if isinstance(container, bytearray):
+                for byte_index, byte in enumerate(container):
+                    while byte:
+                        bit = (byte & -byte).bit_length() - 1
+                        yield base | (byte_index << 3) | bit
+                        byte &= byte - 1
+            else:
+                for low in container:
+                    yield base | low
+
+    def add(self, value: int):
+        high, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(high)
+        if container is None:
+            self._containers[high] = array("H", [low])
+            self._size += 1
+            return
+
+        if isinstance(container, bytearray):
+            mask = 1 << (low & 7)
+            if not container[low >> 3] & mask:
+                container[low >> 3] |= mask
+                self._size += 1
+            return
+
+        i = bisect_left(container, low)
+        if i < len(container) and container[i] == low:
+            return
+        container.insert(i, low)
+        self._size += 1
+        if len(container) > ARRAY_CONTAINER_LIMIT:
+            bitset = bytearray(BITSET_BYTES)
+            for item in container:
+                bitset[item >> 3] |= 1 << (item & 7)
+            self._containers[high] = bitset
+
+    def update(self, values: Iterable[int]):
+        for value in values:
+            self.add(value)
+
+    def discard(self, value: int):
+        high, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(high)
+        if container is None:
+            return
+        if isinstance(container, bytearray):
+            mask = 1 << (low & 7)
+            if container[low >> 3] & mask:
+                container[low >> 3] &= ~mask & 0xFF
+                self._size -= 1
+            return
+        i = bisect_left(container, low)
+        if i < len(container) and container[i] == low:
+            del container[i]
+            self._size -= 1
+            if not container:
+                del self._containers[high]
+
+    def nbytes(self) -> int:
+        return sum(
+            len(c) if isinstance(c, bytearray) else c.itemsize * len(c)
+            for c in self._containers.values()
+        )
+
+
+# everything a user has liked, saved, disliked, been shown or been queued, in one round trip
+_EXCLUDED_RECIPES_SQL = text("""
+    SELECT recipe_id FROM favorites WHERE user_id = :user_id
+    UNION ALL SELECT recipe_id FROM saves WHERE user_id = :user_id
+    UNION ALL SELECT recipe_id FROM recipe_dislikes WHERE user_id = :user_id
+    UNION ALL SELECT recipe_id FROM seen_recipes WHERE user_id = :user_id
+    UNION ALL SELECT recipe_id FROM recipe_recommendations WHERE user_id = :user_id
+""")
+
+
+class ExclusionStore:
+    """Per-user exclusion bitmaps, loaded lazily and kept current on writes.
+
+    Bitmaps live in an LRU bounded by `max_users`; an evicted user is simply
+    reloaded with one query on their next recommendation refill.
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._bitmaps: "OrderedDict[int, RecipeBitmap]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._bitmaps)
+
+    def get(self, db: Session, user_id: int) -> RecipeBitmap:
+        with self._lock:
+            bitmap = self._bitmaps.get(user_id)
+            if bitmap is not None:
+                self._bitmaps.move_to_end(user_id)
+                return bitmap
+
+        bitmap = RecipeBitmap(row[0] for row in db.execute(_EXCLUDED_RECIPES_SQL, {"user_id": user_id}))
+        with self._lock:
+            # another thread may have loaded (and updated) it meanwhile, keep theirs
+            existing = self._bitmaps.get(user_id)
+            if existing is not None:
+                return existing
+            self._bitmaps[user_id] = bitmap
+            while len(self._bitmaps) > self.max_users:
+                self._bitmaps.popitem(last=False)
+        return bitmap
+
+    def add(self, user_id: int, recipe_ids: Union[int, Iterable[int]]):
+        """Mark recipes as excluded; users not in memory pick them up on load."""
+        with self._lock:
+            bitmap = self._bitmaps.get(user_id)
+            if bitmap is None:
+                return
+            if isinstance(recipe_ids, int):
+                bitmap.add(recipe_ids)
+            else:
+                bitmap.update(recipe_ids)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None:
+                self._bitmaps.clear()
+            else:
+                self._bitmaps.pop(user_id, None)
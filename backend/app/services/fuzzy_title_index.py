@@ -0,0 +1,154 @@
+import threading
+from typing import Container, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.recipe import Recipe
+from app.services.search_index import normalize_title
+
+MIN_SIMILARITY = 0.3
+# recipes added since the last compaction are scored from a small Python list
+DELTA_LIMIT = 1000
+
+
+def trigrams(value: str) -> List[str]:
+    """Distinct trigrams of the normalised text, padded so word starts and ends count."""
+    padded = f"  {normalize_title(value)} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def similarity(shared, query_size, title_size):
+    """Mean of Jaccard and query containment: a misspelt word inside a longer title still scores."""
+    return 0.5 * (shared / (query_size + title_size - shared) + shared / query_size)
+
+
+class FuzzyTitleIndex:
+    """Typo-tolerant title matching by trigram similarity.
+
+    Trigram posting lists are stored CSR-style in two numpy arrays (offsets
+    and document positions), so scoring a query is one concatenate of its
+    trigrams' postings and one bincount over the catalogue.
+    """
+
+    def __init__(self):
+        self._trigram_ids: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.empty(0, dtype=np.int32)
+        self._recipe_ids = np.empty(0, dtype=np.int64)
+        self._sizes = np.empty(0, dtype=np.int32)        # distinct trigrams per title
+        self._payloads: List[Dict] = []
+        self._delta: List[Tuple[Dict, frozenset]] = []
+        self._compacting = False
+        self._generation = 0      # bumped by every rebuild
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._payloads) + len(self._delta)
+
+    def add(self, recipe_id: int, title: str, image_url: Optional[str] = None):
+        payload = {"recipe_id": recipe_id, "title": title, "image_url": image_url}
+        with self._lock:
+            self._delta.append((payload, frozenset(trigrams(title))))
+            if len(self._delta) <= DELTA_LIMIT or self._compacting:
+                return
+            self._compacting = True
+        # fold the delta into the arrays off the request thread
+        threading.Thread(target=self._compact, name="fuzzy-title-compact", daemon=True).start()
+
+    def rebuild(self, rows):
+        """Reload from (recipe_id, title, image_url) rows."""
+        payloads = [{"recipe_id": r, "title": t, "image_url": i} for r, t, i in rows if t]
+        state = self._build(payloads)
+        covered = {p["recipe_id"] for p in payloads}
+        with self._lock:
+            # recipes added after the rows were read are not in them
+            self._install(state, [entry for entry in self._delta if entry[0]["recipe_id"] not in covered])
+            self._generation += 1
+
+    def _compact(self):
+        try:
+            with self._lock:
+                generation = self._generation
+                folded = len(self._delta)
+                payloads = self._payloads + [p for p, _ in self._delta]
+            state = self._build(payloads)
+            with self._lock:
+                # a rebuild while we were building installed a newer base and
+                # kept every delta entry it lacks, so ours is stale
+                if generation == self._generation:
+                    # recipes added while we were building stay in the delta
+                    self._install(state, self._delta[folded:])
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    @staticmethod
+    def _build(payloads: List[Dict]):
+        trigram_ids: Dict[str, int] = {}
+        doc_grams: List[List[int]] = []
+        for payload in payloads:
+            doc_grams.append([trigram_ids.setdefault(g, len(trigram_ids)) for g in trigrams(payload["title"])])
+
+        sizes = np.array([len(g) for g in doc_grams], dtype=np.int32)
+        gram_ids = np.fromiter((g for grams in doc_grams for g in grams), dtype=np.int64, count=int(sizes.sum()))
+        doc_positions = np.repeat(np.arange(len(doc_grams), dtype=np.int32), sizes)
+        order = np.argsort(gram_ids, kind="stable")
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(gram_ids, minlength=len(trigram_ids)))))
+        recipe_ids = np.array([p["recipe_id"] for p in payloads], dtype=np.int64)
+        return trigram_ids, offsets, doc_positions[order], recipe_ids, sizes, payloads
+
+    def _install(self, state, delta: List[Tuple[Dict, frozenset]]):
+        (self._trigram_ids, self._offsets, self._postings,
+         self._recipe_ids, self._sizes, self._payloads) = state
+        self._delta = delta
+
+    def search(self, query: str, limit: int = 10, exclude: Container[int] = ()) -> List[Tuple[Dict, float]]:
+        """Best (payload, similarity) pairs at or above MIN_SIMILARITY."""
+        grams = trigrams(query)
+        if not grams or limit <= 0:
+            return []
+        query_grams = frozenset(grams)
+
+        with self._lock:
+            scored: List[Tuple[float, int, Dict]] = []
+            known = [self._trigram_ids[g] for g in grams if g in self._trigram_ids]
+            if known and len(self._payloads):
+                postings = np.concatenate([self._postings[self._offsets[g]:self._offsets[g + 1]] for g in known])
+                shared = np.bincount(postings, minlength=len(self._payloads))
+                scores = similarity(shared, len(grams), self._sizes)
+                candidates = np.flatnonzero(scores >= MIN_SIMILARITY)
+                # over-fetch a little so excluded recipes do not starve the page
+                if len(candidates) > limit * 4:
+                    top = np.argpartition(-scores[candidates], limit * 4)[:limit * 4]
+                    candidates = candidates[top]
+                scored.extend(
+                    (float(scores[i]), int(self._recipe_ids[i]), self._payloads[i]) for i in candidates
+                )
+            for payload, doc_grams in self._delta:
+                shared = len(query_grams & doc_grams)
+                score = similarity(shared, len(query_grams), len(doc_grams))
+                if score >= MIN_SIMILARITY:
+                    scored.append((score, payload["recipe_id"], payload))
+
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        results = []
+        seen_titles = set()
+        for score, recipe_id, payload in scored:
+            title = normalize_title(payload["title"])
+            if recipe_id in exclude or title in seen_titles:
+                continue
+            seen_titles.add(title)
+            results.append((payload, score))
+            if len(results) == limit:
+                break
+        return results
+
+
+fuzzy_title_index = FuzzyTitleIndex()
+
+
+def rebuild_fuzzy_title_index(db: Session):
+    """Precompute title trigrams for every recipe."""
+    fuzzy_title_index.rebuild(db.query(Recipe.recipe_id, Recipe.title, Recipe.image_url).all())
+    print(f"Fuzzy title index built for {len(fuzzy_title_index)} recipes")
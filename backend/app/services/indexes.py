@@ -0,0 +1,37 @@
+from app.core.database import SessionLocal
+from app.services.item_cooccurrence import rebuild_cooccurrence_index
+from app.services.user_lsh import load_user_lsh_index
+from app.services.embedding_store import load_embedding_store
+from app.services.recipe_sampler import rebuild_recipe_sampler
+from app.services.popularity import rebuild_leaderboards
+from app.services.search_index import rebuild_recipe_search_index
+from app.services.fuzzy_title_index import rebuild_fuzzy_title_index
+from app.services.ingredient_autocomplete import rebuild_ingredient_autocomplete
+from app.services.pantry_index import rebuild_pantry_index
+from app.services.category_index import rebuild_category_index
+
+# in-process indexes that are loaded from the database when the app starts
+INDEX_LOADERS = [
+    ("item co-occurrence", rebuild_cooccurrence_index),
+    ("user LSH", load_user_lsh_index),
+    ("ALS embedding", load_embedding_store),
+    ("recipe sampler", rebuild_recipe_sampler),
+    ("popularity leaderboard", rebuild_leaderboards),
+    ("recipe search", rebuild_recipe_search_index),
+    ("fuzzy title", rebuild_fuzzy_title_index),
+    ("ingredient autocomplete", rebuild_ingredient_autocomplete),
+    ("pantry", rebuild_pantry_index),
+    ("category browse", rebuild_category_index),
+]
+
+
+def warm_indexes():
+    """Build every in-process index; a failing loader does not block the others."""
+    for name, loader in INDEX_LOADERS:
+        db = SessionLocal()
+        try:
+            loader(db)
+        except Exception as e:
+            print(f"Error building {name} index: {e}")
+        finally:
+            db.close()
@@ -0,0 +1,188 @@
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.ingredient import Ingredient, RecipeIngredient
+
+# completions cached per trie node; requests never ask for more than this
+TOP_K = 16
+NGRAM = 3
+
+
+class _Node:
+    __slots__ = ("edges", "ingredient_ids", "top")
+
+    def __init__(self):
+        self.edges: Dict[str, Tuple[str, "_Node"]] = {}   # first char -> (edge label, child)
+        self.ingredient_ids: Set[int] = set()              # ids whose key ends here
+        self.top: List[Tuple[int, str, int]] = []          # (-usage, name, id) best in subtree
+
+
+def _ngrams(value: str) -> Set[str]:
+    return {value[i:i + NGRAM] for i in range(len(value) - NGRAM + 1)}
+
+
+class IngredientAutocomplete:
+    """Compressed prefix trie over ingredient names, ranked by recipe usage.
+
+    Every word start of a name is a key ("coconut milk" is reachable from
+    "co" and from "mi"), and each node caches the TOP_K most used
+    ingredients below it, so a lookup costs O(len(query)). Queries that are
+    not a word prefix ("onut") fall back to a trigram index plus a substring
+    check.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._names: Dict[int, str] = {}
+        self._usage: Dict[int, int] = {}
+        self._payloads: Dict[int, Dict] = {}
+        self._ngrams: Dict[str, Set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @staticmethod
+    def _keys(name: str) -> List[str]:
+        keys = [name]
+        for i in range(1, len(name)):
+            if name[i - 1] == " " and name[i] != " ":
+                keys.append(name[i:])
+        return keys
+
+    def _entry(self, ingredient_id: int) -> Tuple[int, str, int]:
+        return (-self._usage[ingredient_id], self._names[ingredient_id], ingredient_id)
+
+    @staticmethod
+    def _offer(node: _Node, entry: Tuple[int, str, int]):
+        top = [e for e in node.top if e[2] != entry[2]]
+        if len(top) < TOP_K or entry < top[-1]:
+            top.append(entry)
+            top.sort()
+            del top[TOP_K:]
+        node.top = top
+
+    def _insert(self, key: str, ingredient_id: int):
+        entry = self._entry(ingredient_id)
+        node = self._root
+        self._offer(node, entry)
+        rest = key
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                child = _Node()
+                node.edges[rest[0]] = (rest, child)
+                node = child
+                self._offer(node, entry)
+                rest = ""
+                break
+            label, child = edge
+            common = 0
+            while common < len(label) and common < len(rest) and label[common] == rest[common]:
+                common += 1
+            if common < len(label):
+                # split the edge: node -label[:common]-> middle -label[common:]-> child
+                middle = _Node()
+                middle.edges[label[common]] = (label[common:], child)
+                middle.top = list(child.top)
+                node.edges[rest[0]] = (label[:common], middle)
+                child = middle
+            node = child
+            self._offer(node, entry)
+            rest = rest[common:]
+        node.ingredient_ids.add(ingredient_id)
+
+    def _find(self, prefix: str) -> Optional[_Node]:
+        node = self._root
+        rest = prefix
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                return None
+            label, child = edge
+            if rest.startswith(label):
+                rest = rest[len(label):]
+                node = child
+            elif label.startswith(rest):
+                return child   # prefix ends inside this edge
+            else:
+                return None
+        return node
+
+    def add(self, ingredient_id: int, name: str, payload: Optional[Dict] = None, usage: int = 0):
+        """Index an ingredient (or add usage to a known one) and refresh the cached rankings."""
+        with self._lock:
+            if payload is not None or ingredient_id not in self._payloads:
+                self._payloads[ingredient_id] = payload or {"ingredient_id": ingredient_id, "name": name}
+            key = " ".join(name.lower().split())
+            known = ingredient_id in self._names
+            self._names[ingredient_id] = key
+            self._usage[ingredient_id] = self._usage.get(ingredient_id, 0) + usage
+            # re-walking the paths pushes the new usage into every cached top list
+            for suffix in self._keys(key):
+                self._insert(suffix, ingredient_id)
+            if not known:
+                for gram in _ngrams(key):
+                    self._ngrams[gram].add(ingredient_id)
+
+    def record_usage(self, ingredient_id: int, name: str, count: int = 1):
+        self.add(ingredient_id, name, usage=count)
+
+    def search(self, query: str, limit: int = 8) -> List[Dict]:
+        """Most used ingredients with a word starting with `query`, then substring matches."""
+        query = " ".join(query.lower().split())
+        if not query or limit <= 0:
+            return []
+        limit = min(limit, TOP_K)
+        with self._lock:
+            node = self._find(query)
+            ids = [entry[2] for entry in node.top[:limit]] if node is not None else []
+
+            if len(ids) < limit and len(query) >= NGRAM:
+                grams = _ngrams(query)
+                candidates = set.intersection(*(self._ngrams.get(g, set()) for g in grams))
+                chosen = set(ids)
+                extra = sorted(
+                    self._entry(i) for i in candidates
+                    if i not in chosen and query in self._names[i]
+                )
+                ids.extend(entry[2] for entry in extra[:limit - len(ids)])
+
+            return [self._payloads[i] for i in ids]
+
+    def rebuild(self, rows):
+        """Reload from (ingredient_id, name, calories, image_url, usage) rows."""
+        fresh = IngredientAutocomplete()
+        # insert most used first so cached top lists rarely reshuffle
+        for ingredient_id, name, calories, image_url, usage in sorted(rows, key=lambda r: -(r[4] or 0)):
+            fresh.add(
+                ingredient_id,
+                name,
+                {"ingredient_id": ingredient_id, "name": name, "calories": calories, "image_url": image_url},
+                usage or 0,
+            )
+        with self._lock:
+            self._root = fresh._root
+            self._names = fresh._names
+            self._usage = fresh._usage
+            self._payloads = fresh._payloads
+            self._ngrams = fresh._ngrams
+
+
+ingredient_autocomplete = IngredientAutocomplete()
+
+
+def rebuild_ingredient_autocomplete(db: Session):
+    """Load every ingredient with the number of recipes that use it."""
+    usage = db.query(
+        RecipeIngredient.ingredient_id, func.count(RecipeIngredient.recipe_id).label("usage")
+    ).group_by(RecipeIngredient.ingredient_id).subquery()
+    rows = db.query(
+        Ingredient.ingredient_id, Ingredient.name, Ingredient.calories, Ingredient.image_url, usage.c.usage
+    ).outerjoin(usage, usage.c.ingredient_id == Ingredient.ingredient_id).all()
+    ingredient_autocomplete.rebuild(rows)
+    print(f"Ingredient autocomplete loaded {len(ingredient_autocomplete)} ingredients")
@@ -0,0 +1,129 @@
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+# (user_id, recipe_id, interaction_type)
+Interaction = Tuple[int, int, str]
+
+
+class InteractionWriteBuffer:
+    """Write-behind buffer for swipe interactions.
+
+    Requests `submit()` into a bounded in-process queue and return without
+    waiting for Oracle; a background thread drains the queue every
+    `flush_interval_ms` or as soon as `flush_events` interactions are waiting,
+    and writes each batch with one executemany and one commit.
+
+    When the queue is full `submit()` blocks for up to `put_timeout_ms` and
+    then returns False, so the caller can write synchronously instead of
+    dropping the interaction. `stop()` flushes whatever is still queued.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[Session, List[Interaction]], None],
+        session_factory: Callable[[], Session],
+        max_size: int = 10000,
+        flush_interval_ms: int = 200,
+        flush_events: int = 500,
+        put_timeout_ms: int = 50,
+    ):
+        self._flush = flush
+        self._session_factory = session_factory
+        self._queue: "queue.Queue[Interaction]" = queue.Queue(maxsize=max_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.flush_events = flush_events
+        self.put_timeout = put_timeout_ms / 1000.0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushed = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="interaction-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flusher and write out everything still queued."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # anything submitted after the thread exited is written here
+        while True:
+            batch = self._drain(self.flush_events)
+            if not batch:
+                break
+            self._write(batch)
+
+    def submit(self, user_id: int, recipe_id: int, interaction_type: str) -> bool:
+        """Queue an interaction; False means the buffer is full (or stopped) and the caller must write it."""
+        if not self.running:
+            return False
+        try:
+            self._queue.put((user_id, recipe_id, interaction_type), timeout=self.put_timeout)
+        except queue.Full:
+            self.rejected += 1
+            return False
+        return True
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _drain(self, limit: int) -> List[Interaction]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # wait for the first event, then give the batch up to flush_interval to fill
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.flush_events:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stopping.is_set():
+                    break
+                # wake up regularly so stop() does not wait out a long interval
+                try:
+                    batch.append(self._queue.get(timeout=min(remaining, 0.05)))
+                except queue.Empty:
+                    continue
+            self._write(batch)
+
+    def _write(self, batch: List[Interaction]):
+        db = self._session_factory()
+        try:
+            self._flush(db, batch)
+            self.flushed += len(batch)
+        except Exception as e:
+            db.rollback()
+            print(f"Error flushing {len(batch)} interactions, retrying one by one: {e}")
+            # one bad row must not lose the rest of the batch
+            for item in batch:
+                try:
+                    self._flush(db, [item])
+                    self.flushed += 1
+                except Exception as item_error:
+                    db.rollback()
+                    print(f"Dropped interaction {item}: {item_error}")
+        finally:
+            db.close()
@@ -0,0 +1,196 @@
+import heapq
+import threading
+from collections import defaultdict
+from typing import Container, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from app.models.favorite import Favorite
+from app.models.save import Save
+from app.services.similarity_service import FAVORITE_WEIGHT, SAVE_WEIGHT
+
+# interaction kinds tracked per (user, recipe); a recipe that is liked and saved counts 1.5
+INTERACTION_WEIGHTS = {"like": FAVORITE_WEIGHT, "save": SAVE_WEIGHT}
+
+# only a user's most recent recipes form pairs; one heavy user with n recipes
+# would otherwise add n^2 entries to the counts
+MAX_ITEMS_PER_USER = 200
+
+
+class ItemCooccurrenceIndex:
+    """Recipe -> top-K co-liked / co-saved recipes, kept current per interaction.
+
+    Two recipes co-occur when the same user liked or saved both; each user adds
+    weight(a) * weight(b) to the pair. A new interaction only touches the pairs
+    it forms with the user's other recipes, and `similar()` reads a cached
+    top-K list, so candidate lookups cost O(K).
+
+    Pairs are formed inside a window of each user's `max_items_per_user` most
+    recent recipes; a recipe leaving the window takes its pairs with it.
+    """
+
+    def __init__(self, top_k: int = 20, max_items_per_user: int = MAX_ITEMS_PER_USER):
+        self.top_k = top_k
+        self.max_items_per_user = max_items_per_user
+        self._user_items: Dict[int, Dict[int, Set[str]]] = defaultdict(dict)
+        self._counts: Dict[int, Dict[int, float]] = defaultdict(dict)
+        self._top: Dict[int, List[Tuple[int, float]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    @staticmethod
+    def _weight(kinds: Set[str]) -> float:
+        return sum(INTERACTION_WEIGHTS[k] for k in kinds)
+
+    def add(self, user_id: int, recipe_id: int, kind: str) -> bool:
+        """Record a like/save; returns False when it was already indexed."""
+        if kind not in INTERACTION_WEIGHTS:
+            return False
+        with self._lock:
+            items = self._user_items[user_id]
+            kinds = items.get(recipe_id)
+            if kinds is None:
+                if len(items) >= self.max_items_per_user:
+                    # the oldest recipe in the window drops out of it
+                    window = self._window(items)
+                    self._apply(window[0], -self._weight(items[window[0]]), items, window[1:])
+                kinds = items[recipe_id] = set()
+            elif kind in kinds:
+                return False
+            kinds.add(kind)
+            window = self._window(items)
+            if recipe_id in window:
+                self._apply(recipe_id, INTERACTION_WEIGHTS[kind], items, window)
+            return True
+
+    def remove(self, user_id: int, recipe_id: int, kind: str) -> bool:
+        """Undo a like/save (e.g. unsave); returns False when it was not indexed."""
+        with self._lock:
+            items = self._user_items.get(user_id, {})
+            kinds = items.get(recipe_id)
+            if not kinds or kind not in kinds:
+                return False
+            window = self._window(items)
+            in_window = recipe_id in window
+            kinds.discard(kind)
+            if in_window:
+                self._apply(recipe_id, -INTERACTION_WEIGHTS[kind], items, window)
+            if not kinds:
+                del items[recipe_id]
+                if in_window and len(items) >= self.max_items_per_user:
+                    # the newest recipe outside the window moves into it
+                    window = self._window(items)
+                    self._apply(window[0], self._weight(items[window[0]]), items, window[1:])
+            return True
+
+    def _window(self, items: Dict[int, Set[str]]) -> List[int]:
+        # items keep insertion order, so the window is the tail
+        return list(items)[-self.max_items_per_user:]
+
+    def _apply(self, recipe_id: int, delta: float, items: Dict[int, Set[str]], window: Iterable[int]):
+        # pair weight is bilinear, so changing one side by delta moves every
+        # pair (recipe_id, other) by delta * weight(other)
+        for other_id in window:
+            other_kinds = items[other_id]
+            if other_id == recipe_id or not other_kinds:
+                continue
+            change = delta * self._weight(other_kinds)
+            self._bump(recipe_id, other_id, change)
+            self._bump(other_id, recipe_id, change)
+
+    def _bump(self, recipe_id: int, other_id: int, change: float):
+        row = self._counts[recipe_id]
+        score = row.get(other_id, 0.0) + change
+        if score <= 1e-9:
+            row.pop(other_id, None)
+        else:
+            row[other_id] = score
+
+        top = self._top.get(recipe_id)
+        if top is None:
+            return
+        if change < 0:
+            # a score inside the top-K dropped; something outside may now beat it
+            if any(r == other_id for r, _ in top):
+                del self._top[recipe_id]
+            return
+        top = [(r, s) for r, s in top if r != other_id]
+        if len(top) < self.top_k or score > top[-1][1]:
+            top.append((other_id, score))
+            top.sort(key=lambda x: -x[1])
+            del top[self.top_k:]
+        self._top[recipe_id] = top
+
+    def similar(self, recipe_id: int, k: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Top-K recipes co-liked/co-saved with `recipe_id`, best first."""
+        with self._lock:
+            top = self._top.get(recipe_id)
+            if top is None:
+                row = self._counts.get(recipe_id, {})
+                top = heapq.nlargest(self.top_k, row.items(), key=lambda x: x[1])
+                self._top[recipe_id] = top
+            return list(top[:k] if k else top)
+
+    def user_recipe_ids(self, user_id: int) -> Set[int]:
+        with self._lock:
+            return set(self._user_items.get(user_id, {}))
+
+    def recommend(self, user_id: int, count: int, exclude: Container[int] = ()) -> List[Tuple[int, float]]:
+        """Score recipes similar to what the user liked or saved."""
+        with self._lock:
+            seeds = {r: self._weight(k) for r, k in self._user_items.get(user_id, {}).items() if k}
+
+        scores: Dict[int, float] = defaultdict(float)
+        for seed_id, seed_weight in seeds.items():
+            for other_id, score in self.similar(seed_id):
+                if other_id not in seeds and other_id not in exclude:
+                    scores[other_id] += seed_weight * score
+
+        return heapq.nlargest(count, scores.items(), key=lambda x: x[1])
+
+    def rebuild(self, interactions: Iterable[Tuple[int, int, str]]):
+        """Full rebuild from (user_id, recipe_id, kind) rows, oldest first, with one sparse X^T X."""
+        user_items: Dict[int, Dict[int, Set[str]]] = defaultdict(dict)
+        for user_id, recipe_id, kind in interactions:
+            if kind in INTERACTION_WEIGHTS:
+                user_items[user_id].setdefault(recipe_id, set()).add(kind)
+
+        counts: Dict[int, Dict[int, float]] = defaultdict(dict)
+        entries = [
+            (user_id, recipe_id, self._weight(items[recipe_id]))
+            for user_id, items in user_items.items()
+            for recipe_id in self._window(items)
+        ]
+        if entries:
+            user_ids, user_pos = np.unique([e[0] for e in entries], return_inverse=True)
+            recipe_ids, recipe_pos = np.unique([e[1] for e in entries], return_inverse=True)
+            matrix = sparse.csr_matrix(
+                (np.array([e[2] for e in entries]), (user_pos, recipe_pos)),
+                shape=(len(user_ids), len(recipe_ids)),
+            )
+            cooccurrence = (matrix.T @ matrix).tocoo()
+            for row, col, score in zip(cooccurrence.row, cooccurrence.col, cooccurrence.data):
+                if row != col and score > 1e-9:
+                    counts[int(recipe_ids[row])][int(recipe_ids[col])] = float(score)
+
+        with self._lock:
+            self._user_items = user_items
+            self._counts = counts
+            self._top = {}
+
+
+cooccurrence_index = ItemCooccurrenceIndex()
+
+
+def rebuild_cooccurrence_index(db: Session):
+    """Reload the co-occurrence index from favorites and saves, oldest first."""
+    rows = [(t, u, r, "like") for u, r, t in db.query(Favorite.user_id, Favorite.recipe_id, Favorite.saved_at)]
+    rows.extend((t, u, r, "save") for u, r, t in db.query(Save.user_id, Save.recipe_id, Save.saved_at))
+    # rows without a timestamp sort as the oldest
+    rows.sort(key=lambda row: (row[0] is not None, row[0] or 0))
+    cooccurrence_index.rebuild(row[1:] for row in rows)
+    print(f"Item co-occurrence index built for {len(cooccurrence_index)} recipes")
@@ -0,0 +1,121 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.ingredient import RecipeIngredient
+
+
+class PantryIndex:
+    """Per-ingredient posting lists of recipe ids, for "what can I cook" queries.
+
+    Each posting list is a sorted int32 array, so "contains all of these"
+    is an intersection of the shortest lists first and coverage ranking is
+    one concatenate + unique over the pantry's lists, both in numpy. Nothing
+    touches recipe_ingredients at query time.
+    """
+
+    def __init__(self):
+        self._postings: Dict[int, array] = defaultdict(lambda: array("i"))
+        self._sizes: Dict[int, int] = {}   # recipe_id -> number of distinct ingredients
+        self._size_table: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def add_recipe(self, recipe_id: int, ingredient_ids: Iterable[int]):
+        with self._lock:
+            added = 0
+            for ingredient_id in set(ingredient_ids):
+                postings = self._postings[ingredient_id]
+                i = bisect_left(postings, recipe_id)
+                if i < len(postings) and postings[i] == recipe_id:
+                    continue
+                postings.insert(i, recipe_id)
+                added += 1
+            self._sizes[recipe_id] = self._sizes.get(recipe_id, 0) + added
+            self._size_table = None
+
+    def _posting_arrays(self, ingredient_ids: Iterable[int]) -> List[np.ndarray]:
+        # copied out of the array.array buffers (a memcpy): a live numpy view
+        # would make the next insert() into that list raise BufferError
+        return [
+            np.array(self._postings[i], dtype=np.int32) if i in self._postings else np.empty(0, dtype=np.int32)
+            for i in set(ingredient_ids)
+        ]
+
+    def _recipe_sizes(self, recipe_ids: np.ndarray) -> np.ndarray:
+        if self._size_table is None:
+            ids = np.fromiter(self._sizes.keys(), dtype=np.int64, count=len(self._sizes))
+            sizes = np.fromiter(self._sizes.values(), dtype=np.int64, count=len(self._sizes))
+            order = np.argsort(ids)
+            self._size_table = (ids[order], sizes[order])
+        ids, sizes = self._size_table
+        return sizes[np.searchsorted(ids, recipe_ids)]
+
+    def containing_all(self, ingredient_ids: Iterable[int]) -> List[Tuple[int, int]]:
+        """(recipe_id, ingredient count) for recipes using every given ingredient, simplest first."""
+        with self._lock:
+            postings = sorted(self._posting_arrays(ingredient_ids), key=len)
+            if not postings:
+                return []
+            matches = postings[0]
+            for other in postings[1:]:
+                if not len(matches):
+                    break
+                matches = np.intersect1d(matches, other, assume_unique=True)
+            if not len(matches):
+                return []
+            sizes = self._recipe_sizes(matches)
+
+        order = np.lexsort((matches, sizes))
+        return [(int(matches[i]), int(sizes[i])) for i in order]
+
+    def by_coverage(self, ingredient_ids: Iterable[int], max_missing: int) -> List[Tuple[int, int, int]]:
+        """(recipe_id, matched, missing) for recipes missing at most `max_missing` ingredients.
+
+        Ranked by fewest missing, then most pantry ingredients used.
+        """
+        with self._lock:
+            postings = [p for p in self._posting_arrays(ingredient_ids) if len(p)]
+            if not postings:
+                return []
+            recipe_ids, matched = np.unique(np.concatenate(postings), return_counts=True)
+            missing = self._recipe_sizes(recipe_ids) - matched
+
+        keep = missing <= max_missing
+        recipe_ids, matched, missing = recipe_ids[keep], matched[keep], missing[keep]
+        order = np.lexsort((recipe_ids, -matched, missing))
+        return [(int(recipe_ids[i]), int(matched[i]), int(missing[i])) for i in order]
+
+    def rebuild(self, rows: Iterable[Tuple[int, int]]):
+        """Reload from (recipe_id, ingredient_id) rows."""
+        by_ingredient: Dict[int, set] = defaultdict(set)
+        sizes: Dict[int, int] = defaultdict(int)
+        for recipe_id, ingredient_id in rows:
+            if recipe_id not in by_ingredient[ingredient_id]:
+                by_ingredient[ingredient_id].add(recipe_id)
+                sizes[recipe_id] += 1
+
+        postings: Dict[int, array] = defaultdict(lambda: array("i"))
+        for ingredient_id, recipe_ids in by_ingredient.items():
+            postings[ingredient_id] = array("i", sorted(recipe_ids))
+
+        with self._lock:
+            self._postings = postings
+            self._sizes = dict(sizes)
+            self._size_table = None
+
+
+pantry_index = PantryIndex()
+
+
+def rebuild_pantry_index(db: Session):
+    """Load ingredient -> recipe posting lists from recipe_ingredients."""
+    pantry_index.rebuild(db.query(RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id).all())
+    print(f"Pantry index loaded for {len(pantry_index)} recipes")
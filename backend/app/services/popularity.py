@@ -0,0 +1,219 @@
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Container, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.favorite import Favorite
+from app.models.save import Save
+from app.models.review import Review
+from app.services.similarity_service import FAVORITE_WEIGHT, SAVE_WEIGHT
+
+ALL_TIME_BOARD = "all_time"
+TRENDING_BOARD = "trending"
+TOP_RATED_BOARD = "top_rated"
+BOARDS = (ALL_TIME_BOARD, TRENDING_BOARD, TOP_RATED_BOARD)
+
+TRENDING_HALF_LIFE_DAYS = 7.0
+TOP_RATED_MIN_REVIEWS = 5
+
+# renormalise forward-decay keys before exp() gets anywhere near overflow
+_MAX_EXPONENT = 50.0
+
+
+class Leaderboard:
+    """Recipes kept sorted by score, with optional exponential time decay.
+
+    Decay uses forward decay: an event of weight w at time t adds
+    w * exp(lambda * (t - t0)) to the stored key, so older keys never have
+    to be touched and the ranking is the same as the decayed scores. Reading
+    the top N is a slice of the sorted list.
+    """
+
+    def __init__(self, half_life_days: Optional[float] = None):
+        self.decay = math.log(2) / (half_life_days * 86400) if half_life_days else 0.0
+        self._reference = time.time()
+        self._keys: Dict[int, float] = {}
+        self._sorted: List[Tuple[float, int]] = []   # (-key, recipe_id), best first
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _set_key(self, recipe_id: int, key: Optional[float]):
+        old = self._keys.get(recipe_id)
+        if old is not None:
+            i = bisect_left(self._sorted, (-old, recipe_id))
+            if i < len(self._sorted) and self._sorted[i] == (-old, recipe_id):
+                del self._sorted[i]
+        if key is None:
+            self._keys.pop(recipe_id, None)
+            return
+        self._keys[recipe_id] = key
+        insort(self._sorted, (-key, recipe_id))
+
+    def _weight_at(self, at: float) -> float:
+        if not self.decay:
+            return 1.0
+        exponent = self.decay * (at - self._reference)
+        if exponent > _MAX_EXPONENT:
+            self._renormalise(at)
+            exponent = 0.0
+        return math.exp(exponent)
+
+    def _renormalise(self, at: float):
+        factor = math.exp(-self.decay * (at - self._reference))
+        self._reference = at
+        self._keys = {r: k * factor for r, k in self._keys.items()}
+        self._sorted = [(k * factor, r) for k, r in self._sorted]
+
+    def add(self, recipe_id: int, weight: float = 1.0, at: Optional[float] = None):
+        """Add an event; a negative weight at the original time retracts it."""
+        at = time.time() if at is None else at
+        # may renormalise every key, so weigh before reading the old one
+        scaled = weight * self._weight_at(at)
+        key = self._keys.get(recipe_id, 0.0) + scaled
+        # a retraction can leave float dust (or go below zero for an event
+        # older than the replay window); either way the recipe has no score
+        self._set_key(recipe_id, key if key > 1e-9 else None)
+
+    def set(self, recipe_id: int, score: Optional[float]):
+        """Overwrite an undecayed score (None removes the recipe)."""
+        self._set_key(recipe_id, score)
+
+    def score(self, recipe_id: int, now: Optional[float] = None) -> float:
+        key = self._keys.get(recipe_id, 0.0)
+        if not self.decay:
+            return key
+        now = time.time() if now is None else now
+        return key * math.exp(-self.decay * (now - self._reference))
+
+    def top(self, n: int, exclude: Container[int] = ()) -> List[Tuple[int, float]]:
+        results = []
+        now = time.time()
+        for _, recipe_id in self._sorted:
+            if len(results) >= n:
+                break
+            if recipe_id not in exclude:
+                results.append((recipe_id, self.score(recipe_id, now)))
+        return results
+
+
+class PopularityLeaderboards:
+    """All-time favorites, trending (7-day half-life) and top-rated recipes.
+
+    Trending counts favorites and saves (same weights as similarity) with a 7-day half-life
+    rather than a hard 7-day window, so nothing has to expire. Top-rated
+    only ranks recipes with at least TOP_RATED_MIN_REVIEWS reviews.
+    """
+
+    def __init__(self):
+        self._boards = self._empty_boards()
+        self._ratings: Dict[int, List[float]] = {}   # recipe_id -> [rating sum, review count]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _empty_boards() -> Dict[str, Leaderboard]:
+        return {
+            ALL_TIME_BOARD: Leaderboard(),
+            TRENDING_BOARD: Leaderboard(half_life_days=TRENDING_HALF_LIFE_DAYS),
+            TOP_RATED_BOARD: Leaderboard(),
+        }
+
+    def size(self, board: str) -> int:
+        return len(self._boards[board])
+
+    def record_favorite(self, recipe_id: int, at: Optional[float] = None):
+        with self._lock:
+            self._boards[ALL_TIME_BOARD].add(recipe_id)
+            self._boards[TRENDING_BOARD].add(recipe_id, FAVORITE_WEIGHT, at)
+
+    def record_unfavorite(self, recipe_id: int, at: Optional[float] = None):
+        """Undo record_favorite; `at` is when the favorite was made."""
+        with self._lock:
+            self._boards[ALL_TIME_BOARD].add(recipe_id, -1.0)
+            self._boards[TRENDING_BOARD].add(recipe_id, -FAVORITE_WEIGHT, at)
+
+    def record_save(self, recipe_id: int, at: Optional[float] = None):
+        with self._lock:
+            self._boards[TRENDING_BOARD].add(recipe_id, SAVE_WEIGHT, at)
+
+    def record_unsave(self, recipe_id: int, at: Optional[float] = None):
+        """Undo record_save; `at` is when the save was made."""
+        with self._lock:
+            self._boards[TRENDING_BOARD].add(recipe_id, -SAVE_WEIGHT, at)
+
+    def record_review(self, recipe_id: int, rating: float):
+        with self._lock:
+            totals = self._ratings.setdefault(recipe_id, [0.0, 0])
+            totals[0] += rating
+            totals[1] += 1
+            self._rank_rating(self._boards[TOP_RATED_BOARD], recipe_id, totals)
+
+    @staticmethod
+    def _rank_rating(board: Leaderboard, recipe_id: int, totals: List[float]):
+        total, count = totals
+        board.set(recipe_id, total / count if count >= TOP_RATED_MIN_REVIEWS else None)
+
+    def rating(self, recipe_id: int) -> Tuple[Optional[float], int]:
+        """(average rating, review count) as last seen by the leaderboards."""
+        total, count = self._ratings.get(recipe_id, (0.0, 0))
+        return (total / count if count else None), int(count)
+
+    def top(self, board: str, n: int = 10, exclude: Container[int] = ()) -> List[Tuple[int, float]]:
+        with self._lock:
+            return self._boards[board].top(n, exclude)
+
+    def rebuild(self, favorite_counts, recent_favorites, recent_saves, rating_rows):
+        """Reload from aggregated rows; recent_* are (recipe_id, timestamp) events."""
+        boards = self._empty_boards()
+        for recipe_id, count in favorite_counts:
+            boards[ALL_TIME_BOARD].set(recipe_id, float(count))
+        for recipe_id, at in recent_favorites:
+            boards[TRENDING_BOARD].add(recipe_id, FAVORITE_WEIGHT, at)
+        for recipe_id, at in recent_saves:
+            boards[TRENDING_BOARD].add(recipe_id, SAVE_WEIGHT, at)
+
+        ratings = {recipe_id: [float(total), int(count)] for recipe_id, total, count in rating_rows}
+        for recipe_id, totals in ratings.items():
+            self._rank_rating(boards[TOP_RATED_BOARD], recipe_id, totals)
+
+        with self._lock:
+            self._boards = boards
+            self._ratings = ratings
+
+
+leaderboards = PopularityLeaderboards()
+
+
+def event_time(saved_at: Optional[datetime]) -> Optional[float]:
+    """Epoch seconds for a saved_at column; naive values are stored in UTC."""
+    if saved_at is None:
+        return None
+    if saved_at.tzinfo is None:
+        saved_at = saved_at.replace(tzinfo=timezone.utc)
+    return saved_at.timestamp()
+
+
+def rebuild_leaderboards(db: Session):
+    """Load the leaderboards; trending only replays the last few half-lives of events."""
+    # the columns are naive UTC
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=TRENDING_HALF_LIFE_DAYS * 8)
+    favorite_counts = db.query(Favorite.recipe_id, func.count(Favorite.user_id)).group_by(Favorite.recipe_id).all()
+    recent_favorites = [
+        (recipe_id, event_time(saved_at))
+        for recipe_id, saved_at in db.query(Favorite.recipe_id, Favorite.saved_at).filter(Favorite.saved_at >= since)
+    ]
+    recent_saves = [
+        (recipe_id, event_time(saved_at))
+        for recipe_id, saved_at in db.query(Save.recipe_id, Save.saved_at).filter(Save.saved_at >= since)
+    ]
+    rating_rows = db.query(
+        Review.recipe_id, func.sum(Review.rating), func.count(Review.review_id)
+    ).group_by(Review.recipe_id).all()
+
+    leaderboards.rebuild(favorite_counts, recent_favorites, recent_saves, rating_rows)
+    print(f"Popularity leaderboards loaded ({leaderboards.size(ALL_TIME_BOARD)} favorited recipes)")
@@ -0,0 +1,160 @@
+import random
+import threading
+from collections import defaultdict
+from typing import Container, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.recipe import Recipe
+from app.models.review import Review
+from app.models.category import recipe_categories
+
+ALL_POOL = "all"
+FEATURED_POOL = "featured"
+FEATURED_MIN_RATING = 4.5
+
+
+def category_pool(category_id: int) -> str:
+    return f"category:{category_id}"
+
+
+class SamplingPool:
+    """Dense array of ids with O(1) add/remove and O(k) sampling."""
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._ids: List[int] = []
+        self._positions: Dict[int, int] = {}
+        for recipe_id in ids:
+            self.add(recipe_id)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, recipe_id: int) -> bool:
+        return recipe_id in self._positions
+
+    def add(self, recipe_id: int):
+        if recipe_id in self._positions:
+            return
+        self._positions[recipe_id] = len(self._ids)
+        self._ids.append(recipe_id)
+
+    def remove(self, recipe_id: int):
+        # swap with the last element so the array stays dense
+        position = self._positions.pop(recipe_id, None)
+        if position is None:
+            return
+        last = self._ids.pop()
+        if position < len(self._ids):
+            self._ids[position] = last
+            self._positions[last] = position
+
+    def sample(self, k: int, exclude: Container[int] = (), rng: random.Random = random) -> List[int]:
+        """Draw up to k distinct ids not in `exclude`.
+
+        Random probing costs O(k) while most of the pool is eligible; when
+        probes keep hitting excluded ids we fall back to one filtering pass.
+        """
+        n = len(self._ids)
+        if k <= 0 or n == 0:
+            return []
+
+        chosen: List[int] = []
+        seen = set()
+        attempts = 4 * k + 16
+        while len(chosen) < k and attempts > 0 and len(seen) < n:
+            attempts -= 1
+            recipe_id = self._ids[rng.randrange(n)]
+            if recipe_id in seen:
+                continue
+            seen.add(recipe_id)
+            if recipe_id not in exclude:
+                chosen.append(recipe_id)
+
+        if len(chosen) < k:
+            remaining = [r for r in self._ids if r not in seen and r not in exclude]
+            chosen.extend(rng.sample(remaining, min(k - len(chosen), len(remaining))))
+
+        return chosen
+
+
+class RecipeSampler:
+    """Random recipe pools: every recipe, one per category, and featured (rating >= 4.5).
+
+    Replaces ORDER BY DBMS_RANDOM.VALUE, which sorts the whole candidate set
+    on every request. Pools are refreshed incrementally by create_recipe and
+    create_review.
+    """
+
+    def __init__(self):
+        self._pools: Dict[str, SamplingPool] = defaultdict(SamplingPool)
+        self._ratings: Dict[int, List[float]] = {}   # recipe_id -> [rating sum, review count]
+        self._lock = threading.Lock()
+
+    def size(self, pool: str = ALL_POOL) -> int:
+        pool_ids = self._pools.get(pool)
+        return len(pool_ids) if pool_ids is not None else 0
+
+    def sample(self, pool: str, k: int, exclude: Container[int] = ()) -> List[int]:
+        with self._lock:
+            pool_ids = self._pools.get(pool)
+            if pool_ids is None:
+                return []
+            return pool_ids.sample(k, exclude)
+
+    def add_recipe(self, recipe_id: int, category_ids: Iterable[int] = ()):
+        with self._lock:
+            self._pools[ALL_POOL].add(recipe_id)
+            for category_id in category_ids or ():
+                self._pools[category_pool(category_id)].add(recipe_id)
+
+    def add_rating(self, recipe_id: int, rating: float):
+        with self._lock:
+            totals = self._ratings.setdefault(recipe_id, [0.0, 0])
+            totals[0] += rating
+            totals[1] += 1
+            self._update_featured(recipe_id)
+
+    def _update_featured(self, recipe_id: int):
+        total, count = self._ratings.get(recipe_id, (0.0, 0))
+        if count and total / count >= FEATURED_MIN_RATING:
+            self._pools[FEATURED_POOL].add(recipe_id)
+        else:
+            self._pools[FEATURED_POOL].remove(recipe_id)
+
+    def rebuild(
+        self,
+        recipe_ids: Iterable[int],
+        recipe_category_rows: Iterable[Tuple[int, int]],
+        rating_rows: Iterable[Tuple[int, float, int]],
+    ):
+        """Replace every pool from (recipe_id,), (recipe_id, category_id) and (recipe_id, sum, count) rows."""
+        pools: Dict[str, SamplingPool] = defaultdict(SamplingPool)
+        pools[ALL_POOL] = SamplingPool(recipe_ids)
+        for recipe_id, category_id in recipe_category_rows:
+            pools[category_pool(category_id)].add(recipe_id)
+
+        ratings = {recipe_id: [float(total), int(count)] for recipe_id, total, count in rating_rows}
+        for recipe_id, (total, count) in ratings.items():
+            if count and total / count >= FEATURED_MIN_RATING:
+                pools[FEATURED_POOL].add(recipe_id)
+
+        with self._lock:
+            self._pools = pools
+            self._ratings = ratings
+
+
+recipe_sampler = RecipeSampler()
+
+
+def rebuild_recipe_sampler(db: Session):
+    """Load the sampling pools from recipes, recipe_categories and reviews."""
+    recipe_ids = [r for (r,) in db.query(Recipe.recipe_id)]
+    category_rows = db.query(recipe_categories.c.recipe_id, recipe_categories.c.category_id).all()
+    rating_rows = db.query(
+        Review.recipe_id, func.sum(Review.rating), func.count(Review.review_id)
+    ).group_by(Review.recipe_id).all()
+    recipe_sampler.rebuild(recipe_ids, category_rows, rating_rows)
+    print(f"Recipe sampler loaded {recipe_sampler.size()} recipes, "
+          f"{recipe_sampler.size(FEATURED_POOL)} featured")
@@ -0,0 +1,174 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import bindparam, case, func, text, update
+from sqlalchemy.orm import Session
+
+from app.models.recipe import Recipe
+from app.models.review import Review
+from app.models.recipe_stats import RecipeStats
+
+# Incremental update for writes whose effect is known exactly (a new review,
+# a save / unsave). Runs in the caller's transaction; the repair job fixes
+# anything that drifted. Built with Core (CASE rather than Oracle's GREATEST)
+# so the same statement runs in the SQLite tests.
+_stats = RecipeStats.__table__
+
+
+def _at_least_zero(column, delta):
+    return case((column + delta > 0, column + delta), else_=0)
+
+
+def _bump_stats_statement(recipe_id, rating_delta, review_delta, favorite_delta, save_delta, dislike_delta):
+    review_count = _stats.c.review_count + review_delta
+    return (
+        update(_stats)
+        .where(_stats.c.recipe_id == recipe_id)
+        .values(
+            rating_sum=_stats.c.rating_sum + rating_delta,
+            review_count=review_count,
+            average_rating=case((review_count > 0, (_stats.c.rating_sum + rating_delta) / review_count), else_=None),
+            favorite_count=_at_least_zero(_stats.c.favorite_count, favorite_delta),
+            save_count=_at_least_zero(_stats.c.save_count, save_delta),
+            dislike_count=_at_least_zero(_stats.c.dislike_count, dislike_delta),
+            updated_at=func.current_timestamp(),
+        )
+    )
+
+# Recompute rows from the source tables. Used after record_interaction, whose
+# exact effect is up to the PL/SQL procedure, and by the repair job.
+_REFRESH_STATS_SQL = """
+    MERGE INTO recipe_stats s
+    USING (
+        SELECT r.recipe_id,
+               NVL(rv.rating_sum, 0) AS rating_sum,
+               NVL(rv.review_count, 0) AS review_count,
+               rv.average_rating,
+               NVL(f.cnt, 0) AS favorite_count,
+               NVL(sv.cnt, 0) AS save_count,
+               NVL(d.cnt, 0) AS dislike_count
+        FROM recipes r
+        LEFT JOIN (
+            SELECT recipe_id, SUM(rating) AS rating_sum, COUNT(*) AS review_count, AVG(rating) AS average_rating
+            FROM reviews GROUP BY recipe_id
+        ) rv ON rv.recipe_id = r.recipe_id
+        LEFT JOIN (SELECT recipe_id, COUNT(*) AS cnt FROM favorites GROUP BY recipe_id) f ON f.recipe_id = r.recipe_id
+        LEFT JOIN (SELECT recipe_id, COUNT(*) AS cnt FROM saves GROUP BY recipe_id) sv ON sv.recipe_id = r.recipe_id
+        LEFT JOIN (SELECT recipe_id, COUNT(*) AS cnt FROM recipe_dislikes GROUP BY recipe_id) d ON d.recipe_id = r.recipe_id
+        {where}
+    ) src
+    ON (s.recipe_id = src.recipe_id)
+    WHEN MATCHED THEN UPDATE SET
+        s.rating_sum = src.rating_sum,
+        s.review_count = src.review_count,
+        s.average_rating = src.average_rating,
+        s.favorite_count = src.favorite_count,
+        s.save_count = src.save_count,
+        s.dislike_count = src.dislike_count,
+        s.updated_at = CURRENT_TIMESTAMP
+    WHEN NOT MATCHED THEN INSERT
+        (recipe_id, rating_sum, review_count, average_rating, favorite_count, save_count, dislike_count, updated_at)
+    VALUES (
+        src.recipe_id, src.rating_sum, src.review_count, src.average_rating,
+        src.favorite_count, src.save_count, src.dislike_count, CURRENT_TIMESTAMP
+    )
+"""
+_REFRESH_ALL_STATS_SQL = text(_REFRESH_STATS_SQL.format(where=""))
+_REFRESH_SOME_STATS_SQL = text(
+    _REFRESH_STATS_SQL.format(where="WHERE r.recipe_id IN :recipe_ids")
+).bindparams(bindparam("recipe_ids", expanding=True))
+
+
+def bump_recipe_stats(
+    db: Session,
+    recipe_id: int,
+    rating: float = 0.0,
+    reviews: int = 0,
+    favorites: int = 0,
+    saves: int = 0,
+    dislikes: int = 0,
+):
+    """Apply deltas to a recipe's stats row; the caller commits.
+
+    A recipe without a row yet is seeded from the source tables instead, since
+    the deltas alone would miss everything recorded before this write.
+    """
+    result = db.execute(_bump_stats_statement(recipe_id, rating, reviews, favorites, saves, dislikes))
+    if result.rowcount == 0:
+        # the caller's own pending write has to be in the source tables first
+        db.flush()
+        refresh_recipe_stats(db, [recipe_id])
+
+
+def refresh_recipe_stats(db: Session, recipe_ids: Optional[Iterable[int]] = None):
+    """Recompute stats rows from reviews, favorites, saves and dislikes; the caller commits.
+
+    With no ids every recipe is recomputed.
+    """
+    if recipe_ids is None:
+        db.execute(_REFRESH_ALL_STATS_SQL)
+        return
+    recipe_ids = list(set(recipe_ids))
+    if recipe_ids:
+        db.execute(_REFRESH_SOME_STATS_SQL, {"recipe_ids": recipe_ids})
+
+
+def get_recipe_stats(db: Session, recipe_ids: Iterable[int]) -> Dict[int, RecipeStats]:
+    recipe_ids = list(set(recipe_ids))
+    if not recipe_ids:
+        return {}
+    rows = db.query(RecipeStats).filter(RecipeStats.recipe_id.in_(recipe_ids)).all()
+    return {row.recipe_id: row for row in rows}
+
+
+def load_rating_aggregates(
+    db: Session, recipes: Sequence[Union[Recipe, int]]
+) -> Dict[int, Tuple[Optional[float], int]]:
+    """recipe_id -> (average rating, review count) for Recipe objects or ids.
+
+    Reads recipe_stats in one query; recipes without a stats row yet (created
+    before the table, or seeded directly) get one GROUP BY over reviews.
+    """
+    recipe_ids = {r if isinstance(r, int) else r.recipe_id for r in recipes}
+    if not recipe_ids:
+        return {}
+
+    ratings = {
+        recipe_id: (average_rating, review_count)
+        for recipe_id, average_rating, review_count in db.query(
+            RecipeStats.recipe_id, RecipeStats.average_rating, RecipeStats.review_count
+        ).filter(RecipeStats.recipe_id.in_(recipe_ids))
+    }
+
+    missing = recipe_ids - ratings.keys()
+    if missing:
+        for recipe_id, average_rating, review_count in db.query(
+            Review.recipe_id, func.avg(Review.rating), func.count(Review.review_id)
+        ).filter(Review.recipe_id.in_(missing)).group_by(Review.recipe_id):
+            ratings[recipe_id] = (float(average_rating), int(review_count))
+
+    return ratings
+
+
+def apply_recipe_stats(db: Session, recipes: List[Recipe]) -> List[Recipe]:
+    """Set average_rating / total_ratings on Recipe objects for RecipeSmallCard."""
+    ratings = load_rating_aggregates(db, recipes)
+    for recipe in recipes:
+        recipe.average_rating, recipe.total_ratings = ratings.get(recipe.recipe_id, (None, 0))
+    return recipes
+
+
+def repair_recipe_stats(db: Session):
+    """Rebuild the whole recipe_stats table from the source tables."""
+    refresh_recipe_stats(db)
+    db.commit()
+    print(f"Recipe stats repaired for {db.query(RecipeStats).count()} recipes")
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        repair_recipe_stats(db)
+    finally:
+        db.close()
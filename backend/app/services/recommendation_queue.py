@@ -0,0 +1,73 @@
+import queue
+import threading
+from typing import Callable, Optional, Set
+
+from sqlalchemy.orm import Session
+
+
+class RecommendationRefillWorker:
+    """Background thread that refills users' pending recommendation queues.
+
+    Requests only call `schedule(user_id)`; the expensive candidate generation
+    runs here on its own session, so swipe latency does not depend on it.
+    """
+
+    def __init__(self, refill: Callable[[Session, int], None], session_factory: Callable[[], Session]):
+        self._refill = refill
+        self._session_factory = session_factory
+        self._queue: "queue.Queue[int]" = queue.Queue()
+        self._scheduled: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="recommendation-refill", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def schedule(self, user_id: int) -> bool:
+        """Queue a refill for the user; a user already waiting is not queued twice."""
+        with self._lock:
+            if user_id in self._scheduled:
+                return False
+            self._scheduled.add(user_id)
+        self._queue.put(user_id)
+        return True
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                user_id = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            # allow new requests for this user to schedule again while we work,
+            # the refill itself reads the queue state when it starts
+            with self._lock:
+                self._scheduled.discard(user_id)
+
+            db = self._session_factory()
+            try:
+                self._refill(db, user_id)
+            except Exception as e:
+                db.rollback()
+                print(f"Error refilling recommendations for user {user_id}: {e}")
+            finally:
+                db.close()
+                self._queue.task_done()
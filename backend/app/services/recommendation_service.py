@@ -1,16 +1,46 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text, bindparam
+from sqlalchemy import text, func
+from sqlalchemy.exc import DBAPIError
 import cx_Oracle
 from typing import List, Dict, Any
 
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.response_cache import response_cache
+
 from app.models.recipe import Recipe
 from app.models.review import Review
 from app.models.user import User
 from app.models.recommendation import RecipeRecommendation
 from app.models.dislike import Dislike
+from app.models.favorite import Favorite
+from app.services.similarity_service import refresh_user_similarities, write_user_similarities
+from app.services.user_lsh import get_user_lsh_index
+from app.services.recommendation_queue import RecommendationRefillWorker
+from app.services.interaction_buffer import InteractionWriteBuffer
+from app.services.item_cooccurrence import cooccurrence_index
+from app.services.embedding_store import get_embedding_store
+from app.services.exclusion_bitmap import ExclusionStore, RecipeBitmap
+from app.services.recipe_sampler import recipe_sampler, ALL_POOL
+from app.services.popularity import leaderboards, TRENDING_BOARD
+from app.services.recipe_stats import apply_recipe_stats, refresh_recipe_stats
+from app.services.collection_search import collection_search
+
+# per-user bitmaps of recipes that must not be recommended again
+exclusion_store = ExclusionStore(max_users=settings.EXCLUSION_CACHE_USERS)
 
 def calculate_user_similarity(db: Session, user_id: int, top_n: int = 10):
-    """Call the database procedure to calculate user similarity."""
+    """Calculate similar users from the LSH index, or the database procedure without one."""
+    lsh_index = get_user_lsh_index()
+    if lsh_index is not None and user_id in lsh_index.user_index:
+        try:
+            neighbours = lsh_index.query(user_id, top_n=top_n)
+            write_user_similarities(db, {user_id: neighbours}, user_ids=[user_id])
+            return True
+        except Exception as e:
+            db.rollback()
+            print(f"Error calculating user similarity from LSH index: {e}")
+
     try:
         db.execute(
             text("BEGIN find_similar_users(:user_id, :top_n); END;"),
@@ -47,59 +77,69 @@ def calculate_user_similarity(db: Session, user_id: int, top_n: int = 10):
                 print(f"Error in second attempt at calculating user similarity: {inner_e}")
                 return False
         return False
+
+def calculate_all_user_similarities(db: Session, top_n: int = 10):
+    """Recompute top-N similar users for the whole population in one batch."""
+    written = refresh_user_similarities(db, top_n=top_n)
+    print(f"Stored {written} user similarity rows")
+    return written > 0
+    
+def get_excluded_recipe_ids(db: Session, user_id: int) -> RecipeBitmap:
+    """Recipes the user has liked, saved, disliked, seen or been queued."""
+    return exclusion_store.get(db, user_id)
+
+def _sample_random_recipe_ids_from_db(db: Session, limit: int, excluded) -> List[int]:
+    """Fallback for when the sampler is not loaded: over-fetch and filter in memory."""
+    query = text("""
+    SELECT r.recipe_id 
+    FROM recipes r
+    ORDER BY DBMS_RANDOM.VALUE
+    FETCH FIRST :limit ROWS ONLY
+""")
+
+    recipe_ids = []
+    for _ in range(3):
+        result = db.execute(query, {"limit": (limit - len(recipe_ids)) * 4})
+        for (recipe_id,) in result:
+            if recipe_id not in excluded and recipe_id not in recipe_ids:
+                recipe_ids.append(recipe_id)
+        if len(recipe_ids) >= limit:
+            break
+    return recipe_ids[:limit]
+
+def enqueue_random_recommendations(db: Session, user_id: int, limit: int = 10) -> List[int]:
+    """Add random unseen recipes to the user's pending queue and return their ids."""
+    if limit <= 0:
+        return []
+    excluded = get_excluded_recipe_ids(db, user_id)
+
+    # draw from the in-memory pool instead of ORDER BY DBMS_RANDOM.VALUE,
+    # which sorts the whole recipes table on every call
+    if recipe_sampler.size(ALL_POOL):
+        recipe_ids = recipe_sampler.sample(ALL_POOL, limit, exclude=excluded)
+    else:
+        recipe_ids = _sample_random_recipe_ids_from_db(db, limit, excluded)
     
+    # create recommendation entries
+    for recipe_id in recipe_ids:
+        recommendation = RecipeRecommendation(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            recommendation_score=0.5,  # default score
+            status='pending'
+        )
+        db.add(recommendation)
+    
+    db.commit()
+    exclusion_store.add(user_id, recipe_ids)
+    return recipe_ids
+
 def generate_simple_recommendations(db, user_id, limit=10):
     """Simple recommendation system"""
     try:
-        # exclude disliked + already recommended recipes
-        # exclude user's disliked recipes 
-        disliked_recipes = db.query(Dislike.recipe_id).filter(Dislike.user_id == user_id).all()
-        disliked_recipe_ids = [r.recipe_id for r in disliked_recipes] if disliked_recipes else []
-        
-        # recommended recipes
-        existing_recommendations = db.query(RecipeRecommendation.recipe_id).filter(
-            RecipeRecommendation.user_id == user_id
-        ).all()
-        existing_rec_ids = [r.recipe_id for r in existing_recommendations] if existing_recommendations else []
-        
-        # combine IDs to exclude
-        # exclude_ids = list(set(disliked_recipe_ids + existing_rec_ids))
-        exclude_ids = tuple(set(disliked_recipe_ids + existing_rec_ids))
-
-        
-        # query for recipes, using DBMS_RANDOM.VALUE for Oracle
-        query = text("""
-        SELECT r.recipe_id 
-        FROM recipes r
-        WHERE (:exclude_empty = 1 OR r.recipe_id NOT IN :exclude_ids)
-        ORDER BY DBMS_RANDOM.VALUE
-        FETCH FIRST :limit ROWS ONLY
-    """).bindparams(bindparam('exclude_ids', expanding=True))
- 
-        
-        exclude_empty = 1 if not exclude_ids else 0
-        result = db.execute(
-            query, 
-            {
-                "exclude_ids": tuple(exclude_ids) if exclude_ids else (-1,), 
-                "exclude_empty": exclude_empty,
-                "limit": limit
-            }
-        )
-        
-        recipe_ids = [row[0] for row in result]
-        
-        # create recommendation entries
-        for recipe_id in recipe_ids:
-            recommendation = RecipeRecommendation(
-                user_id=user_id,
-                recipe_id=recipe_id,
-                recommendation_score=0.5,  # default score
-                status='pending'
-            )
-            db.add(recommendation)
-        
-        db.commit()
+        recipe_ids = enqueue_random_recommendations(db, user_id, limit)
+        if not recipe_ids:
+            return []
         
         # get the actual recipes
         recipes = db.query(Recipe).filter(Recipe.recipe_id.in_(recipe_ids)).all()
@@ -127,109 +167,243 @@ def generate_recommendations(db: Session, user_id: int, count: int = 20):
     )
     db.commit()
 
-# new simpler version 
-# def get_next_recommendations(db, user_id, limit):
-#     """Get the next batch of recommendations for a user."""
-#     try:
-#         # First check for existing pending recommendations
-#         pending_recommendations = db.query(RecipeRecommendation).filter(
-#             RecipeRecommendation.user_id == user_id,
-#             RecipeRecommendation.status == 'pending'
-#         ).order_by(RecipeRecommendation.recommendation_score.desc()).limit(limit).all()
-        
-#         if pending_recommendations:
-#             # Get recipe IDs
-#             recipe_ids = [rec.recipe_id for rec in pending_recommendations]
-            
-#             # Get the recipes
-#             recipes = db.query(Recipe).filter(Recipe.recipe_id.in_(recipe_ids)).all()
-            
-#             # Update status to 'shown'
-#             for rec in pending_recommendations:
-#                 rec.status = 'shown'
-            
-#             db.commit()
-#             return recipes
-        
-#         # No pending recommendations, use the simple approach
-#         return generate_simple_recommendations(db, user_id, limit)
-#     except Exception as e:
-#         db.rollback()
-#         print(f"Error in get_next_recommendations: {e}")
-#         # 
-#         try:
-#             from sqlalchemy.sql import text
-#             result = db.execute(
-#                 text("SELECT recipe_id FROM recipes ORDER BY DBMS_RANDOM.VALUE FETCH FIRST :limit ROWS ONLY"),
-#                 {"limit": limit}
-#             )
-#             recipe_ids = [row[0] for row in result]
-#             return db.query(Recipe).filter(Recipe.recipe_id.in_(recipe_ids)).all()
-#         except Exception as inner_e:
-#             print(f"Final fallback failed: {inner_e}")
-#             return []
-
-# old version using procedures
+def count_pending_recommendations(db: Session, user_id: int) -> int:
+    return db.query(func.count(RecipeRecommendation.recommendation_id)).filter(
+        RecipeRecommendation.user_id == user_id,
+        RecipeRecommendation.status == 'pending'
+    ).scalar() or 0
+
+def _enqueue_scored(db: Session, user_id: int, candidates) -> int:
+    """Insert (recipe_id, score) candidates as pending rows, scaled to the 0-1 range."""
+    if not candidates:
+        return 0
+
+    top_score = candidates[0][1] if candidates[0][1] > 0 else 1.0
+    for recipe_id, score in candidates:
+        db.add(RecipeRecommendation(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            recommendation_score=max(score / top_score, 0.0),  # keep scores in the procedure's 0-1 range
+            status='pending'
+        ))
+    db.commit()
+    exclusion_store.add(user_id, [recipe_id for recipe_id, _ in candidates])
+    return len(candidates)
+
+def enqueue_embedding_recommendations(db: Session, user_id: int, count: int) -> int:
+    """Queue the recipes the ALS embeddings score highest for the user."""
+    store = get_embedding_store()
+    if store is None or user_id not in store:
+        return 0
+    exclude_ids = get_excluded_recipe_ids(db, user_id)
+    return _enqueue_scored(db, user_id, store.top_recipes(user_id, count, exclude=exclude_ids))
+
+def enqueue_item_based_recommendations(db: Session, user_id: int, count: int) -> int:
+    """Queue recipes co-liked/co-saved with the user's own likes and saves."""
+    exclude_ids = get_excluded_recipe_ids(db, user_id)
+    return _enqueue_scored(db, user_id, cooccurrence_index.recommend(user_id, count, exclude=exclude_ids))
+
+def enqueue_popular_recommendations(db: Session, user_id: int, count: int) -> int:
+    """Queue trending recipes the user has not seen (cold-start fallback)."""
+    exclude_ids = get_excluded_recipe_ids(db, user_id)
+    return _enqueue_scored(db, user_id, leaderboards.top(TRENDING_BOARD, count, exclude=exclude_ids))
+
+def refill_recommendations(db: Session, user_id: int, count: int = None):
+    """Top up the user's pending queue. Runs on the refill worker, not on a request."""
+    count = count or settings.RECOMMENDATION_QUEUE_REFILL_SIZE
+    pending = count_pending_recommendations(db, user_id)
+
+    # trained embeddings score every recipe with one dot product per user
+    if pending < count:
+        pending += enqueue_embedding_recommendations(db, user_id, count - pending)
+
+    if pending < count:
+        try:
+            generate_recommendations(db, user_id, count - pending)
+        except Exception as e:
+            db.rollback()
+            print(f"Error generating recommendations for user {user_id}: {e}")
+        # the procedure inserted rows we did not see, reload the bitmap next time
+        exclusion_store.invalidate(user_id)
+        pending = count_pending_recommendations(db, user_id)
+
+    # the procedure can come up short (no similar users yet), top up with recipes
+    # similar to what the user liked, then trending ones, then pad with random ones
+    if pending < count:
+        pending += enqueue_item_based_recommendations(db, user_id, count - pending)
+    if pending < settings.RECOMMENDATION_QUEUE_LOW_WATER:
+        pending += enqueue_popular_recommendations(db, user_id, count - pending)
+    if pending < settings.RECOMMENDATION_QUEUE_LOW_WATER:
+        enqueue_random_recommendations(db, user_id, count - pending)
+
+refill_worker = RecommendationRefillWorker(refill_recommendations, SessionLocal)
+
 def get_next_recommendations(db: Session, user_id: int, limit: int = 10):
-    """Get next batch of recommendations using the database procedure."""
-    
-    connection = db.get_bind().raw_connection()
-    cursor = connection.cursor()
-    
-    # Create an output cursor variable
-    output_cursor = connection.cursor()
-    
-    try:
-        # Call the stored procedure
-        cursor.callproc(
-            "get_next_recommendations", 
-            [user_id, limit, output_cursor]
-        )
-        
-        # Fetch results from the output cursor
-        recipe_data = []
-        for row in output_cursor:
-            # Map the row to a dictionary
-            recipe_data.append({
-                "recipe_id": row[0],
-                "title": row[1], 
-                "description": row[2],
-                "image_url": row[3],
-                "recommendation_score": row[4],
-                # add other fields if we need as well
-            })
-        
-        # Get the actual recipe objects from the database
-        if recipe_data:
-            recipe_ids = [r["recipe_id"] for r in recipe_data]
-            recipes = db.query(Recipe).filter(Recipe.recipe_id.in_(recipe_ids)).all()
-            
-            # Add average rating and total ratings to each recipe
-            for recipe in recipes:
-                # reviews = db.query(recipe.reviews).filter_by(recipe_id=recipe.recipe_id).all()
-                reviews = db.query(Review).filter(Review.recipe_id == recipe.recipe_id).all()
-                recipe.total_ratings = len(reviews)
-                recipe.average_rating = sum(review.rating for review in reviews) / len(reviews) if reviews else None
-            
-            return recipes
-        
-        return []
-    
-    finally:
-        cursor.close()
-        output_cursor.close()
-        connection.close()
+    """Pop already-scored pending recommendations; refilling happens in the background."""
+    low_water = settings.RECOMMENDATION_QUEUE_LOW_WATER
+
+    # read past the page by the low-water mark so we know whether to refill without a COUNT
+    pending = db.query(RecipeRecommendation.recommendation_id, RecipeRecommendation.recipe_id).filter(
+        RecipeRecommendation.user_id == user_id,
+        RecipeRecommendation.status == 'pending'
+    ).order_by(
+        RecipeRecommendation.recommendation_score.desc(),
+        RecipeRecommendation.recommendation_id
+    ).limit(limit + low_water).all()
+
+    if len(pending) - limit < low_water:
+        refill_worker.schedule(user_id)
+
+    # claim rows before serving them: a concurrent pop for the same user (double
+    # tap, prefetch) skips the rows locked here and never re-reads them as pending.
+    # The lock is a separate query because Oracle rejects FOR UPDATE with a row limit.
+    popped = []
+    if pending:
+        claimed = {
+            row.recommendation_id for row in db.query(RecipeRecommendation.recommendation_id).filter(
+                RecipeRecommendation.recommendation_id.in_([p.recommendation_id for p in pending]),
+                RecipeRecommendation.status == 'pending'
+            ).with_for_update(skip_locked=True)
+        }
+        popped = [p for p in pending if p.recommendation_id in claimed][:limit]
+
+    if not popped:
+        db.rollback()
+        # nothing queued yet (new user), serve a cheap random batch right away
+        recipes = generate_simple_recommendations(db, user_id, limit)
+    else:
+        db.query(RecipeRecommendation).filter(
+            RecipeRecommendation.recommendation_id.in_([p.recommendation_id for p in popped])
+        ).update({"status": "shown"}, synchronize_session=False)
+        db.commit()
+
+        order = {p.recipe_id: i for i, p in enumerate(popped)}
+        recipes = db.query(Recipe).filter(Recipe.recipe_id.in_(list(order))).all()
+        recipes.sort(key=lambda r: order[r.recipe_id])
+
+    # Add average rating and total ratings to each recipe (one query for the whole deck)
+    return apply_recipe_stats(db, recipes)
+
+RECORD_INTERACTION_SQL = text("BEGIN record_interaction(:user_id, :recipe_id, :interaction_type); END;")
+
+def _existing_likes(db: Session, rows: List[tuple]) -> set:
+    """(user_id, recipe_id) pairs of like rows that are already favorites."""
+    likes = {(user_id, recipe_id) for user_id, recipe_id, kind in rows if kind == 'like'}
+    if not likes:
+        return set()
+    existing = db.query(Favorite.user_id, Favorite.recipe_id).filter(
+        Favorite.user_id.in_({user_id for user_id, _ in likes}),
+        Favorite.recipe_id.in_({recipe_id for _, recipe_id in likes})
+    )
+    return {(user_id, recipe_id) for user_id, recipe_id in existing} & likes
+
+def _after_interaction(db: Session, user_id: int, recipe_id: int, interaction_type: str, new_like: bool = True):
+    """Keep the in-process indexes in step with a committed interaction."""
+    # likes and saves feed the item-to-item index (dislikes are ignored there)
+    cooccurrence_index.add(user_id, recipe_id, interaction_type)
+    exclusion_store.add(user_id, recipe_id)
+    if interaction_type == 'like':
+        # re-liking leaves the favorite row as it was, so it is not counted again
+        if new_like:
+            leaderboards.record_favorite(recipe_id)
+    elif interaction_type == 'save':
+        leaderboards.record_save(recipe_id)
+    collection_search.add(db, user_id, recipe_id, interaction_type)
+    # favourite count and saved state on the details page
+    response_cache.invalidate(f"recipe:{recipe_id}")
 
 def record_interaction(db: Session, user_id: int, recipe_id: int, interaction_type: str):
     """Record interaction using the database procedure."""
+    already_liked = _existing_likes(db, [(user_id, recipe_id, interaction_type)])
     db.execute(
-        text("BEGIN record_interaction(:user_id, :recipe_id, :interaction_type); END;"),
+        RECORD_INTERACTION_SQL,
         {
             "user_id": user_id, 
             "recipe_id": recipe_id, 
             "interaction_type": interaction_type
         }
     )
+    # the procedure owns the favorites/saves/dislikes rows, so recount this recipe
+    refresh_recipe_stats(db, [recipe_id])
     db.commit()
 
+    _after_interaction(db, user_id, recipe_id, interaction_type, new_like=not already_liked)
+
+def record_interactions(db: Session, user_id: int, interactions: List[tuple]) -> List[tuple]:
+    """Record many (recipe_id, interaction_type) pairs in one transaction.
+
+    The parameter list is sent as a single executemany of the PL/SQL block,
+    so a whole swipe session costs one round trip and one commit. If that
+    fails, each pair is retried in its own savepoint; the pairs that still
+    fail are returned and the rest are committed.
+    """
+    rows = [(user_id, recipe_id, kind) for recipe_id, kind in interactions]
+    if not rows:
+        return []
+    failed = []
+    already_liked = _existing_likes(db, rows)
+    try:
+        with db.begin_nested():
+            _execute_interaction_rows(db, rows)
+    except DBAPIError as e:
+        print(f"Error recording interaction batch, retrying one by one: {e}")
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    _execute_interaction_rows(db, [row])
+            except DBAPIError as e:
+                print(f"Error recording interaction {row}: {e}")
+                failed.append(row)
+        rows = [row for row in rows if row not in failed]
+    _commit_interaction_rows(db, rows, already_liked)
+    return [(recipe_id, kind) for _, recipe_id, kind in failed]
+
+def record_interaction_rows(db: Session, rows: List[tuple]):
+    """Record (user_id, recipe_id, interaction_type) rows with one executemany and one commit."""
+    if not rows:
+        return
+    already_liked = _existing_likes(db, rows)
+    _execute_interaction_rows(db, rows)
+    _commit_interaction_rows(db, rows, already_liked)
+
+def _execute_interaction_rows(db: Session, rows: List[tuple]):
+    db.execute(
+        RECORD_INTERACTION_SQL,
+        [
+            {"user_id": user_id, "recipe_id": recipe_id, "interaction_type": interaction_type}
+            for user_id, recipe_id, interaction_type in rows
+        ]
+    )
+
+def _commit_interaction_rows(db: Session, rows: List[tuple], already_liked: set = frozenset()):
+    if rows:
+        refresh_recipe_stats(db, (recipe_id for _, recipe_id, _ in rows))
+    db.commit()
+
+    liked = set(already_liked)
+    for user_id, recipe_id, interaction_type in rows:
+        new_like = interaction_type == 'like' and (user_id, recipe_id) not in liked
+        if new_like:
+            liked.add((user_id, recipe_id))
+        _after_interaction(db, user_id, recipe_id, interaction_type, new_like)
+
+interaction_buffer = InteractionWriteBuffer(
+    record_interaction_rows,
+    SessionLocal,
+    max_size=settings.INTERACTION_BUFFER_SIZE,
+    flush_interval_ms=settings.INTERACTION_FLUSH_INTERVAL_MS,
+    flush_events=settings.INTERACTION_FLUSH_EVENTS,
+    put_timeout_ms=settings.INTERACTION_BUFFER_PUT_TIMEOUT_MS
+)
+
+def submit_interaction(db: Session, user_id: int, recipe_id: int, interaction_type: str):
+    """Record an interaction, through the write-behind buffer when it is enabled.
 
+    The user's own exclusion bitmap is updated straight away so the recipe is
+    not recommended again while the write is still queued. A full buffer
+    falls back to the synchronous write.
+    """
+    if settings.INTERACTION_WRITE_BEHIND and interaction_buffer.submit(user_id, recipe_id, interaction_type):
+        exclusion_store.add(user_id, recipe_id)
+        return
+    record_interaction(db, user_id, recipe_id, interaction_type)
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.core.config import settings
+
+RECIPE_SEARCH = "recipes"
+INGREDIENT_SEARCH = "ingredients"
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class SearchResultCache:
+    """LRU + TTL cache of search results keyed by (kind, normalised query, params).
+
+    Writes that could change a cached answer call `invalidate()` with a
+    predicate over the normalised query, so only matching entries are
+    dropped. Changes a predicate cannot see (fuzzy matches, usage ranking)
+    age out with the TTL.
+    """
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, kind: str, query: str, *params: Hashable) -> Any:
+        """Cached value, or None on a miss."""
+        key = (kind, normalize_query(query)) + params
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, kind: str, query: str, params: Tuple[Hashable, ...], value: Any):
+        key = (kind, normalize_query(query)) + tuple(params)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, kind: str, matches: Callable[[str], bool]) -> int:
+        """Drop entries of `kind` whose normalised query satisfies `matches`."""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == kind and matches(key[1])]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "invalidations": self.invalidations,
+        }
+
+
+search_cache = SearchResultCache(
+    max_entries=settings.SEARCH_CACHE_SIZE,
+    ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+)
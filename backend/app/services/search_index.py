@@ -0,0 +1,258 @@
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.recipe import Recipe
+from app.models.ingredient import Ingredient, RecipeIngredient
+
+# BM25F-style: a term's frequency is weighted by the field it appears in
+FIELD_WEIGHTS = {"title": 3.0, "ingredients": 1.5, "description": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# the last query token is usually still being typed, so it also matches by prefix
+PREFIX_DISCOUNT = 0.8
+PREFIX_MIN_LENGTH = 2
+MAX_PREFIX_EXPANSIONS = 16
+# added per matched query token, so covering more of the query always wins over BM25
+COVERAGE_BOOST = 1000.0
+# per-document length norms are cached and only recomputed once the average
+# document length has drifted by this fraction
+NORM_REFRESH_DRIFT = 0.05
+
+STOPWORDS = frozenset({"a", "an", "and", "the", "of", "with", "in", "on", "for", "to", "or"})
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    return [t for t in _TOKEN_RE.findall(value.lower()) if t not in STOPWORDS]
+
+
+def normalize_title(title: Optional[str]) -> str:
+    return " ".join(_TOKEN_RE.findall((title or "").lower()))
+
+
+class SearchIndex:
+    """Tokenised inverted index with BM25 ranking and prefix matching.
+
+    Each document is a set of text fields (see FIELD_WEIGHTS) plus a small
+    payload returned with hits, so results can be served without touching
+    the database. Documents can be added and removed at any time.
+    """
+
+    def __init__(self, field_weights: Dict[str, float] = FIELD_WEIGHTS):
+        self.field_weights = field_weights
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._payloads: Dict[int, Dict[str, Any]] = {}
+        self._vocabulary: List[str] = []   # sorted, for prefix lookups
+        self._total_length = 0.0
+        self._norms: Dict[int, float] = {}
+        self._norm_average = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_lengths
+
+    def payload(self, doc_id: int) -> Optional[Dict[str, Any]]:
+        return self._payloads.get(doc_id)
+
+    def add(self, doc_id: int, fields: Dict[str, Optional[str]], payload: Optional[Dict[str, Any]] = None):
+        terms: Dict[str, float] = defaultdict(float)
+        for field, value in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            for token in tokenize(value):
+                terms[token] += weight
+
+        with self._lock:
+            self._remove(doc_id)
+            for term, frequency in terms.items():
+                postings = self._postings[term]
+                if not postings:
+                    insort(self._vocabulary, term)
+                postings[doc_id] = frequency
+            self._doc_terms[doc_id] = dict(terms)
+            self._doc_lengths[doc_id] = sum(terms.values())
+            self._total_length += self._doc_lengths[doc_id]
+            self._payloads[doc_id] = payload or {}
+            if self._norm_average:
+                self._norms[doc_id] = self._length_norm(self._doc_lengths[doc_id], self._norm_average)
+
+    def remove(self, doc_id: int):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: int):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                i = bisect_left(self._vocabulary, term)
+                if i < len(self._vocabulary) and self._vocabulary[i] == term:
+                    del self._vocabulary[i]
+        self._total_length -= self._doc_lengths.pop(doc_id, 0.0)
+        self._payloads.pop(doc_id, None)
+        self._norms.pop(doc_id, None)
+
+    @staticmethod
+    def _length_norm(length: float, average_length: float) -> float:
+        return BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+
+    def _current_norms(self) -> Dict[int, float]:
+        average_length = self._total_length / len(self._doc_lengths) or 1.0
+        if not self._norm_average or abs(average_length - self._norm_average) > NORM_REFRESH_DRIFT * self._norm_average:
+            self._norm_average = average_length
+            self._norms = {d: self._length_norm(l, average_length) for d, l in self._doc_lengths.items()}
+        return self._norms
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        matches = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                matches.append(term)
+        if len(matches) > MAX_PREFIX_EXPANSIONS:
+            # keep the most common completions
+            matches.sort(key=lambda t: -len(self._postings[t]))
+            del matches[MAX_PREFIX_EXPANSIONS:]
+        return matches
+
+    def rank(self, query: str, prefix: bool = True) -> List[Tuple[int, float]]:
+        """All matching documents as (doc_id, score), best first.
+
+        Documents matching more query tokens always rank above those matching
+        fewer; BM25 orders documents within the same coverage.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            n = len(self._doc_lengths)
+            if n == 0:
+                return []
+            norms = self._current_norms()
+
+            scores: Dict[int, float] = defaultdict(float)
+            for position, token in enumerate(tokens):
+                candidates = [(token, 1.0)] if token in self._postings else []
+                if prefix and position == len(tokens) - 1 and len(token) >= PREFIX_MIN_LENGTH:
+                    candidates.extend((t, PREFIX_DISCOUNT) for t in self._expand_prefix(token))
+
+                # a document counts once per query token, through its best-scoring expansion
+                token_scores: Dict[int, float] = {}
+                for term, discount in candidates:
+                    postings = self._postings[term]
+                    df = len(postings)
+                    weight = discount * math.log(1 + (n - df + 0.5) / (df + 0.5)) * (BM25_K1 + 1)
+                    for doc_id, frequency in postings.items():
+                        score = weight * frequency / (frequency + norms[doc_id])
+                        if score > token_scores.get(doc_id, 0.0):
+                            token_scores[doc_id] = score
+                for doc_id, score in token_scores.items():
+                    scores[doc_id] += score + COVERAGE_BOOST
+
+        # sort on (-score, id): best first, ties by ascending id
+        ranked = sorted((-score, doc_id) for doc_id, score in scores.items())
+        return [(doc_id, -negative) for negative, doc_id in ranked]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        after: Optional[Tuple[float, int]] = None,
+        dedupe_titles: bool = True,
+    ) -> Tuple[List[Tuple[int, float]], Optional[Tuple[float, int]]]:
+        """One page of hits and the keyset position of the last one (None on the last page).
+
+        Ranking is deduplicated by normalised title before paging, so the
+        same dish posted twice never appears twice across pages.
+        """
+        page: List[Tuple[int, float]] = []
+        seen_titles = set()
+        has_more = False
+        for doc_id, score in self.rank(query):
+            if dedupe_titles:
+                title = normalize_title((self._payloads.get(doc_id) or {}).get("title"))
+                if title in seen_titles:
+                    continue
+                seen_titles.add(title)
+            # keyset: scores descend, ties broken by ascending id
+            if after is not None and (score > after[0] or (score == after[0] and doc_id <= after[1])):
+                continue
+            if len(page) == limit:
+                has_more = True
+                break
+            page.append((doc_id, score))
+
+        next_after = (page[-1][1], page[-1][0]) if has_more and page else None
+        return page, next_after
+
+
+class RecipeSearchIndex(SearchIndex):
+    """Catalogue-wide recipe search over title, description and ingredient names."""
+
+    def add_recipe(
+        self,
+        recipe_id: int,
+        title: str,
+        description: Optional[str],
+        image_url: Optional[str],
+        ingredient_names: Iterable[str] = (),
+    ):
+        self.add(
+            recipe_id,
+            {"title": title, "description": description, "ingredients": " ".join(ingredient_names)},
+            {"recipe_id": recipe_id, "title": title, "image_url": image_url},
+        )
+
+    def rebuild(self, recipe_rows, ingredient_rows):
+        """Reload from (recipe_id, title, description, image_url) and (recipe_id, ingredient name) rows."""
+        ingredients: Dict[int, List[str]] = defaultdict(list)
+        for recipe_id, name in ingredient_rows:
+            ingredients[recipe_id].append(name)
+
+        fresh = RecipeSearchIndex(self.field_weights)
+        for recipe_id, title, description, image_url in recipe_rows:
+            fresh.add_recipe(recipe_id, title, description, image_url, ingredients.get(recipe_id, ()))
+
+        with self._lock:
+            self._postings = fresh._postings
+            self._doc_terms = fresh._doc_terms
+            self._doc_lengths = fresh._doc_lengths
+            self._payloads = fresh._payloads
+            self._vocabulary = fresh._vocabulary
+            self._total_length = fresh._total_length
+            self._norms = {}
+            self._norm_average = 0.0
+
+
+recipe_search_index = RecipeSearchIndex()
+
+
+def rebuild_recipe_search_index(db: Session):
+    """Index every recipe's title, description and ingredient names."""
+    recipe_rows = db.query(Recipe.recipe_id, Recipe.title, Recipe.description, Recipe.image_url).all()
+    ingredient_rows = db.query(RecipeIngredient.recipe_id, Ingredient.name).join(
+        Ingredient, Ingredient.ingredient_id == RecipeIngredient.ingredient_id
+    ).all()
+    recipe_search_index.rebuild(recipe_rows, ingredient_rows)
+    print(f"Recipe search index built for {len(recipe_search_index)} recipes")
@@ -0,0 +1,192 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from app.models.favorite import Favorite
+from app.models.save import Save
+from app.models.dislike import Dislike
+from app.models.user_similarity import UserSimilarity
+
+# same weights as the per-user python version in OLD_recommendation_service
+FAVORITE_WEIGHT = 1.0
+SAVE_WEIGHT = 0.5
+DISLIKE_WEIGHT = -0.1
+
+
+class InteractionMatrix:
+    """Sparse user x recipe matrix of weighted interactions."""
+
+    def __init__(self, matrix: sparse.csr_matrix, user_ids: np.ndarray, recipe_ids: np.ndarray):
+        self.matrix = matrix
+        self.user_ids = user_ids
+        self.recipe_ids = recipe_ids
+        self.user_index = {int(u): i for i, u in enumerate(user_ids)}
+        self.recipe_index = {int(r): i for i, r in enumerate(recipe_ids)}
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.matrix.shape
+
+
+def build_interaction_matrix(rows: Sequence[Tuple[int, int, float]]) -> InteractionMatrix:
+    """Build the matrix from (user_id, recipe_id, weight) triples, summing duplicates."""
+    if not rows:
+        return InteractionMatrix(
+            sparse.csr_matrix((0, 0), dtype=np.float32),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+        )
+
+    users = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    recipes = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+    weights = np.fromiter((r[2] for r in rows), dtype=np.float32, count=len(rows))
+
+    user_ids, user_pos = np.unique(users, return_inverse=True)
+    recipe_ids, recipe_pos = np.unique(recipes, return_inverse=True)
+
+    # coo -> csr sums duplicate (user, recipe) entries, e.g. favorite + save = 1.5
+    matrix = sparse.coo_matrix(
+        (weights, (user_pos, recipe_pos)),
+        shape=(len(user_ids), len(recipe_ids)),
+    ).tocsr()
+    matrix.eliminate_zeros()
+
+    return InteractionMatrix(matrix, user_ids, recipe_ids)
+
+
+def load_interaction_matrix(db: Session) -> InteractionMatrix:
+    """Load favorites, saves and dislikes in three queries and build the matrix."""
+    rows: List[Tuple[int, int, float]] = []
+    rows.extend((u, r, FAVORITE_WEIGHT) for u, r in db.query(Favorite.user_id, Favorite.recipe_id))
+    rows.extend((u, r, SAVE_WEIGHT) for u, r in db.query(Save.user_id, Save.recipe_id))
+    rows.extend((u, r, DISLIKE_WEIGHT) for u, r in db.query(Dislike.user_id, Dislike.recipe_id))
+    return build_interaction_matrix(rows)
+
+
+def normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """L2-normalise each row so that a dot product is a cosine similarity."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(matrix).tocsr().astype(np.float32)
+
+
+def compute_top_n_similarities(
+    interactions: InteractionMatrix,
+    top_n: int = 10,
+    chunk_size: int = 256,
+    user_ids: Optional[Sequence[int]] = None,
+) -> Dict[int, List[Tuple[int, float]]]:
+    """Cosine top-N neighbours for every user (or only `user_ids`).
+
+    Rows are processed `chunk_size` users at a time so the dense similarity
+    block stays bounded at chunk_size x n_users floats.
+    """
+    n_users = interactions.shape[0]
+    if n_users < 2 or top_n <= 0:
+        return {}
+
+    normalized = normalize_rows(interactions.matrix)
+    normalized_t = normalized.T.tocsr()
+
+    if user_ids is None:
+        rows = np.arange(n_users)
+    else:
+        rows = np.array(
+            [interactions.user_index[u] for u in user_ids if u in interactions.user_index],
+            dtype=np.int64,
+        )
+
+    k = min(top_n, n_users - 1)
+    results: Dict[int, List[Tuple[int, float]]] = {}
+
+    for start in range(0, len(rows), chunk_size):
+        chunk_rows = rows[start:start + chunk_size]
+        product = normalized[chunk_rows].dot(normalized_t)
+
+        # users that share no recipe are structurally zero; keep them out of the top-N
+        block = np.full(product.shape, -np.inf, dtype=np.float32)
+        coo = product.tocoo()
+        block[coo.row, coo.col] = coo.data
+        block[np.arange(len(chunk_rows)), chunk_rows] = -np.inf
+
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for i, row in enumerate(chunk_rows):
+            neighbours = [
+                (int(interactions.user_ids[col]), float(score))
+                for col, score in zip(top[i], top_scores[i])
+                if np.isfinite(score)
+            ]
+            if neighbours:
+                results[int(interactions.user_ids[row])] = neighbours
+
+    return results
+
+
+def write_user_similarities(
+    db: Session,
+    similarities: Dict[int, List[Tuple[int, float]]],
+    user_ids: Optional[Sequence[int]] = None,
+) -> int:
+    """Replace user_similarity rows in bulk; only `user_ids` rows when given."""
+    delete = UserSimilarity.__table__.delete()
+    if user_ids is not None:
+        delete = delete.where(UserSimilarity.user_id_1.in_(list(user_ids)))
+    db.execute(delete)
+
+    now = datetime.now()
+    rows = [
+        {
+            "user_id_1": user_id,
+            "user_id_2": other_id,
+            "similarity_score": score,
+            "last_updated": now,
+        }
+        for user_id, neighbours in similarities.items()
+        for other_id, score in neighbours
+    ]
+    if rows:
+        # a list of parameter sets runs as a single executemany
+        db.execute(UserSimilarity.__table__.insert(), rows)
+
+    db.commit()
+    return len(rows)
+
+
+def refresh_user_similarities(
+    db: Session,
+    top_n: int = 10,
+    chunk_size: int = 256,
+    user_ids: Optional[Sequence[int]] = None,
+) -> int:
+    """Recompute and store top-N similar users for everyone (or only `user_ids`)."""
+    try:
+        interactions = load_interaction_matrix(db)
+        similarities = compute_top_n_similarities(
+            interactions, top_n=top_n, chunk_size=chunk_size, user_ids=user_ids
+        )
+        return write_user_similarities(db, similarities, user_ids=user_ids)
+    except Exception as e:
+        db.rollback()
+        print(f"Error refreshing user similarities: {e}")
+        return 0
+
+
+if __name__ == "__main__":
+    import time
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        written = refresh_user_similarities(db)
+        print(f"Wrote {written} user_similarity rows in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
@@ -0,0 +1,289 @@
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.similarity_service import (
+    InteractionMatrix,
+    compute_top_n_similarities,
+    load_interaction_matrix,
+    normalize_rows,
+)
+
+# mersenne prime for the universal hash family used by MinHash
+_PRIME = (1 << 31) - 1
+
+# 16 bands of 4 rows: users become candidates from a Jaccard of about
+# (1/16) ** (1/4) = 0.5, instead of sharing any single minimum
+NUM_PERM = 64
+ROWS_PER_BAND = 4
+
+# candidates re-ranked per query; popular-recipe buckets are cut off here
+MAX_CANDIDATES = 2000
+
+# non-zeros hashed at once when signing users (num_perm int64s each)
+SIGNATURE_CHUNK_NNZ = 1 << 16
+
+
+class UserLSHIndex:
+    """MinHash LSH over each user's interacted recipe set.
+
+    Every user gets `num_perm` MinHash values, split into bands of
+    `rows_per_band`. Users that agree on a whole band share a bucket; a query
+    unions the user's buckets and re-ranks only those candidates by exact
+    cosine on the weighted interaction vectors, so it never touches users
+    without a shared band. Buckets are visited smallest first and at most
+    `max_candidates` users are re-ranked, so a bucket of everyone who liked
+    the same blockbuster recipe cannot turn a query into a full scan.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = NUM_PERM,
+        rows_per_band: int = ROWS_PER_BAND,
+        seed: int = 42,
+        max_candidates: int = MAX_CANDIDATES,
+    ):
+        if num_perm % rows_per_band:
+            raise ValueError("num_perm must be a multiple of rows_per_band")
+        self.num_perm = num_perm
+        self.rows_per_band = rows_per_band
+        self.seed = seed
+        self.max_candidates = max_candidates
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.user_index: Dict[int, int] = {}
+        self._vectors: Optional[sparse.csr_matrix] = None
+        self._groups = np.empty((0, 0), dtype=np.int64)   # band x user -> bucket id
+        self._orders = np.empty((0, 0), dtype=np.int64)   # band -> users sorted by bucket
+        self._starts: List[np.ndarray] = []               # band -> bucket offsets into _orders
+
+    @property
+    def num_bands(self) -> int:
+        return self.num_perm // self.rows_per_band
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def _hash_params(self) -> Tuple[np.ndarray, np.ndarray]:
+        rng = np.random.default_rng(self.seed)
+        a = rng.integers(1, _PRIME, size=self.num_perm, dtype=np.int64)
+        b = rng.integers(0, _PRIME, size=self.num_perm, dtype=np.int64)
+        return a, b
+
+    def _signatures(
+        self, matrix: sparse.csr_matrix, recipe_ids: np.ndarray, chunk_nnz: int = SIGNATURE_CHUNK_NNZ
+    ) -> np.ndarray:
+        a, b = self._hash_params()
+        n_users = matrix.shape[0]
+        signatures = np.full((n_users, self.num_perm), _PRIME, dtype=np.int64)
+
+        # chunk by non-zeros, not users: the hash block is num_perm x nnz, and a
+        # few heavy users would otherwise blow it up
+        start = 0
+        while start < n_users:
+            fits = int(np.searchsorted(matrix.indptr, matrix.indptr[start] + chunk_nnz, side="right")) - 1
+            end = min(max(fits, start + 1), n_users)   # a single user may exceed the budget alone
+            chunk = matrix[start:end]
+            lengths = np.diff(chunk.indptr)
+            chunk_start, start = start, end
+            if not chunk.nnz:
+                continue
+            items = recipe_ids[chunk.indices] % _PRIME
+            hashed = (a[:, None] * items[None, :] + b[:, None]) % _PRIME
+            # reduceat over the csr row boundaries gives the per-user minimum
+            non_empty = np.flatnonzero(lengths)
+            minima = np.minimum.reduceat(hashed, chunk.indptr[non_empty], axis=1)
+            signatures[chunk_start + non_empty] = minima.T
+
+        return signatures
+
+    def build(self, interactions: InteractionMatrix):
+        """Hash every user and bucket the bands."""
+        signatures = self._signatures(interactions.matrix, interactions.recipe_ids)
+        n_users = len(interactions.user_ids)
+
+        groups = np.empty((self.num_bands, n_users), dtype=np.int64)
+        orders = np.empty((self.num_bands, n_users), dtype=np.int64)
+        starts = []
+        for band in range(self.num_bands):
+            rows = signatures[:, band * self.rows_per_band:(band + 1) * self.rows_per_band]
+            _, group = np.unique(rows, axis=0, return_inverse=True)
+            group = group.ravel()
+            order = np.argsort(group, kind="stable")
+            groups[band] = group
+            orders[band] = order
+            starts.append(np.searchsorted(group[order], np.arange(group.max() + 2 if n_users else 1)))
+
+        self.user_ids = interactions.user_ids
+        self.user_index = dict(interactions.user_index)
+        self._vectors = normalize_rows(interactions.matrix)
+        self._groups = groups
+        self._orders = orders
+        self._starts = starts
+
+    def candidates(self, user_id: int) -> np.ndarray:
+        """Rows of users sharing a band bucket with `user_id`, at most `max_candidates`."""
+        row = self.user_index.get(user_id)
+        if row is None:
+            return np.empty(0, dtype=np.int64)
+        buckets = []
+        for band in range(self.num_bands):
+            group = self._groups[band, row]
+            buckets.append((self._starts[band][group], self._starts[band][group + 1], band))
+
+        # small buckets are the most specific matches; an oversized one is truncated
+        found = np.empty(0, dtype=np.int64)
+        for start, end, band in sorted(buckets, key=lambda bucket: bucket[1] - bucket[0]):
+            room = self.max_candidates + 1 - len(found)   # + 1 for the user's own row
+            if room <= 0:
+                break
+            found = np.union1d(found, self._orders[band, start:min(end, start + room)])
+        found = found[found != row]
+        return found[:self.max_candidates]
+
+    def query(self, user_id: int, top_n: int = 10) -> List[Tuple[int, float]]:
+        """Approximate cosine top-N neighbours of `user_id`."""
+        row = self.user_index.get(user_id)
+        if row is None or self._vectors is None:
+            return []
+        found = self.candidates(user_id)
+        if not len(found):
+            return []
+
+        scores = np.asarray(self._vectors[found].dot(self._vectors[row].T).todense()).ravel()
+        keep = scores != 0
+        found, scores = found[keep], scores[keep]
+        if len(found) > top_n:
+            top = np.argpartition(-scores, top_n - 1)[:top_n]
+            found, scores = found[top], scores[top]
+        order = np.argsort(-scores)
+        return [(int(self.user_ids[found[i]]), float(scores[i])) for i in order]
+
+    def save(self, path: str):
+        """Persist the index as a single .npz file (written atomically)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            params=np.array([self.num_perm, self.rows_per_band, self.seed]),
+            user_ids=self.user_ids,
+            groups=self._groups,
+            orders=self._orders,
+            starts=np.concatenate(self._starts) if self._starts else np.empty(0, dtype=np.int64),
+            start_offsets=np.cumsum([0] + [len(s) for s in self._starts]),
+            data=self._vectors.data,
+            indices=self._vectors.indices,
+            indptr=self._vectors.indptr,
+            shape=np.array(self._vectors.shape),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "UserLSHIndex":
+        with np.load(path) as stored:
+            num_perm, rows_per_band, seed = (int(x) for x in stored["params"])
+            index = cls(num_perm=num_perm, rows_per_band=rows_per_band, seed=seed)
+            index.user_ids = stored["user_ids"]
+            index.user_index = {int(u): i for i, u in enumerate(index.user_ids)}
+            index._groups = stored["groups"]
+            index._orders = stored["orders"]
+            offsets = stored["start_offsets"]
+            index._starts = [stored["starts"][offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+            index._vectors = sparse.csr_matrix(
+                (stored["data"], stored["indices"], stored["indptr"]),
+                shape=tuple(stored["shape"]),
+            )
+        return index
+
+
+# loaded from settings.USER_LSH_INDEX_PATH at startup when the file exists
+_lsh_lock = threading.Lock()
+_lsh_index: Optional[UserLSHIndex] = None
+
+
+def get_user_lsh_index() -> Optional[UserLSHIndex]:
+    return _lsh_index
+
+
+def set_user_lsh_index(index: Optional[UserLSHIndex]):
+    global _lsh_index
+    with _lsh_lock:
+        _lsh_index = index
+
+
+def load_user_lsh_index(db: Session = None):
+    """Load the persisted index if the offline job has written one."""
+    path = settings.USER_LSH_INDEX_PATH
+    if not os.path.exists(path):
+        print(f"No user LSH index at {path}, similar users fall back to the database procedure")
+        return
+    set_user_lsh_index(UserLSHIndex.load(path))
+    print(f"User LSH index loaded for {len(_lsh_index)} users")
+
+
+def build_user_lsh_index(db: Session, path: Optional[str] = None) -> UserLSHIndex:
+    """Rebuild the index from the interaction tables and write it to disk."""
+    index = UserLSHIndex()
+    index.build(load_interaction_matrix(db))
+    index.save(path or settings.USER_LSH_INDEX_PATH)
+    set_user_lsh_index(index)
+    return index
+
+
+def benchmark_recall(
+    index: UserLSHIndex,
+    interactions: InteractionMatrix,
+    top_n: int = 10,
+    sample_size: int = 200,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Compare LSH neighbours with the exact cosine top-N on a sample of users.
+
+    `exact_ms_per_user` is amortised over one chunked batch computation.
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(sample_size, len(interactions.user_ids))
+    sample = [int(u) for u in rng.choice(interactions.user_ids, size=sample_size, replace=False)]
+
+    started = time.perf_counter()
+    exact = compute_top_n_similarities(interactions, top_n=top_n, user_ids=sample)
+    exact_ms = (time.perf_counter() - started) * 1000 / max(sample_size, 1)
+
+    latencies = []
+    hits = total = 0
+    for user_id in sample:
+        started = time.perf_counter()
+        approx = index.query(user_id, top_n=top_n)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        truth = {u for u, _ in exact.get(user_id, [])}
+        hits += len(truth & {u for u, _ in approx})
+        total += len(truth)
+
+    return {
+        "users": sample_size,
+        "recall": hits / total if total else 1.0,
+        "lsh_ms_mean": float(np.mean(latencies)) if latencies else 0.0,
+        "lsh_ms_p95": float(np.percentile(latencies, 95)) if latencies else 0.0,
+        "exact_ms_per_user": exact_ms,
+    }
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        interactions = load_interaction_matrix(db)
+        index = UserLSHIndex()
+        index.build(interactions)
+        index.save(settings.USER_LSH_INDEX_PATH)
+        print(f"Wrote user LSH index for {len(index)} users to {settings.USER_LSH_INDEX_PATH}")
+        print(benchmark_recall(index, interactions))
+    finally:
+        db.close()
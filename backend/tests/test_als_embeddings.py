@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+
+from app.services import embedding_store
+from app.services.als_trainer import KEEP_VERSIONS, current_embeddings_dir, save_embeddings, train_als
+from app.services.embedding_store import EmbeddingStore
+from app.services.similarity_service import build_interaction_matrix
+
+
+def two_taste_groups():
+    # users 1-10 like recipes 100-109, users 11-20 like 200-209; each user leaves one out
+    rows = []
+    for user_id in range(1, 21):
+        base = 100 if user_id <= 10 else 200
+        rows.extend((user_id, base + r, 1.0) for r in range(10) if r != user_id % 10)
+    rows.append((1, 205, -0.1))   # a dislike from the other group
+    return build_interaction_matrix(rows)
+
+
+def test_als_ranks_the_users_own_group_first(tmp_path):
+    interactions = two_taste_groups()
+    user_factors, recipe_factors = train_als(interactions, factors=4, iterations=8)
+    assert user_factors.dtype == np.float32
+    assert user_factors.shape == (20, 4) and recipe_factors.shape == (20, 4)
+
+    store = EmbeddingStore(save_embeddings(str(tmp_path), interactions, user_factors, recipe_factors))
+    assert isinstance(store.recipe_factors, np.memmap)
+    assert 1 in store and 404 not in store
+
+    # user 1 skipped recipe 101; it should still beat every recipe of the other group
+    seen = {100 + r for r in range(10) if r != 1}
+    top = store.top_recipes(1, 5, exclude=seen)
+    assert top[0][0] == 101
+    assert all(recipe_id >= 200 for recipe_id, _ in top[1:])
+
+    scores = store.score(1, [101, 205, 999])
+    assert set(scores) == {101, 205}
+    assert scores[101] > scores[205]
+
+
+def test_each_training_run_is_switched_in_as_a_whole(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    assert current_embeddings_dir(directory) is None
+
+    interactions = two_taste_groups()
+    user_factors, recipe_factors = train_als(interactions, factors=4, iterations=2)
+    versions = []
+    for run in range(KEEP_VERSIONS + 1):
+        monkeypatch.setattr(os, "getpid", lambda run=run: run)   # distinct names within one second
+        versions.append(save_embeddings(directory, interactions, user_factors, recipe_factors))
+        assert current_embeddings_dir(directory) == versions[-1]
+
+    # older versions are pruned, and no temporary directories are left behind
+    assert not os.path.exists(versions[0])
+    assert sorted(os.listdir(directory)) == sorted(
+        ["CURRENT"] + [os.path.basename(v) for v in versions[-KEEP_VERSIONS:]]
+    )
+
+    monkeypatch.setattr(embedding_store.settings, "EMBEDDINGS_DIR", directory)
+    monkeypatch.setattr(embedding_store, "_embedding_store", None)
+    embedding_store.load_embedding_store()
+    assert embedding_store.get_embedding_store().directory == versions[-1]
@@ -0,0 +1,63 @@
+import random
+from types import SimpleNamespace
+
+from app.services.category_index import CategoryIndex
+
+
+def card_row(recipe_id):
+    return (recipe_id, f"Recipe {recipe_id}", None, 10, 20, None)
+
+
+def build_index():
+    index = CategoryIndex()
+    index.rebuild(
+        [(1, "Dessert"), (2, " Vegan ")],
+        [card_row(recipe_id) for recipe_id in range(1, 31)],
+        [(recipe_id, 1) for recipe_id in range(1, 31)] + [(recipe_id, 2) for recipe_id in range(1, 31, 3)]
+        + [(99, 1)],   # membership of a recipe without a card is ignored
+    )
+    return index
+
+
+def test_category_names_are_case_insensitive():
+    index = build_index()
+    assert index.category_id("dessert") == 1
+    assert index.category_id("VEGAN") == 2
+    assert index.category_id("soup") is None
+    assert index.size(1) == 30 and index.size(2) == 10
+
+
+def test_sample_returns_distinct_members():
+    index = build_index()
+    picks = index.sample(2, 5, rng=random.Random(1))
+    ids = [card["recipe_id"] for card in picks]
+    assert len(set(ids)) == 5
+    assert all(recipe_id % 3 == 1 for recipe_id in ids)
+    assert len(index.sample(2, 50)) == 10
+    assert index.sample(3, 5) == []
+
+
+def test_pages_walk_newest_first_without_gaps():
+    index = build_index()
+    seen, before, more = [], None, True
+    while more:
+        cards, more = index.page(1, 7, before=before)
+        seen.extend(card["recipe_id"] for card in cards)
+        before = cards[-1]["recipe_id"]
+    assert seen == list(range(30, 0, -1))
+
+
+def test_added_recipes_join_their_categories_once():
+    index = build_index()
+    index.add_category(3, "Soup")
+    recipe = SimpleNamespace(recipe_id=40, title="Leek soup", image_url=None, prep_time=5, cook_time=30,
+                             description=None)
+    index.add_recipe(recipe, [1, 3])
+    index.add_recipe(recipe, [3])
+
+    assert index.category_id("soup") == 3
+    cards, more = index.page(3, 10)
+    assert [card["title"] for card in cards] == ["Leek soup"] and not more
+    # highest id, so first on the dessert page too
+    assert index.page(1, 1)[0][0]["recipe_id"] == 40
+    assert index.size(1) == 31
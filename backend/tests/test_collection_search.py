@@ -0,0 +1,77 @@
+import pytest
+
+from app.models.favorite import Favorite
+from app.models.recipe import Recipe
+from app.models.save import Save
+from app.models.user import User
+from app.services.collection_search import LIKES, SAVES, CollectionSearchCache
+
+TITLES = {1: "Chocolate cake", 2: "Lemon cake", 3: "Tomato soup", 4: "Carrot cake"}
+
+
+@pytest.fixture
+def db(db):
+    for user_id in (1, 2, 3):
+        db.add(User(user_id=user_id, username=f"user{user_id}", email=f"{user_id}@example.com", password_hash="x"))
+    for recipe_id, title in TITLES.items():
+        db.add(Recipe(recipe_id=recipe_id, user_id=2, title=title, description="A family favourite",
+                      instructions="Bake"))
+    db.add_all([Favorite(user_id=1, recipe_id=1), Favorite(user_id=1, recipe_id=3)])
+    db.add_all([Save(user_id=1, recipe_id=1), Save(user_id=1, recipe_id=2)])
+    db.commit()
+    return db
+
+
+def ids(results):
+    return sorted(result["recipe_id"] for result in results)
+
+
+def test_search_filters_by_collection_without_duplicates(db):
+    cache = CollectionSearchCache()
+    assert ids(cache.search(db, 1, "cake", 10)) == [1, 2]
+    assert ids(cache.search(db, 1, "cake", 10, (LIKES,))) == [1]
+    assert ids(cache.search(db, 1, "cake", 10, (SAVES,))) == [1, 2]
+    assert ids(cache.search(db, 1, "soup", 10, (SAVES,))) == []
+    assert len(cache.search(db, 1, "favourite", 2)) == 2
+    assert cache.search(db, 2, "cake", 10) == []
+
+
+def test_writes_update_a_cached_index(db):
+    cache = CollectionSearchCache()
+    cache.search(db, 1, "cake", 10)
+
+    cache.add(db, 1, 4, SAVES)
+    assert ids(cache.search(db, 1, "carrot", 10)) == [4]
+
+    # still saved, so unliking keeps it searchable
+    cache.remove(1, 1, LIKES)
+    assert ids(cache.search(db, 1, "chocolate", 10)) == [1]
+    assert ids(cache.search(db, 1, "chocolate", 10, (LIKES,))) == []
+    cache.remove(1, 1, SAVES)
+    assert cache.search(db, 1, "chocolate", 10) == []
+
+    cache.add(db, 1, 3, "dislike")   # not a collection
+    assert ids(cache.search(db, 1, "soup", 10)) == [3]
+
+
+def test_uncached_users_are_left_to_load_on_their_next_search(db):
+    cache = CollectionSearchCache()
+    cache.add(db, 1, 4, SAVES)
+    assert len(cache) == 0
+
+    db.add(Save(user_id=1, recipe_id=4))
+    db.commit()
+    assert ids(cache.search(db, 1, "carrot", 10)) == [4]
+
+
+def test_least_recently_searched_users_are_evicted(db):
+    cache = CollectionSearchCache(max_users=2)
+    for user_id in (1, 2, 1, 3):
+        cache.search(db, user_id, "cake", 10)
+    assert len(cache) == 2
+    assert cache._cached(2) is None and cache._cached(1) is not None
+
+    cache.invalidate(1)
+    assert cache._cached(1) is None
+    cache.invalidate()
+    assert len(cache) == 0
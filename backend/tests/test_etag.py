@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import APIRouter, FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from app.core import response_cache as rc
+from app.core.etag import etag_matches, make_etag, set_etag
+from app.models.favorite import Favorite
+from app.models.recipe import Recipe
+from app.models.user import User
+
+
+def request_with(if_none_match):
+    scope = {"type": "http", "headers": Headers({"if-none-match": if_none_match}).raw}
+    return Request(scope)
+
+
+def test_etag_depends_on_every_part_of_the_stamp():
+    assert make_etag(1, "a", None) == make_etag(1, "a", None)
+    assert make_etag(1, "a", None) != make_etag(1, "a", 0)
+    assert make_etag(1, datetime(2024, 1, 1)) != make_etag(1, datetime(2024, 1, 2))
+
+
+@pytest.mark.parametrize("header, matches", [
+    ('"abc"', True),
+    ('"x", "abc"', True),
+    ('W/"abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+    ("", False),
+])
+def test_if_none_match_parsing(header, matches):
+    assert etag_matches(request_with(header), '"abc"') is matches
+
+
+@pytest.fixture
+def client(api, Session):
+    db = Session()
+    now = datetime.now()
+    db.add(User(user_id=1, username="cook", email="cook@example.com", password_hash="x"))
+    for recipe_id in (1, 2):
+        db.add(Recipe(recipe_id=recipe_id, user_id=1, title=f"Recipe {recipe_id}", instructions="Stir",
+                      created_at=now, updated_at=now))
+    db.add(Favorite(user_id=1, recipe_id=1, saved_at=now))
+    db.commit()
+    db.close()
+    return api, Session
+
+
+@pytest.mark.parametrize("url", ["/api/v1/recipes/details/1", "/api/v1/users/me", "/api/v1/users/1",
+                                 "/api/v1/collections/likes"])
+def test_unchanged_resources_answer_304(client, url):
+    http, _ = client
+    first = http.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = http.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.content == b""
+
+
+def test_collection_etag_changes_when_an_item_is_added(client):
+    http, Session = client
+    etag = http.get("/api/v1/collections/likes").headers["etag"]
+
+    db = Session()
+    db.add(Favorite(user_id=1, recipe_id=2, saved_at=datetime.now() + timedelta(seconds=1)))
+    db.commit()
+    db.close()
+
+    changed = http.get("/api/v1/collections/likes", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert [card["recipe_id"] for card in changed.json()] == [2, 1]
+
+
+def test_cached_response_answers_304_without_running_the_endpoint(monkeypatch):
+    monkeypatch.setattr(rc, "response_cache", rc.ResponseCache(rc.MemoryBackend()))
+    calls = {"n": 0}
+    router = APIRouter(route_class=rc.CachedRoute)
+
+    @router.get("/things/{thing_id}")
+    @rc.cache_response(ttl=60, tags=("thing:{thing_id}",))
+    def read_thing(thing_id: int, response: Response):
+        calls["n"] += 1
+        set_etag(response, make_etag(thing_id))
+        return {"thing_id": thing_id}
+
+    test_app = FastAPI()
+    test_app.include_router(router)
+    http = TestClient(test_app)
+
+    etag = http.get("/things/1").headers["etag"]
+    hit = http.get("/things/1", headers={"If-None-Match": etag})
+    assert hit.status_code == 304
+    assert hit.headers[rc.CACHE_STATUS_HEADER] == "HIT"
+    assert calls["n"] == 1
@@ -0,0 +1,34 @@
+import random
+
+from app.services.exclusion_bitmap import ARRAY_CONTAINER_LIMIT, RecipeBitmap
+
+
+def test_bitmap_membership_matches_set():
+    random.seed(7)
+    values = {random.randrange(1, 300000) for _ in range(20000)}
+    bitmap = RecipeBitmap(values)
+
+    assert len(bitmap) == len(values)
+    assert list(bitmap) == sorted(values)
+    for value in random.sample(range(1, 300000), 2000):
+        assert (value in bitmap) == (value in values)
+
+
+def test_bitmap_switches_dense_chunks_to_bitset():
+    bitmap = RecipeBitmap(range(ARRAY_CONTAINER_LIMIT + 1))
+    # one 8 KiB bitset instead of 4097 two-byte entries
+    assert bitmap.nbytes() == 8192
+    assert ARRAY_CONTAINER_LIMIT in bitmap
+    assert ARRAY_CONTAINER_LIMIT + 1 not in bitmap
+
+
+def test_bitmap_add_is_idempotent_and_discard_removes():
+    bitmap = RecipeBitmap()
+    bitmap.add(70000)
+    bitmap.add(70000)
+    assert len(bitmap) == 1
+
+    bitmap.discard(70000)
+    bitmap.discard(70000)
+    assert len(bitmap) == 0
+    assert 70000 not in bitmap
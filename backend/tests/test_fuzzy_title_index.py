@@ -0,0 +1,59 @@
+import threading
+
+from app.services import fuzzy_title_index as fti
+from app.services.fuzzy_title_index import FuzzyTitleIndex
+
+
+def found_ids(index, query):
+    return {payload["recipe_id"] for payload, _ in index.search(query, limit=50)}
+
+
+def test_added_recipes_are_found_before_and_after_compaction(monkeypatch):
+    monkeypatch.setattr(fti, "DELTA_LIMIT", 2)
+    index = FuzzyTitleIndex()
+    index.rebuild([(1, "Chocolate cake", None)])
+    index.add(2, "Chocolate cookies")
+    assert found_ids(index, "chocolat") == {1, 2}
+
+    index.add(3, "Chocolate mousse")
+    index.add(4, "Chocolate tart")   # over the limit, folds the delta in the background
+    for thread in threading.enumerate():
+        if thread.name == "fuzzy-title-compact":
+            thread.join()
+    assert not index._compacting
+    assert len(index._delta) == 0
+    assert found_ids(index, "chocolat") == {1, 2, 3, 4}
+
+
+def test_rebuild_during_compaction_wins_and_keeps_later_adds(monkeypatch):
+    monkeypatch.setattr(fti, "DELTA_LIMIT", 1)
+    index = FuzzyTitleIndex()
+    index.rebuild([(1, "Lemon pie", None)])
+
+    building = threading.Event()
+    release = threading.Event()
+    build = FuzzyTitleIndex._build
+
+    def slow_build(payloads):
+        if threading.current_thread().name == "fuzzy-title-compact":
+            building.set()
+            release.wait(5)
+        return build(payloads)
+
+    monkeypatch.setattr(FuzzyTitleIndex, "_build", staticmethod(slow_build))
+    index.add(2, "Lemon bars")
+    index.add(3, "Lemon curd")       # starts a compaction that blocks in _build
+    assert building.wait(5)
+
+    # a full reload (which knows 1-3) lands while the compaction is building,
+    # and one more recipe arrives after the reload read its rows
+    index.rebuild([(1, "Lemon pie", None), (2, "Lemon bars", None), (3, "Lemon curd", None)])
+    index.add(5, "Lemon drizzle cake")
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name == "fuzzy-title-compact":
+            thread.join()
+
+    assert not index._compacting
+    assert found_ids(index, "lemon") == {1, 2, 3, 5}
+    assert len(index) == 4
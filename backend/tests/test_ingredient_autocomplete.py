@@ -0,0 +1,80 @@
+import random
+
+from app.services.ingredient_autocomplete import TOP_K, IngredientAutocomplete
+
+INGREDIENTS = [
+    # (ingredient_id, name, calories, image_url, recipes using it)
+    (1, "Coconut milk", 230, None, 12),
+    (2, "Cocoa powder", 228, None, 30),
+    (3, "Milk", 42, None, 90),
+    (4, "Almond milk", 17, None, 5),
+    (5, "Cod", 82, None, 3),
+    (6, "Corn", 86, None, None),
+]
+
+
+def build_index():
+    index = IngredientAutocomplete()
+    index.rebuild(INGREDIENTS)
+    return index
+
+
+def names(results):
+    return [result["name"] for result in results]
+
+
+def test_every_word_start_is_a_prefix_ranked_by_usage():
+    index = build_index()
+    assert names(index.search("co")) == ["Cocoa powder", "Coconut milk", "Cod", "Corn"]
+    assert names(index.search("mi")) == ["Milk", "Coconut milk", "Almond milk"]
+    assert names(index.search("  MILK ")) == ["Milk", "Coconut milk", "Almond milk"]
+    assert index.search("co", limit=1)[0] == {"ingredient_id": 2, "name": "Cocoa powder", "calories": 228,
+                                               "image_url": None}
+
+
+def test_prefixes_ending_inside_a_split_edge():
+    index = build_index()
+    # "coco" splits the shared edge of "coconut milk" and "cocoa powder"
+    assert names(index.search("coco")) == ["Cocoa powder", "Coconut milk"]
+    assert names(index.search("cocon")) == ["Coconut milk"]
+    assert index.search("cocox") == []
+    assert index.search("") == [] and index.search("co", limit=0) == []
+
+
+def test_inner_substrings_fall_back_to_trigrams():
+    index = build_index()
+    assert names(index.search("onut")) == ["Coconut milk"]
+    assert names(index.search("ilk")) == ["Milk", "Coconut milk", "Almond milk"]
+    assert index.search("xyz") == []
+
+
+def test_usage_and_new_ingredients_update_the_cached_rankings():
+    index = build_index()
+    index.record_usage(5, "Cod", 100)
+    assert names(index.search("co"))[0] == "Cod"
+
+    index.add(7, "Coriander")
+    assert "Coriander" in names(index.search("cor"))
+    assert len(index) == 7
+    # the payload from the rebuild is kept when only usage changes
+    assert index.search("cod")[0]["calories"] == 82
+
+
+def test_matches_a_brute_force_scan():
+    rng = random.Random(11)
+    words = ["red", "green", "chili", "pepper", "sweet", "potato", "pea", "pear", "peanut", "oil", "olive"]
+    rows, seen = [], set()
+    for ingredient_id in range(1, 120):
+        name = " ".join(rng.sample(words, rng.randint(1, 3)))
+        if name not in seen:
+            seen.add(name)
+            rows.append((ingredient_id, name, None, None, rng.randint(0, 50)))
+    index = IngredientAutocomplete()
+    index.rebuild(rows)
+
+    for query in ("p", "pe", "pea", "pean", "ol", "sweet p", "red"):
+        expected = sorted(
+            (-usage, name, ingredient_id) for ingredient_id, name, _, _, usage in rows
+            if name.startswith(query) or f" {query}" in f" {name}"
+        )[:TOP_K]
+        assert [r["ingredient_id"] for r in index.search(query, limit=TOP_K)] == [e[2] for e in expected]
@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.core.config import settings
+from app.services import recommendation_service as rs
+from app.services.interaction_buffer import InteractionWriteBuffer
+
+
+class StubSession:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class RecordingFlush:
+    """Flush callback that records each batch; rows for recipe 13 make the batch fail."""
+
+    def __init__(self):
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, db, batch):
+        self.gate.wait(5)
+        if any(recipe_id == 13 for _, recipe_id, _ in batch):
+            raise RuntimeError("bad row")
+        self.batches.append(list(batch))
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+
+def make_buffer(flush, **options):
+    options = {"max_size": 100, "flush_interval_ms": 10000, "flush_events": 100, "put_timeout_ms": 10, **options}
+    return InteractionWriteBuffer(flush, StubSession, **options)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def flush():
+    return RecordingFlush()
+
+
+def test_a_full_batch_is_flushed_without_waiting_for_the_interval(flush):
+    buffer = make_buffer(flush, flush_events=3)
+    buffer.start()
+    try:
+        for recipe_id in (1, 2, 3):
+            assert buffer.submit(1, recipe_id, "like")
+        assert wait_for(lambda: buffer.flushed == 3)
+        assert flush.batches == [[(1, 1, "like"), (1, 2, "like"), (1, 3, "like")]]
+    finally:
+        buffer.stop()
+
+
+def test_a_partial_batch_is_flushed_after_the_interval(flush):
+    buffer = make_buffer(flush, flush_interval_ms=50)
+    buffer.start()
+    try:
+        buffer.submit(1, 1, "save")
+        assert wait_for(lambda: buffer.flushed == 1)
+    finally:
+        buffer.stop()
+
+
+def test_a_full_buffer_rejects_and_counts_instead_of_blocking(flush):
+    flush.gate.clear()   # the flusher holds its first batch
+    buffer = make_buffer(flush, max_size=1, flush_events=1)
+    buffer.start()
+    try:
+        assert buffer.submit(1, 1, "like")
+        assert wait_for(lambda: buffer.pending() == 0)
+        assert buffer.submit(1, 2, "like")
+        assert buffer.submit(1, 3, "like") is False
+        assert buffer.rejected == 1
+    finally:
+        flush.gate.set()
+        buffer.stop()
+    assert flush.rows == [(1, 1, "like"), (1, 2, "like")]
+
+
+def test_a_stopped_buffer_does_not_accept_interactions(flush):
+    assert make_buffer(flush).submit(1, 1, "like") is False
+
+
+def test_a_bad_row_does_not_lose_the_rest_of_its_batch(flush):
+    buffer = make_buffer(flush, flush_events=3)
+    buffer.start()
+    for recipe_id in (1, 13, 2):
+        buffer.submit(1, recipe_id, "like")
+    buffer.stop()
+    assert flush.rows == [(1, 1, "like"), (1, 2, "like")]
+    assert buffer.flushed == 2
+
+
+def test_stop_flushes_everything_still_queued(flush):
+    buffer = make_buffer(flush, flush_events=2)
+    buffer.start()
+    for recipe_id in range(5):
+        buffer.submit(1, recipe_id, "dislike")
+    buffer.stop()
+    assert sorted(flush.rows) == [(1, recipe_id, "dislike") for recipe_id in range(5)]
+    assert buffer.pending() == 0
+
+
+def test_submit_falls_back_to_a_synchronous_write_when_the_buffer_is_full(flush, monkeypatch):
+    written = []
+    monkeypatch.setattr(settings, "INTERACTION_WRITE_BEHIND", True)
+    monkeypatch.setattr(rs, "interaction_buffer", make_buffer(flush))   # not started, so it refuses
+    monkeypatch.setattr(rs, "record_interaction", lambda db, *row: written.append(row))
+
+    rs.submit_interaction(None, 1, 7, "like")
+    assert written == [(1, 7, "like")]
+
+
+def test_lifespan_shutdown_flushes_the_buffer(flush, monkeypatch):
+    class Idle:
+        def start(self):
+            pass
+
+        def stop(self):
+            pass
+
+        def shutdown(self):
+            pass
+
+    buffer = make_buffer(flush)
+    monkeypatch.setattr(settings, "INTERACTION_WRITE_BEHIND", True)
+    monkeypatch.setattr(main, "interaction_buffer", buffer)
+    monkeypatch.setattr(main, "warm_indexes", lambda: None)
+    monkeypatch.setattr(main, "refill_worker", Idle())
+    monkeypatch.setattr(main, "password_pool", Idle())
+
+    with TestClient(main.app):
+        assert buffer.running
+        buffer.submit(1, 1, "save")
+        buffer.submit(1, 2, "save")
+    assert not buffer.running
+    assert flush.rows == [(1, 1, "save"), (1, 2, "save")]
@@ -0,0 +1,137 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, text
+
+from app.core.config import settings
+from app.core.security import get_current_user_id
+from app.models.favorite import Favorite
+from app.models.recipe import Recipe
+from app.models.user import User
+from app.services import recommendation_service as rs
+from app.services.popularity import ALL_TIME_BOARD, PopularityLeaderboards
+
+BATCH_URL = "/api/v1/recommendations/interactions/batch"
+
+BAD_RECIPE = 13
+
+# the record_interaction procedure, as an insert whose triggers write the favorite/save rows;
+# the CHECK stands in for the procedure raising on a bad row
+PROCEDURE_DDL = [
+    f"""CREATE TABLE swipes (
+        user_id INTEGER, recipe_id INTEGER CHECK (recipe_id <> {BAD_RECIPE}), interaction_type TEXT)""",
+    """CREATE TRIGGER swipe_like AFTER INSERT ON swipes WHEN NEW.interaction_type = 'like' BEGIN
+        INSERT OR IGNORE INTO favorites (user_id, recipe_id, saved_at)
+        VALUES (NEW.user_id, NEW.recipe_id, CURRENT_TIMESTAMP);
+    END""",
+    """CREATE TRIGGER swipe_save AFTER INSERT ON swipes WHEN NEW.interaction_type = 'save' BEGIN
+        INSERT OR IGNORE INTO saves (user_id, recipe_id, saved_at)
+        VALUES (NEW.user_id, NEW.recipe_id, CURRENT_TIMESTAMP);
+    END""",
+]
+
+
+@pytest.fixture
+def engine(engine):
+    # pysqlite's own transaction handling breaks SAVEPOINTs; let SQLAlchemy emit BEGIN
+    # (the pool holds a single connection, so switching it once is enough)
+    connection = engine.raw_connection()
+    connection.driver_connection.isolation_level = None
+    connection.close()
+
+    @event.listens_for(engine, "begin")
+    def _begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    with engine.begin() as connection:
+        for statement in PROCEDURE_DDL:
+            connection.exec_driver_sql(statement)
+    return engine
+
+
+@pytest.fixture
+def db(db):
+    db.add(User(user_id=1, username="cook", email="cook@example.com", password_hash="x"))
+    for recipe_id in (1, 2, 3, BAD_RECIPE):
+        db.add(Recipe(recipe_id=recipe_id, user_id=1, title=f"Recipe {recipe_id}", instructions="Stir"))
+    db.commit()
+    return db
+
+
+@pytest.fixture
+def boards(monkeypatch):
+    boards = PopularityLeaderboards()
+    monkeypatch.setattr(rs, "leaderboards", boards)
+    monkeypatch.setattr(rs, "exclusion_store", rs.ExclusionStore(max_users=10))
+    monkeypatch.setattr(rs, "cooccurrence_index", rs.cooccurrence_index.__class__())
+    monkeypatch.setattr(rs, "refresh_recipe_stats", lambda db, recipe_ids: list(recipe_ids))
+    monkeypatch.setattr(rs, "RECORD_INTERACTION_SQL", text(
+        "INSERT INTO swipes VALUES (:user_id, :recipe_id, :interaction_type)"
+    ))
+    return boards
+
+
+def test_a_repeated_like_is_not_counted_again(db, boards):
+    db.add(Favorite(user_id=1, recipe_id=1, saved_at=datetime.now()))
+    db.commit()
+
+    rs.record_interaction(db, 1, 1, "like")
+    assert boards.top(ALL_TIME_BOARD) == []
+
+    rs.record_interaction(db, 1, 2, "like")
+    rs.record_interaction(db, 1, 2, "like")
+    assert boards.top(ALL_TIME_BOARD) == [(2, 1.0)]
+
+
+def test_batch_counts_each_new_like_once(db, boards):
+    db.add(Favorite(user_id=1, recipe_id=1, saved_at=datetime.now()))
+    db.commit()
+
+    rs.record_interaction_rows(db, [(1, 1, "like"), (1, 2, "like"), (1, 2, "like"), (1, 3, "save")])
+    assert boards.top(ALL_TIME_BOARD) == [(2, 1.0)]
+
+
+@pytest.fixture
+def http(api, db, boards):
+    api.app.dependency_overrides[get_current_user_id] = lambda: 1
+    return api
+
+
+def swipes(db):
+    return db.execute(text("SELECT recipe_id, interaction_type FROM swipes ORDER BY recipe_id")).all()
+
+
+def test_batch_reports_a_status_per_item(http, db):
+    body = http.post(BATCH_URL, json={"interactions": [
+        {"recipe_id": 1, "interaction_type": "like"},
+        {"recipe_id": 2, "interaction_type": "save"},
+        {"recipe_id": 1, "interaction_type": "like"},
+        {"recipe_id": 3, "interaction_type": "love"},
+        {"recipe_id": 404, "interaction_type": "like"},
+    ]}).json()
+
+    assert [item["status"] for item in body["results"]] == [
+        "recorded", "recorded", "duplicate", "invalid_type", "recipe_not_found"
+    ]
+    assert body["recorded"] == 2
+    assert swipes(db) == [(1, "like"), (2, "save")]
+
+
+def test_a_failing_item_only_rolls_back_its_own_savepoint(http, db, boards):
+    body = http.post(BATCH_URL, json={"interactions": [
+        {"recipe_id": 1, "interaction_type": "like"},
+        {"recipe_id": BAD_RECIPE, "interaction_type": "like"},
+        {"recipe_id": 2, "interaction_type": "dislike"},
+    ]}).json()
+
+    assert [item["status"] for item in body["results"]] == ["recorded", "failed", "recorded"]
+    assert body["recorded"] == 2
+    assert swipes(db) == [(1, "like"), (2, "dislike")]
+    # only committed likes reach the leaderboards
+    assert boards.top(ALL_TIME_BOARD) == [(1, 1.0)]
+
+
+def test_oversized_batches_are_rejected(http, db):
+    interactions = [{"recipe_id": 1, "interaction_type": "like"}] * (settings.INTERACTION_BATCH_MAX + 1)
+    assert http.post(BATCH_URL, json={"interactions": interactions}).status_code == 400
+    assert swipes(db) == []
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from app.services.item_cooccurrence import ItemCooccurrenceIndex
+
+
+def pair_scores(index):
+    return {(a, b): round(score, 6) for a, row in index._counts.items() for b, score in row.items()}
+
+
+def test_liked_and_saved_together_counts_both_weights():
+    index = ItemCooccurrenceIndex()
+    index.add(1, 10, "like")
+    index.add(1, 11, "like")
+    index.add(1, 11, "save")
+    assert index.similar(10) == [(11, pytest.approx(1.5))]
+    assert index.add(1, 11, "save") is False
+
+    index.remove(1, 11, "like")
+    assert index.similar(10) == [(11, pytest.approx(0.5))]
+
+
+def test_only_the_most_recent_items_per_user_form_pairs():
+    index = ItemCooccurrenceIndex(max_items_per_user=3)
+    for recipe_id in (1, 2, 3, 4):
+        index.add(7, recipe_id, "like")
+    # recipe 1 left the window when 4 arrived
+    assert index.similar(1) == []
+    assert {other for other, _ in index.similar(4)} == {2, 3}
+
+    # removing a recipe in the window lets the next older one back in
+    index.remove(7, 3, "like")
+    assert {other for other, _ in index.similar(1)} == {2, 4}
+    assert index.user_recipe_ids(7) == {1, 2, 4}
+
+
+def test_incremental_updates_match_a_rebuild():
+    rng = random.Random(11)
+    index = ItemCooccurrenceIndex(max_items_per_user=4)
+    for _ in range(300):
+        user_id, recipe_id, kind = rng.randint(1, 4), rng.randint(1, 12), rng.choice(["like", "save"])
+        if rng.random() < 0.35:
+            index.remove(user_id, recipe_id, kind)
+        else:
+            index.add(user_id, recipe_id, kind)
+
+    # rows in the order the index saw them, oldest first
+    rows = [
+        (user_id, recipe_id, kind)
+        for user_id, items in index._user_items.items()
+        for recipe_id, kinds in items.items()
+        for kind in sorted(kinds)
+    ]
+    rebuilt = ItemCooccurrenceIndex(max_items_per_user=4)
+    rebuilt.rebuild(rows)
+    assert pair_scores(index) == pair_scores(rebuilt)
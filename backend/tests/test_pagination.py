@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, keyset_page
+from app.models.recipe import Recipe
+from app.models.save import Save
+from app.models.user import User
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor([3.25, 17])
+    assert decode_cursor(cursor, 2, (float, int)) == [3.25, 17]
+    assert decode_cursor(None, 2) is None
+
+
+def test_cursor_accepts_int_for_float():
+    assert decode_cursor(encode_cursor([3, 17]), 2, (float, int)) == [3, 17]
+
+
+@pytest.mark.parametrize("values", [["a", 1], [1.5, "1"], [1.5, 2.5], [True, 1], [1.5, None]])
+def test_cursor_rejects_wrong_element_types(values):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(values), 2, (float, int))
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor({"a": 1}), encode_cursor([1, 2, 3])])
+def test_cursor_rejects_malformed(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+def test_pantry_cursor_is_all_ints():
+    assert decode_cursor(encode_cursor([1, -2, 30]), 3, (int, int, int)) == [1, -2, 30]
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor([1, -2.5, 30]), 3, (int, int, int))
+
+
+@pytest.fixture
+def db(db):
+    db.add(User(user_id=1, username="cook", email="cook@example.com", password_hash="x"))
+    for recipe_id in range(1, 8):
+        db.add(Recipe(recipe_id=recipe_id, user_id=1, title=f"Recipe {recipe_id}", instructions="Stir"))
+    saved = {1: datetime(2024, 1, 1), 2: datetime(2024, 3, 1), 3: None, 4: datetime(2024, 3, 1),
+             5: datetime(2024, 2, 1), 6: None, 7: datetime(2024, 4, 1)}
+    for recipe_id, saved_at in saved.items():
+        db.add(Save(user_id=1, recipe_id=recipe_id, saved_at=saved_at))
+    db.commit()
+    # the model default fills saved_at on insert; put the NULLs back
+    db.query(Save).filter(Save.recipe_id.in_([3, 6])).update({Save.saved_at: None})
+    db.commit()
+    return db
+
+
+def saves_page(db, cursor, limit):
+    response = Response()
+    query = db.query(Recipe).join(Save).filter(Save.user_id == 1)
+    recipes = keyset_page(query, [Save.saved_at, Save.recipe_id], cursor, limit, response)
+    return [r.recipe_id for r in recipes], response.headers.get(NEXT_CURSOR_HEADER)
+
+
+NEWEST_FIRST = [7, 4, 2, 5, 1, 6, 3]
+
+
+def test_keyset_pages_cover_every_row_once_including_null_keys(db):
+    seen, cursor = [], None
+    while True:
+        ids, cursor = saves_page(db, cursor, 2)
+        seen.extend(ids)
+        if cursor is None:
+            break
+    assert seen == NEWEST_FIRST
+
+
+def test_keyset_accepts_null_in_cursor(db):
+    ids, _ = saves_page(db, encode_cursor([None, 6]), 5)
+    assert ids == [3]
+
+
+def test_keyset_without_limit_or_cursor_returns_everything(db):
+    ids, cursor = saves_page(db, None, None)
+    assert ids == NEWEST_FIRST
+    assert cursor is None
+
+
+@pytest.mark.parametrize("values", [["yesterday", 1], ["2024-01-01T00:00:00", "1"], [1, 2]])
+def test_keyset_rejects_bad_cursor_with_400(db, values):
+    with pytest.raises(HTTPException) as error:
+        saves_page(db, encode_cursor(values), 2)
+    assert error.value.status_code == 400
@@ -0,0 +1,97 @@
+import pytest
+
+from app.models.ingredient import Ingredient, RecipeIngredient
+from app.models.recipe import Recipe
+from app.models.user import User
+from app.routers import recipes as recipes_router
+from app.services.pantry_index import PantryIndex
+
+EGG, FLOUR, MILK, SUGAR, SALT = 1, 2, 3, 4, 5
+NAMES = {EGG: "Egg", FLOUR: "Flour", MILK: "Milk", SUGAR: "Sugar", SALT: "Salt"}
+PANTRY_URL = "/api/v1/recipes/pantry"
+
+RECIPES = {
+    10: {EGG, FLOUR, MILK},          # pancakes
+    11: {EGG, SALT},                 # boiled egg
+    12: {FLOUR, SUGAR, EGG, MILK},   # cake
+    13: {SUGAR},
+}
+
+
+def build_index():
+    index = PantryIndex()
+    index.rebuild([(r, i) for r, ingredients in RECIPES.items() for i in ingredients] + [(10, EGG)])
+    return index
+
+
+def brute_force_coverage(pantry, max_missing):
+    rows = []
+    for recipe_id, ingredients in RECIPES.items():
+        matched = len(ingredients & pantry)
+        missing = len(ingredients - pantry)
+        if matched and missing <= max_missing:
+            rows.append((recipe_id, matched, missing))
+    return sorted(rows, key=lambda row: (row[2], -row[1], row[0]))
+
+
+def test_containing_all_intersects_and_lists_simplest_first():
+    index = build_index()
+    assert index.containing_all([EGG]) == [(11, 2), (10, 3), (12, 4)]
+    assert index.containing_all([EGG, MILK]) == [(10, 3), (12, 4)]
+    assert index.containing_all([EGG, 404]) == []
+
+
+def test_coverage_matches_brute_force():
+    index = build_index()
+    for pantry in ({EGG, FLOUR, MILK}, {SUGAR}, {EGG, SALT, SUGAR}):
+        for max_missing in (0, 1, 2):
+            assert index.by_coverage(pantry, max_missing) == brute_force_coverage(pantry, max_missing)
+
+
+def test_added_recipes_are_searchable_without_a_rebuild():
+    index = build_index()
+    index.containing_all([SALT])      # builds the size table
+    index.add_recipe(14, [SALT, SUGAR, SALT])
+    index.add_recipe(14, [SALT])
+
+    assert index.containing_all([SALT]) == [(11, 2), (14, 2)]
+    assert index.by_coverage({SALT, SUGAR}, 0) == [(14, 2, 0), (13, 1, 0)]
+    assert len(index) == 5
+
+
+@pytest.fixture(params=["index", "database"])
+def http(request, api, db, monkeypatch):
+    db.add(User(user_id=1, username="cook", email="cook@example.com", password_hash="x"))
+    db.add_all(Ingredient(ingredient_id=i, name=name) for i, name in NAMES.items())
+    for recipe_id, ingredients in RECIPES.items():
+        db.add(Recipe(recipe_id=recipe_id, user_id=1, title=f"Recipe {recipe_id}", instructions="Stir"))
+        db.add_all(RecipeIngredient(recipe_id=recipe_id, ingredient_id=i) for i in ingredients)
+    db.commit()
+    # an empty index (not loaded yet) sends the route to the database
+    monkeypatch.setattr(recipes_router, "pantry_index", build_index() if request.param == "index" else PantryIndex())
+    return api
+
+
+def recipe_ids(response):
+    assert response.status_code == 200, response.text
+    return [card["recipe_id"] for card in response.json()]
+
+
+def test_route_ranks_the_same_with_or_without_the_index(http):
+    assert recipe_ids(http.get(PANTRY_URL, params={"ingredients": ["egg"]})) == [11, 10, 12]
+    assert recipe_ids(http.get(PANTRY_URL, params={"ingredient_ids": [EGG, FLOUR, MILK], "max_missing": 1})) == [10, 12, 11]
+    assert recipe_ids(http.get(PANTRY_URL, params={"ingredient_ids": [EGG, 404]})) == []
+
+
+def test_route_pages_with_the_cursor(http):
+    first = http.get(PANTRY_URL, params={"ingredient_ids": [EGG], "limit": 2})
+    assert recipe_ids(first) == [11, 10]
+    rest = http.get(PANTRY_URL, params={"ingredient_ids": [EGG], "limit": 2, "cursor": first.headers["x-next-cursor"]})
+    assert recipe_ids(rest) == [12]
+
+
+def test_unknown_ingredient_names_are_reported(http):
+    response = http.get(PANTRY_URL, params={"ingredients": ["Egg", "unicorn"]})
+    assert response.status_code == 422
+    assert "unicorn" in response.json()["detail"]
+    assert http.get(PANTRY_URL).status_code == 400
@@ -0,0 +1,31 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import PasswordHashPool
+
+
+def test_calls_beyond_max_pending_are_refused_and_counters_settle():
+    pool = PasswordHashPool(workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(pool.run(release.wait, 5))
+        second = asyncio.ensure_future(pool.run(lambda: "hashed"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as rejected:
+            await pool.run(lambda: "too many")
+        assert rejected.value.status_code == 503
+        assert pool.stats()["queued"] == 1
+
+        release.set()
+        return await asyncio.gather(first, second)
+
+    try:
+        assert asyncio.run(scenario()) == [True, "hashed"]
+    finally:
+        pool.shutdown()
+    stats = pool.stats()
+    assert (stats["queued"], stats["running"], stats["completed"], stats["rejected"]) == (0, 0, 2, 1)
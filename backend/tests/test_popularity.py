@@ -0,0 +1,85 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.popularity import (
+    ALL_TIME_BOARD,
+    TOP_RATED_BOARD,
+    TOP_RATED_MIN_REVIEWS,
+    TRENDING_BOARD,
+    TRENDING_HALF_LIFE_DAYS,
+    Leaderboard,
+    PopularityLeaderboards,
+    event_time,
+)
+
+DAY = 86400
+
+
+def test_decayed_score_halves_every_half_life():
+    board = Leaderboard(half_life_days=TRENDING_HALF_LIFE_DAYS)
+    now = time.time()
+    board.add(1, 1.0, at=now - TRENDING_HALF_LIFE_DAYS * DAY)
+    board.add(2, 1.0, at=now)
+    assert board.score(1, now) == pytest.approx(0.5)
+    assert [recipe_id for recipe_id, _ in board.top(2)] == [2, 1]
+
+
+def test_recent_events_outrank_a_larger_old_burst():
+    board = Leaderboard(half_life_days=TRENDING_HALF_LIFE_DAYS)
+    now = time.time()
+    for _ in range(3):
+        board.add(1, 1.0, at=now - 4 * TRENDING_HALF_LIFE_DAYS * DAY)
+    board.add(2, 1.0, at=now)
+    assert [recipe_id for recipe_id, _ in board.top(2)] == [2, 1]
+
+
+def test_retracting_an_event_at_its_own_time_removes_it():
+    boards = PopularityLeaderboards()
+    saved_at = time.time() - 3 * DAY
+    boards.record_save(1, saved_at)
+    boards.record_save(2)
+    boards.record_favorite(1)
+
+    boards.record_unsave(1, saved_at)
+    boards.record_unfavorite(1)
+    assert [recipe_id for recipe_id, _ in boards.top(TRENDING_BOARD)] == [2]
+    assert boards.top(ALL_TIME_BOARD) == []
+
+
+def test_an_event_that_renormalises_the_board_is_added_to_the_rescaled_key():
+    board = Leaderboard(half_life_days=TRENDING_HALF_LIFE_DAYS)
+    now = time.time()
+    board.add(1, 1.0, at=now)
+    later = now + 600 * DAY   # far enough that the forward-decay exponent is renormalised
+    board.add(1, 1.0, at=later)
+    assert board.score(1, later) == pytest.approx(1.0 + 0.5 ** (600 / TRENDING_HALF_LIFE_DAYS))
+
+
+def test_naive_event_times_are_read_as_utc():
+    aware = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    assert event_time(aware.replace(tzinfo=None)) == event_time(aware) == aware.timestamp()
+    assert event_time(None) is None
+
+
+def test_top_rated_needs_enough_reviews():
+    boards = PopularityLeaderboards()
+    for _ in range(TOP_RATED_MIN_REVIEWS - 1):
+        boards.record_review(1, 5)
+    assert boards.top(TOP_RATED_BOARD) == []
+
+    boards.record_review(1, 4)
+    assert boards.top(TOP_RATED_BOARD) == [(1, pytest.approx((5 * (TOP_RATED_MIN_REVIEWS - 1) + 4) / TOP_RATED_MIN_REVIEWS))]
+    assert boards.rating(1)[1] == TOP_RATED_MIN_REVIEWS
+
+
+def test_rebuild_replaces_every_board():
+    boards = PopularityLeaderboards()
+    boards.record_favorite(9)
+    now = time.time()
+    boards.rebuild([(1, 3), (2, 5)], [(1, now)], [(2, now - DAY)], [(3, 25.0, 5)])
+
+    assert [recipe_id for recipe_id, _ in boards.top(ALL_TIME_BOARD)] == [2, 1]
+    assert {recipe_id for recipe_id, _ in boards.top(TRENDING_BOARD)} == {1, 2}
+    assert boards.top(TOP_RATED_BOARD) == [(3, 5.0)]
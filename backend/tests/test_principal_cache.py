@@ -0,0 +1,60 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.security import PrincipalCache, get_current_user, get_current_user_id
+from app.models.user import User
+
+
+@pytest.fixture
+def db(db):
+    db.add(User(user_id=1, username="cook", email="cook@example.com", password_hash="hash"))
+    db.commit()
+    return db
+
+
+@pytest.fixture
+def principals(monkeypatch):
+    cache = PrincipalCache(max_entries=2, ttl_seconds=60)
+    monkeypatch.setattr(security, "principal_cache", cache)
+    return cache
+
+
+def test_cached_user_is_attached_without_a_query(db, principals):
+    principals.put(db.get(User, 1))
+    db.expunge_all()
+
+    user = principals.get(db, 1)
+    assert user.username == "cook"
+    assert user in db
+    # the hash is never cached; it loads from the row when asked for
+    assert "password_hash" not in principals._entries[1][1]
+    assert user.password_hash == "hash"
+
+
+def test_entries_expire_and_are_bounded(db, principals):
+    principals.put(User(user_id=7, username="a", email="a@example.com"))
+    principals.ttl = -1
+    principals.put(User(user_id=8, username="b", email="b@example.com"))
+    assert not principals.known(8)
+    assert principals.get(db, 8) is None
+
+    principals.ttl = 60
+    for user_id in (9, 10, 11):
+        principals.put(User(user_id=user_id, username=str(user_id), email=f"{user_id}@example.com"))
+    assert not principals.known(9)
+    assert principals.known(10) and principals.known(11)
+
+
+def test_dependencies_fill_the_cache_and_reject_deleted_users(db, principals):
+    assert get_current_user(db, 1).username == "cook"
+    assert principals.known(1)
+    assert get_current_user_id(db, 1) == 1
+
+    db.delete(db.get(User, 1))
+    db.commit()
+    principals.invalidate(1)
+    for dependency in (get_current_user, get_current_user_id):
+        with pytest.raises(HTTPException) as error:
+            dependency(db, 1)
+        assert error.value.status_code == 404
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.models.favorite import Favorite
+from app.models.ingredient import Ingredient, RecipeIngredient
+from app.models.recipe import Recipe
+from app.models.recipe_stats import RecipeStats
+from app.models.review import Review
+from app.models.save import Save
+from app.models.user import User
+
+
+@pytest.fixture
+def client(api, Session):
+    db = Session()
+    now = datetime.now()
+    for user_id in range(1, 7):
+        db.add(User(user_id=user_id, username=f"user{user_id}", email=f"{user_id}@example.com", password_hash="x"))
+    for recipe_id in (1, 2):
+        db.add(Recipe(recipe_id=recipe_id, user_id=1, title=f"Recipe {recipe_id}", instructions="Stir",
+                      created_at=now, updated_at=now))
+        db.add(Ingredient(ingredient_id=recipe_id, name=f"ingredient {recipe_id}"))
+        db.add(RecipeIngredient(recipe_id=recipe_id, ingredient_id=recipe_id, quantity="2"))
+    db.add(Save(user_id=1, recipe_id=1, saved_at=now))
+    db.add(Favorite(user_id=2, recipe_id=1))
+    db.commit()
+    db.close()
+    return api, Session
+
+
+def count_queries(engine):
+    counter = {"n": 0}
+    event.listen(engine, "before_cursor_execute", lambda *args: counter.__setitem__("n", counter["n"] + 1))
+    return counter
+
+
+def add_reviews(Session, recipe_id, ratings):
+    db = Session()
+    for user_id, rating in enumerate(ratings, start=1):
+        db.add(Review(user_id=user_id, recipe_id=recipe_id, rating=rating, comment="ok", created_at=datetime.now()))
+    db.commit()
+    db.close()
+
+
+def test_details_without_a_stats_row_fall_back_to_the_loaded_reviews(client):
+    http, Session = client
+    add_reviews(Session, 1, [1, 2, 3, 4, 5])
+
+    body = http.get("/api/v1/recipes/details/1").json()
+    assert body["average_rating"] == 3.0
+    assert body["reviews_count"] == 5
+    assert body["favorites_count"] == 1
+    assert body["is_saved"] is True
+    assert [review["user_name"] for review in body["reviews"]] == [f"user{i}" for i in range(1, 6)]
+
+
+def test_details_read_counts_from_recipe_stats(client):
+    http, Session = client
+    add_reviews(Session, 2, [4, 5])
+    db = Session()
+    db.add(RecipeStats(recipe_id=2, rating_sum=9, review_count=2, average_rating=4.5, favorite_count=7))
+    db.commit()
+    db.close()
+
+    body = http.get("/api/v1/recipes/details/2").json()
+    assert (body["average_rating"], body["reviews_count"], body["favorites_count"]) == (4.5, 2, 7)
+    assert body["is_saved"] is False
+
+
+def test_query_count_does_not_grow_with_reviews(client, engine):
+    http, Session = client
+    add_reviews(Session, 1, [5])
+    add_reviews(Session, 2, [5, 4, 3, 2, 1, 5])
+    db = Session()
+    db.add_all([RecipeStats(recipe_id=1, review_count=1), RecipeStats(recipe_id=2, review_count=6)])
+    db.commit()
+    db.close()
+
+    counter = count_queries(engine)
+    http.get("/api/v1/recipes/details/1")
+    one_review = counter["n"]
+    counter["n"] = 0
+    http.get("/api/v1/recipes/details/2")
+    assert counter["n"] == one_review
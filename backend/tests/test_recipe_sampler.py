@@ -0,0 +1,86 @@
+import random
+
+import pytest
+from sqlalchemy import event
+
+from app.models.recipe import Recipe
+from app.models.review import Review
+from app.models.user import User
+from app.routers import recipes as recipes_router
+from app.services.recipe_sampler import (
+    ALL_POOL,
+    FEATURED_MIN_RATING,
+    FEATURED_POOL,
+    RecipeSampler,
+    SamplingPool,
+    category_pool,
+)
+
+
+def test_pool_stays_dense_through_adds_and_removes():
+    pool = SamplingPool(range(10))
+    pool.add(3)
+    for recipe_id in (0, 9, 4):
+        pool.remove(recipe_id)
+    pool.remove(404)
+
+    assert len(pool) == 7
+    assert sorted(pool.sample(20)) == [1, 2, 3, 5, 6, 7, 8]
+    assert 4 not in pool and 5 in pool
+
+
+def test_sample_is_distinct_and_honours_exclusions():
+    pool = SamplingPool(range(100))
+    rng = random.Random(3)
+    picks = pool.sample(10, exclude={0, 1, 2}, rng=rng)
+    assert len(set(picks)) == 10
+    assert not {0, 1, 2} & set(picks)
+
+    # nearly everything excluded: probing gives up and one filtering pass finds the rest
+    assert sorted(pool.sample(5, exclude=set(range(97)), rng=rng)) == [97, 98, 99]
+    assert pool.sample(0) == [] and SamplingPool().sample(3) == []
+
+
+def test_featured_pool_follows_the_average_rating():
+    sampler = RecipeSampler()
+    sampler.rebuild([1, 2, 3], [(1, 7), (2, 7)], [(1, 10.0, 2), (2, 8.0, 2)])
+    assert sampler.size(ALL_POOL) == 3
+    assert sampler.size(category_pool(7)) == 2
+    assert sampler.sample(FEATURED_POOL, 5) == [1]
+
+    sampler.add_rating(1, 1)      # (10 + 1) / 3 drops below the threshold
+    sampler.add_rating(3, FEATURED_MIN_RATING)
+    assert sampler.sample(FEATURED_POOL, 5) == [3]
+
+    sampler.add_recipe(4, [8])
+    assert sampler.sample(category_pool(8), 5) == [4]
+    assert sampler.size(ALL_POOL) == 4
+    assert sampler.sample("missing", 5) == []
+
+
+@pytest.fixture
+def http(api, db, engine):
+    db.add(User(user_id=1, username="cook", email="cook@example.com", password_hash="x"))
+    for recipe_id, ratings in ((1, [5, 5]), (2, [3, 4]), (3, [])):
+        db.add(Recipe(recipe_id=recipe_id, user_id=1, title=f"Recipe {recipe_id}", instructions="Stir"))
+        db.add_all(Review(recipe_id=recipe_id, user_id=1, rating=rating) for rating in ratings)
+    db.commit()
+
+    # the fallback orders by Oracle's DBMS_RANDOM.VALUE
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def sqlite_random(conn, cursor, statement, parameters, context, executemany):
+        return statement.replace("DBMS_RANDOM.VALUE", "RANDOM()"), parameters
+
+    return api
+
+
+def test_featured_draws_from_the_loaded_pool(http, monkeypatch):
+    sampler = RecipeSampler()
+    sampler.rebuild([1, 2, 3], [], [(2, 5.0, 1)])   # the pool, not the reviews table, decides
+    monkeypatch.setattr(recipes_router, "recipe_sampler", sampler)
+    assert http.get("/api/v1/recipes/featured").json()["recipe_id"] == 2
+
+
+def test_featured_falls_back_to_the_database_when_the_pool_is_empty(http, monkeypatch):
+    monkeypatch.setattr(recipes_router, "recipe_sampler", RecipeSampler())
+    assert http.get("/api/v1/recipes/featured").json()["recipe_id"] == 1
@@ -0,0 +1,80 @@
+import pytest
+
+from app.models.recipe import Recipe
+from app.models.recipe_stats import RecipeStats
+from app.models.review import Review
+from app.models.save import Save
+from app.models.user import User
+from app.services import recipe_stats
+from app.services.recipe_stats import apply_recipe_stats, bump_recipe_stats, load_rating_aggregates
+
+
+@pytest.fixture
+def db(db):
+    for user_id in (1, 2, 3):
+        db.add(User(user_id=user_id, username=f"user{user_id}", email=f"{user_id}@example.com", password_hash="x"))
+    for recipe_id in (1, 2, 3):
+        db.add(Recipe(recipe_id=recipe_id, user_id=1, title=f"Recipe {recipe_id}", instructions="Stir"))
+    db.commit()
+    return db
+
+
+@pytest.fixture
+def refreshed(monkeypatch):
+    """The bump runs as is; the refresh is an Oracle MERGE, so it is replaced by an ORM recount."""
+    refreshed = []
+
+    def refresh(db, recipe_ids):
+        for recipe_id in recipe_ids:
+            refreshed.append(recipe_id)
+            reviews = db.query(Review).filter(Review.recipe_id == recipe_id).all()
+            db.merge(RecipeStats(
+                recipe_id=recipe_id,
+                rating_sum=sum(r.rating for r in reviews),
+                review_count=len(reviews),
+                average_rating=sum(r.rating for r in reviews) / len(reviews) if reviews else None,
+                favorite_count=0,
+                save_count=db.query(Save).filter(Save.recipe_id == recipe_id).count(),
+                dislike_count=0,
+            ))
+
+    monkeypatch.setattr(recipe_stats, "refresh_recipe_stats", refresh)
+    return refreshed
+
+
+def test_ratings_come_from_stats_with_a_fallback_for_missing_rows(db):
+    db.add(RecipeStats(recipe_id=1, rating_sum=9, review_count=2, average_rating=4.5))
+    db.add_all([Review(recipe_id=2, user_id=2, rating=3), Review(recipe_id=2, user_id=3, rating=5)])
+    db.commit()
+
+    assert load_rating_aggregates(db, [1, 2, 3]) == {1: (4.5, 2), 2: (4.0, 2)}
+
+    recipes = apply_recipe_stats(db, db.query(Recipe).order_by(Recipe.recipe_id).all())
+    assert [(r.average_rating, r.total_ratings) for r in recipes] == [(4.5, 2), (4.0, 2), (None, 0)]
+
+
+def test_bump_applies_deltas_to_an_existing_row(db, refreshed):
+    db.add(RecipeStats(recipe_id=1, rating_sum=8, review_count=2, average_rating=4.0, save_count=1))
+    db.commit()
+
+    bump_recipe_stats(db, 1, rating=5, reviews=1, saves=-2)
+    db.commit()
+    stats = db.get(RecipeStats, 1)
+    db.refresh(stats)
+    assert (stats.review_count, stats.rating_sum, stats.average_rating, stats.save_count) == (3, 13, 13 / 3, 0)
+    assert refreshed == []
+
+
+def test_missing_row_is_seeded_from_the_source_tables(db, refreshed):
+    # 40 reviews written before the recipe had a stats row
+    db.add_all([Review(recipe_id=2, user_id=2, rating=4) for _ in range(40)])
+    db.commit()
+
+    db.add(Review(recipe_id=2, user_id=3, rating=2))
+    bump_recipe_stats(db, 2, rating=2, reviews=1)
+    db.commit()
+
+    stats = db.get(RecipeStats, 2)
+    assert refreshed == [2]
+    # the pending review was flushed before the recount, and the delta is not added twice
+    assert (stats.review_count, stats.rating_sum) == (41, 162)
@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.models.recipe import Recipe
+from app.models.recommendation import RecipeRecommendation
+from app.models.user import User
+from app.services import recommendation_service as rs
+from app.services.recommendation_queue import RecommendationRefillWorker
+
+LOW_WATER = settings.RECOMMENDATION_QUEUE_LOW_WATER
+
+
+class RecordingWorker:
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule(self, user_id):
+        self.scheduled.append(user_id)
+        return True
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    worker = RecordingWorker()
+    monkeypatch.setattr(rs, "refill_worker", worker)
+    return worker
+
+
+def queue_recommendations(db, count):
+    """`count` pending rows for user 1; recipe n has score n, so the best come last."""
+    db.add(User(user_id=1, username="cook", email="cook@example.com", password_hash="x"))
+    for recipe_id in range(1, count + 1):
+        db.add(Recipe(recipe_id=recipe_id, user_id=1, title=f"Recipe {recipe_id}", instructions="Stir"))
+        db.add(RecipeRecommendation(recommendation_id=recipe_id, user_id=1, recipe_id=recipe_id,
+                                    recommendation_score=float(recipe_id), status="pending"))
+    db.commit()
+
+
+def statuses(db):
+    return dict(db.query(RecipeRecommendation.recipe_id, RecipeRecommendation.status))
+
+
+def test_pop_serves_the_best_pending_rows_and_marks_them_shown(db, worker):
+    queue_recommendations(db, 5 + LOW_WATER)
+
+    recipes = rs.get_next_recommendations(db, 1, limit=5)
+    assert [r.recipe_id for r in recipes] == sorted(range(LOW_WATER + 1, LOW_WATER + 6), reverse=True)
+    shown = {recipe_id for recipe_id, status in statuses(db).items() if status == "shown"}
+    assert shown == {r.recipe_id for r in recipes}
+    # exactly the low-water mark is left: no refill yet
+    assert worker.scheduled == []
+
+
+def test_pop_schedules_a_refill_below_the_low_water_mark(db, worker):
+    queue_recommendations(db, 5 + LOW_WATER - 1)
+    rs.get_next_recommendations(db, 1, limit=5)
+    assert worker.scheduled == [1]
+
+
+def test_rows_claimed_by_a_concurrent_pop_are_skipped(db, engine, worker):
+    queue_recommendations(db, 8)
+
+    # another request claims recipe 8 between our read and our lock
+    @event.listens_for(engine, "before_cursor_execute")
+    def concurrent_claim(conn, cursor, statement, parameters, context, executemany):
+        if "recommendation_id IN" in statement and not concurrent_claim.done:
+            concurrent_claim.done = True
+            cursor.execute("UPDATE recipe_recommendations SET status = 'shown' WHERE recipe_id = 8")
+    concurrent_claim.done = False
+
+    # the rows read past the page take its place
+    recipes = rs.get_next_recommendations(db, 1, limit=3)
+    assert [r.recipe_id for r in recipes] == [7, 6, 5]
+    assert statuses(db)[4] == "pending"
+
+
+def test_empty_queue_serves_a_random_batch_right_away(db, worker, monkeypatch):
+    queue_recommendations(db, 0)
+    monkeypatch.setattr(rs, "generate_simple_recommendations", lambda db, user_id, limit: ["random"] * limit)
+    monkeypatch.setattr(rs, "apply_recipe_stats", lambda db, recipes: recipes)
+
+    assert rs.get_next_recommendations(db, 1, limit=3) == ["random"] * 3
+    assert worker.scheduled == [1]
+
+
+def test_refill_worker_queues_a_user_once_until_picked_up():
+    worker = RecommendationRefillWorker(lambda db, user_id: None, lambda: None)
+    assert worker.schedule(1) is True
+    assert worker.schedule(1) is False
+    assert worker.schedule(2) is True
+    assert worker.pending() == 2
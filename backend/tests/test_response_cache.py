@@ -0,0 +1,170 @@
+import socketserver
+import threading
+from datetime import timedelta
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app.core import response_cache as rc
+from app.core.security import PrincipalCache, create_access_token, get_token_user_id
+from app.models.user import User
+
+
+class StandInMemcached(socketserver.StreamRequestHandler):
+    """Just enough of the memcached text protocol for MemcachedBackend."""
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            parts = line.decode().split()
+            verb = parts[0]
+            if verb == "get":
+                for key in parts[1:]:
+                    if key in store:
+                        self.wfile.write(f"VALUE {key} 0 {len(store[key])}\r\n".encode() + store[key] + b"\r\n")
+                self.wfile.write(b"END\r\n")
+            elif verb in ("set", "add"):
+                data = self.rfile.read(int(parts[4]) + 2)[:-2]
+                if verb == "add" and parts[1] in store:
+                    self.wfile.write(b"NOT_STORED\r\n")
+                else:
+                    store[parts[1]] = data
+                    self.wfile.write(b"STORED\r\n")
+            elif verb == "incr":
+                if parts[1] not in store:
+                    self.wfile.write(b"NOT_FOUND\r\n")
+                else:
+                    store[parts[1]] = str(int(store[parts[1]]) + int(parts[2])).encode()
+                    self.wfile.write(store[parts[1]] + b"\r\n")
+            elif verb == "flush_all":
+                store.clear()
+                self.wfile.write(b"OK\r\n")
+
+
+@pytest.fixture
+def memcached_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), StandInMemcached)
+    server.daemon_threads = True
+    server.store = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "memcached"])
+def client(request, monkeypatch):
+    if request.param == "memory":
+        backend = rc.MemoryBackend(max_entries=100)
+    else:
+        server = request.getfixturevalue("memcached_server")
+        backend = rc.MemcachedBackend("127.0.0.1:%d" % server.server_address[1])
+    monkeypatch.setattr(rc, "response_cache", rc.ResponseCache(backend))
+    principals = PrincipalCache()
+    for user_id in (1, 2):
+        principals.put(User(user_id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com"))
+    monkeypatch.setattr(rc, "principal_cache", principals)
+
+    calls = {"n": 0}
+    router = APIRouter(route_class=rc.CachedRoute)
+
+    @router.get("/items/{item_id}")
+    @rc.cache_response(ttl=60, tags=("item:{item_id}",))
+    def read_item(item_id: int):
+        calls["n"] += 1
+        return {"item_id": item_id, "version": calls["n"]}
+
+    @router.get("/owned/{item_id}")
+    @rc.cache_response(ttl=60, tags=("item:{item_id}",))
+    def read_owned_item(item_id: int, response: Response):
+        calls["n"] += 1
+        # the owner is only known once the item is loaded
+        rc.add_cache_tags(response, f"user:{item_id * 10}")
+        return {"item_id": item_id, "version": calls["n"]}
+
+    @router.get("/mine/{item_id}")
+    @rc.cache_response(ttl=60, tags=("item:{item_id}",), vary_by_auth=True)
+    def read_my_item(item_id: int, user_id: int = Depends(get_token_user_id)):
+        calls["n"] += 1
+        return {"item_id": item_id, "user_id": user_id, "version": calls["n"]}
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app), calls
+
+
+def test_second_read_is_served_from_cache(client):
+    http, calls = client
+    first = http.get("/items/1")
+    second = http.get("/items/1")
+    assert second.json() == first.json()
+    assert second.headers[rc.CACHE_STATUS_HEADER] == "HIT"
+    assert calls["n"] == 1
+
+
+def bearer(user_id, expires=timedelta(minutes=5)):
+    return {"Authorization": "Bearer " + create_access_token(user_id, expires_delta=expires)}
+
+
+def test_entries_vary_by_user_and_invalidate_by_tag(client):
+    http, calls = client
+    http.get("/mine/1", headers=bearer(1))
+    http.get("/mine/1", headers=bearer(2))
+    # a fresh token for the same user shares the entry
+    again = http.get("/mine/1", headers=bearer(1, timedelta(minutes=6)))
+    assert again.headers[rc.CACHE_STATUS_HEADER] == "HIT"
+    assert calls["n"] == 2
+
+    rc.response_cache.invalidate("item:1")
+    after = http.get("/mine/1", headers=bearer(1))
+    assert after.headers[rc.CACHE_STATUS_HEADER] == "MISS"
+    assert after.json()["version"] == 3
+
+
+def test_bad_or_expired_tokens_never_reach_the_cache(client):
+    http, calls = client
+    http.get("/mine/1", headers=bearer(1))
+    for headers in (bearer(1, timedelta(seconds=-5)), {"Authorization": "Bearer junk"}, {}):
+        response = http.get("/mine/1", headers=headers)
+        assert response.status_code == 401
+        assert rc.CACHE_STATUS_HEADER not in response.headers
+    assert calls["n"] == 1
+
+
+def test_users_missing_from_the_principal_cache_go_through_the_endpoint(client):
+    http, calls = client
+    http.get("/mine/1", headers=bearer(1))
+    rc.principal_cache.invalidate(1)   # e.g. the user was deleted
+    response = http.get("/mine/1", headers=bearer(1))
+    assert response.headers[rc.CACHE_STATUS_HEADER] == "MISS"
+    assert calls["n"] == 2
+
+
+def test_tags_added_by_the_endpoint_invalidate_the_entry(client):
+    http, calls = client
+    first = http.get("/owned/1")
+    assert rc.CACHE_TAGS_HEADER not in first.headers
+    hit = http.get("/owned/1")
+    assert hit.headers[rc.CACHE_STATUS_HEADER] == "HIT"
+    assert rc.CACHE_TAGS_HEADER not in hit.headers
+
+    rc.response_cache.invalidate("user:20")   # someone else's
+    assert http.get("/owned/1").headers[rc.CACHE_STATUS_HEADER] == "HIT"
+    rc.response_cache.invalidate("user:10")
+    after = http.get("/owned/1")
+    assert after.headers[rc.CACHE_STATUS_HEADER] == "MISS"
+    assert after.json()["version"] == 2
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = rc.MemoryBackend(max_entries=2)
+    backend.set("a", b"1", 60)
+    backend.set("b", b"2", 60)
+    backend.get("a")
+    backend.set("c", b"3", 60)
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
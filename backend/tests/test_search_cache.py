@@ -0,0 +1,98 @@
+import pytest
+
+from app.models.user import User
+from app.routers import recipes as recipes_router
+from app.services import search_cache as search_cache_module
+from app.services.category_index import CategoryIndex
+from app.services.fuzzy_title_index import FuzzyTitleIndex
+from app.services.ingredient_autocomplete import IngredientAutocomplete
+from app.services.pantry_index import PantryIndex
+from app.services.recipe_sampler import RecipeSampler
+from app.services.search_cache import INGREDIENT_SEARCH, RECIPE_SEARCH, SearchResultCache
+from app.services.search_index import RecipeSearchIndex
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(search_cache_module.time, "monotonic", clock)
+    return clock
+
+
+def test_queries_are_normalised_and_params_are_part_of_the_key(clock):
+    cache = SearchResultCache()
+    cache.put(RECIPE_SEARCH, "Lemon  Cake", (10, None), ["cake"])
+    assert cache.get(RECIPE_SEARCH, " lemon cake ", 10, None) == ["cake"]
+    assert cache.get(RECIPE_SEARCH, "lemon cake", 20, None) is None
+    assert cache.get(INGREDIENT_SEARCH, "lemon cake", 10, None) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_entries_expire_and_the_least_recently_used_is_evicted(clock):
+    cache = SearchResultCache(max_entries=2, ttl_seconds=60)
+    cache.put(RECIPE_SEARCH, "a", (), "A")
+    cache.put(RECIPE_SEARCH, "b", (), "B")
+    cache.get(RECIPE_SEARCH, "a")
+    cache.put(RECIPE_SEARCH, "c", (), "C")
+    assert cache.get(RECIPE_SEARCH, "b") is None
+    assert cache.get(RECIPE_SEARCH, "a") == "A"
+
+    clock.now += 61
+    assert cache.get(RECIPE_SEARCH, "a") is None
+    assert len(cache) == 1   # the expired entry was dropped on read
+
+
+def test_invalidate_drops_only_matching_entries_of_one_kind(clock):
+    cache = SearchResultCache()
+    for query in ("lemon", "lime", "soup"):
+        cache.put(RECIPE_SEARCH, query, (), query)
+        cache.put(INGREDIENT_SEARCH, query, (), query)
+
+    assert cache.invalidate(RECIPE_SEARCH, lambda q: q.startswith("l")) == 2
+    assert cache.get(RECIPE_SEARCH, "soup") == "soup"
+    assert cache.get(RECIPE_SEARCH, "lemon") is None
+    assert cache.get(INGREDIENT_SEARCH, "lemon") == "lemon"
+    assert cache.stats()["invalidations"] == 2
+
+
+@pytest.fixture
+def http(api, db, monkeypatch):
+    db.add(User(user_id=1, username="cook", email="cook@example.com", password_hash="x"))
+    db.commit()
+    # fresh indexes, so creating a recipe does not leak into other tests
+    for name, index in (("recipe_sampler", RecipeSampler()), ("category_index", CategoryIndex()),
+                        ("fuzzy_title_index", FuzzyTitleIndex()), ("recipe_search_index", RecipeSearchIndex()),
+                        ("ingredient_autocomplete", IngredientAutocomplete()), ("pantry_index", PantryIndex()),
+                        ("search_cache", SearchResultCache())):
+        monkeypatch.setattr(recipes_router, name, index)
+    return api
+
+
+def test_creating_a_recipe_drops_the_searches_it_could_appear_in(http):
+    cache = recipes_router.search_cache
+    for query in ("lemon", "lem", "tart recipe", "soup"):
+        cache.put(RECIPE_SEARCH, query, (10, None), ([], None))
+    for query in ("lemon", "zest", "ginger"):
+        cache.put(INGREDIENT_SEARCH, query, (8,), [])
+
+    response = http.post("/api/v1/recipes/", json={
+        "title": "Lemon tart", "instructions": "Bake", "category_ids": [],
+        "ingredients": [{"name": "Lemon zest", "quantity": "1 tbsp"}],
+    })
+    assert response.status_code == 200, response.text
+
+    assert cache.get(RECIPE_SEARCH, "lemon", 10, None) is None
+    assert cache.get(RECIPE_SEARCH, "lem", 10, None) is None         # prefix of a new token
+    assert cache.get(RECIPE_SEARCH, "tart recipe", 10, None) is None
+    assert cache.get(RECIPE_SEARCH, "soup", 10, None) is not None
+    assert cache.get(INGREDIENT_SEARCH, "lemon", 8) is None
+    assert cache.get(INGREDIENT_SEARCH, "zest", 8) is None
+    assert cache.get(INGREDIENT_SEARCH, "ginger", 8) is not None
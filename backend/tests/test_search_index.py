@@ -0,0 +1,39 @@
+from app.services.search_index import RecipeSearchIndex
+
+
+def build_index():
+    index = RecipeSearchIndex()
+    index.add_recipe(1, "Chicken Curry", "A mild curry", None, ["chicken", "coconut milk"])
+    index.add_recipe(2, "Chicken Soup", "Warming soup", None, ["chicken", "carrot"])
+    index.add_recipe(3, "Coconut Rice", "Rice cooked in coconut milk", None, ["rice", "coconut milk"])
+    index.add_recipe(4, "chicken curry", "Same dish, posted again", None, ["chicken"])
+    return index
+
+
+def test_search_ranks_full_matches_first_and_dedupes_titles():
+    hits, _ = build_index().search("chicken curry")
+    ids = [recipe_id for recipe_id, _ in hits]
+    assert ids[0] in (1, 4)
+    assert not {1, 4} <= set(ids)
+    assert 2 in ids
+
+
+def test_last_token_matches_by_prefix():
+    hits, _ = build_index().search("coco")
+    assert {recipe_id for recipe_id, _ in hits} == {1, 3}
+
+
+def test_cursor_pages_cover_every_hit_once():
+    index = build_index()
+    first, after = index.search("chicken coconut", limit=1)
+    assert after is not None
+    second, after = index.search("chicken coconut", limit=10, after=after)
+    assert after is None
+    assert not {r for r, _ in first} & {r for r, _ in second}
+    assert len(first) + len(second) == 3
+
+
+def test_removed_recipes_are_no_longer_found():
+    index = build_index()
+    index.remove(3)
+    assert [r for r, _ in index.search("rice")[0]] == []
@@ -0,0 +1,58 @@
+import random
+
+import numpy as np
+
+from app.services.similarity_service import build_interaction_matrix, compute_top_n_similarities
+
+
+def brute_force_top_n(rows, top_n):
+    vectors = {}
+    for user_id, recipe_id, weight in rows:
+        vector = vectors.setdefault(user_id, {})
+        vector[recipe_id] = vector.get(recipe_id, 0.0) + weight
+
+    def cosine(a, b):
+        dot = sum(w * b.get(r, 0.0) for r, w in a.items())
+        norm = np.sqrt(sum(w * w for w in a.values())) * np.sqrt(sum(w * w for w in b.values()))
+        return dot / norm if norm else 0.0
+
+    results = {}
+    for user_id, vector in vectors.items():
+        scored = [
+            (other_id, cosine(vector, other))
+            for other_id, other in vectors.items()
+            if other_id != user_id and set(vector) & set(other)
+        ]
+        scored.sort(key=lambda x: -x[1])
+        if scored:
+            results[user_id] = scored[:top_n]
+    return results
+
+
+def test_duplicate_interactions_are_summed():
+    interactions = build_interaction_matrix([(1, 10, 1.0), (1, 10, 0.5), (2, 10, 1.0)])
+    assert interactions.shape == (2, 1)
+    assert interactions.matrix[interactions.user_index[1], 0] == 1.5
+
+
+def test_top_n_matches_brute_force_cosine():
+    rng = random.Random(3)
+    rows = [
+        (rng.randint(1, 40), rng.randint(1, 30), rng.choice([1.0, 0.5, -0.1]))
+        for _ in range(400)
+    ]
+    expected = brute_force_top_n(rows, 5)
+    actual = compute_top_n_similarities(build_interaction_matrix(rows), top_n=5, chunk_size=7)
+
+    assert actual.keys() == expected.keys()
+    for user_id, neighbours in actual.items():
+        scores = [score for _, score in neighbours]
+        assert np.allclose(scores, [score for _, score in expected[user_id]], atol=1e-5)
+        assert user_id not in {other for other, _ in neighbours}
+
+
+def test_users_without_shared_recipes_have_no_neighbours():
+    interactions = build_interaction_matrix([(1, 10, 1.0), (2, 11, 1.0), (3, 11, 0.5)])
+    similarities = compute_top_n_similarities(interactions, top_n=3)
+    assert 1 not in similarities
+    assert [other for other, _ in similarities[2]] == [3]